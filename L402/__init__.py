@@ -1,2 +1,21 @@
 from .l402_api_chain import L402APIChain
-from .requests_l402 import RequestsL402Wrapper
+from .requests_l402 import RequestsL402Wrapper, BatchResult, DownloadResult
+from .aiohttp_l402 import AsyncRequestsL402Wrapper
+from .token_store import L402Token, TokenStore
+from .challenge import L402Challenge, parse_L402_challenge
+from .exceptions import L402Error, InvalidChallengeError
+from .exceptions import InvoiceExpiredError, DownloadError
+from .exceptions import PaymentRefusedError, PriceLimitExceededError
+from .exceptions import BudgetExceededError, AmountlessInvoiceError
+from .budget import SpendingLimits
+
+
+def __getattr__(name):
+    # The test server needs pymacaroons, which clients never do.
+    if name == 'L402Server':
+        from .server import L402Server
+        return L402Server
+
+    raise AttributeError(
+        'module {!r} has no attribute {!r}'.format(__name__, name),
+    )
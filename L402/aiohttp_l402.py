@@ -0,0 +1,299 @@
+import asyncio
+import contextlib
+import inspect
+import logging
+import time
+
+import aiohttp
+
+from metrics import NullMetricsSink
+
+from .payment import AUTH_HEADER, L402_ERROR_CODE
+from .payment import METRIC_BYTES_RECEIVED, METRIC_BYTES_SENT
+from .payment import METRIC_CHALLENGES, METRIC_CHALLENGE_TO_PAYMENT_SECONDS
+from .payment import METRIC_REQUEST_SECONDS, METRIC_RETRY_SECONDS
+from .payment import challenge_token, fresh_token, node_fee_limit, paying
+from .payment import read_challenge, reject_token, with_token
+from .requests_l402 import BatchResult
+from .single_flight import AsyncSingleFlight
+from .token_store import TokenStore, token_scope
+
+log = logging.getLogger(__name__)
+
+
+class _LoopSession(object):
+    def __init__(self, session):
+        self.session = session
+
+        # Requests currently using the session.
+        self.users = 0
+
+
+class AsyncRequestsL402Wrapper(object):
+    """
+    The asyncio counterpart of RequestsL402Wrapper, built on a pooled
+    aiohttp session.
+
+    Requests answered with a 402 are paid for and retried exactly like the
+    blocking wrapper, sharing the same token store and scoping rules. If
+    lnd_node.pay_invoice is a coroutine function it is awaited directly,
+    otherwise it's run in the loop's default executor so a blocking node
+    doesn't stall the event loop.
+
+    Responses are returned with their body already read, so text() and
+    json() can be awaited after the connection has gone back to the pool.
+
+    An aiohttp session is bound to the event loop it was created on, so
+    unless one is passed in the wrapper keeps a session per running loop.
+    With keep_alive, a loop's session stays open until close() is awaited
+    on that loop; otherwise it's closed as soon as no request is using it,
+    which suits callers that start a fresh loop per call, as asyncio.run
+    does.
+    """
+
+    def __init__(self, lnd_node, session=None, token_store=None,
+                 scope_depth=1, limit=100, limit_per_host=0, metrics=None,
+                 spending_limits=None, headers=None, keep_alive=True):
+
+        self.lnd_node = lnd_node
+        self.headers = headers
+        self.scope_depth = scope_depth
+        self.spending_limits = spending_limits
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keep_alive = keep_alive
+
+        if token_store is None:
+            token_store = TokenStore()
+        self.token_store = token_store
+
+        if metrics is None:
+            metrics = NullMetricsSink()
+        self.metrics = metrics
+
+        self._session = session
+
+        # Our own sessions, keyed by the event loop they were created on.
+        self._sessions = {}
+
+        self._single_flight = AsyncSingleFlight()
+
+    @property
+    def session(self):
+        """
+        The session requests on the running event loop are sent with.
+        """
+        if self._session is not None:
+            return self._session
+
+        return self._loop_session().session
+
+    def _loop_session(self):
+        loop = asyncio.get_running_loop()
+
+        loop_session = self._sessions.get(loop)
+        if loop_session is None:
+            self._forget_closed_loops()
+
+            # The session has to be created from within the loop it will
+            # run on, so we defer it until the loop's first request.
+            connector = aiohttp.TCPConnector(
+                limit=self.limit, limit_per_host=self.limit_per_host,
+            )
+            loop_session = _LoopSession(aiohttp.ClientSession(
+                connector=connector, headers=self.headers,
+            ))
+            self._sessions[loop] = loop_session
+
+        return loop_session
+
+    def _forget_closed_loops(self):
+        # A session left open when its loop closed can't be closed any more,
+        # only dropped; aiohttp warns about it when it's collected.
+        for loop in [loop for loop in self._sessions if loop.is_closed()]:
+            del self._sessions[loop]
+
+    @contextlib.asynccontextmanager
+    async def _lease(self):
+        """
+        Yields the session for the running loop, which is kept open until
+        the block exits.
+        """
+        if self._session is not None:
+            yield self._session
+            return
+
+        loop_session = self._loop_session()
+        loop_session.users += 1
+        try:
+            yield loop_session.session
+        finally:
+            loop_session.users -= 1
+
+            if not self.keep_alive and loop_session.users == 0:
+                await self._close_loop_session()
+
+    async def _close_loop_session(self):
+        # Unregistered before closing, so a request that starts while we
+        # wait on the close gets a new session rather than this one.
+        loop_session = self._sessions.pop(asyncio.get_running_loop(), None)
+        if loop_session is not None:
+            await loop_session.session.close()
+
+    async def close(self):
+        """
+        Closes the session of the running event loop, unless it was passed
+        in by the caller.
+        """
+        self._forget_closed_loops()
+
+        await self._close_loop_session()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def _pay_invoice(self, invoice):
+        # Nodes with pay report the fee and whether anything was paid,
+        # which settles the budget exactly.
+        pay = getattr(self.lnd_node, 'pay', self.lnd_node.pay_invoice)
+        if inspect.iscoroutinefunction(pay):
+            return await pay(invoice)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, pay, invoice)
+
+    async def _L402_auth(self, response):
+        # Unlike requests, aiohttp doesn't fold repeated headers.
+        challenge = read_challenge(response.headers.getall(AUTH_HEADER, ()))
+
+        with paying(challenge, str(response.url), self.metrics,
+                    self.spending_limits,
+                    node_fee_limit(self.lnd_node)) as payment:
+            pre_image = payment.record(
+                await self._pay_invoice(challenge.invoice),
+            )
+
+        return challenge_token(challenge, pre_image)
+
+    async def _obtain_token(self, scope, response, stale_token):
+        token = fresh_token(self.token_store, scope, stale_token)
+        if token is not None:
+            return token
+
+        token = await self._L402_auth(response)
+        self.token_store.put(scope, token)
+
+        return token
+
+    async def _send(self, session, method, url, **kwargs):
+        response = await session.request(method, url, **kwargs)
+        body = await response.read()
+
+        if self.metrics.enabled:
+            sent = response.request_info.headers.get('Content-Length')
+            if sent:
+                self.metrics.incr(METRIC_BYTES_SENT, int(sent))
+
+            self.metrics.incr(METRIC_BYTES_RECEIVED, len(body))
+
+        return response
+
+    async def request(self, method, url, **kwargs):
+        # One session for the request and its retry, so it isn't closed
+        # while we're paying.
+        async with self._lease() as session:
+            return await self._request(session, method, url, **kwargs)
+
+    async def _request(self, session, method, url, **kwargs):
+        scope = token_scope(url, self.scope_depth)
+
+        start = time.perf_counter()
+
+        token = self.token_store.get(scope)
+        if token is not None:
+            kwargs['headers'] = with_token(kwargs.get('headers'), token)
+
+        response = await self._send(session, method, url, **kwargs)
+
+        if response.status != L402_ERROR_CODE:
+            self.metrics.observe(
+                METRIC_REQUEST_SECONDS, time.perf_counter() - start,
+            )
+            return response
+
+        challenged = time.perf_counter()
+        self.metrics.incr(METRIC_CHALLENGES)
+
+        if token is not None:
+            reject_token(self.token_store, self.metrics, scope, token)
+
+        log.debug("Got L402 challenge for %s", url)
+
+        stale_token = token
+        token = await self._single_flight.do(
+            scope,
+            lambda: self._obtain_token(scope, response, stale_token),
+        )
+
+        kwargs['headers'] = with_token(kwargs.get('headers'), token)
+
+        retry_start = time.perf_counter()
+        self.metrics.observe(
+            METRIC_CHALLENGE_TO_PAYMENT_SECONDS, retry_start - challenged,
+        )
+
+        response = await self._send(session, method, url, **kwargs)
+
+        end = time.perf_counter()
+        self.metrics.observe(METRIC_RETRY_SECONDS, end - retry_start)
+        self.metrics.observe(METRIC_REQUEST_SECONDS, end - start)
+
+        return response
+
+    async def gather(self, urls, method='get', limit=None, **kwargs):
+        """
+        Issues the same kind of request to each of urls concurrently, with
+        at most limit (by default the connector limit) in flight at once.
+
+        Returns a BatchResult per URL in the same order as urls, carrying
+        either the response or the exception its request raised.
+        """
+        urls = list(urls)
+        if not urls:
+            return []
+
+        semaphore = asyncio.Semaphore(limit or self.limit or len(urls))
+
+        async def fetch(url):
+            async with semaphore:
+                try:
+                    response = await self.request(
+                        method.upper(), url, **kwargs,
+                    )
+                except Exception as e:
+                    return BatchResult(url, error=e)
+
+            return BatchResult(url, response=response)
+
+        return list(await asyncio.gather(*(fetch(url) for url in urls)))
+
+    async def get(self, url, **kwargs):
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url, data=None, json=None, **kwargs):
+        return await self.request('POST', url, data=data, json=json, **kwargs)
+
+    async def put(self, url, data=None, **kwargs):
+        return await self.request('PUT', url, data=data, **kwargs)
+
+    async def delete(self, url, **kwargs):
+        return await self.request('DELETE', url, **kwargs)
+
+    async def head(self, url, **kwargs):
+        return await self.request('HEAD', url, **kwargs)
+
+    async def patch(self, url, data=None, **kwargs):
+        return await self.request('PATCH', url, data=data, **kwargs)
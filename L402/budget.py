@@ -0,0 +1,141 @@
+import contextlib
+import threading
+
+from .exceptions import AmountlessInvoiceError, BudgetExceededError
+from .exceptions import PriceLimitExceededError
+
+
+def _sat_to_msat(amount_sat):
+    return None if amount_sat is None else int(amount_sat * 1000)
+
+
+class Reservation(object):
+    """
+    Funds held against the budget for one payment: its price plus the most
+    it may cost in routing fees. Unless settled, all of it is counted as
+    spent once the payment completes.
+    """
+
+    def __init__(self, price_msat, fee_limit_msat):
+        self.price_msat = price_msat
+        self.reserved_msat = price_msat + fee_limit_msat
+        self.spent_msat = self.reserved_msat
+
+    def settle(self, paid, fee_msat=None):
+        """
+        Records how the payment went: nothing is spent if it turned out not
+        to need paying, and otherwise its price plus fee_msat, if known.
+        """
+        if not paid:
+            self.spent_msat = 0
+        elif fee_msat is not None:
+            self.spent_msat = self.price_msat + fee_msat
+
+
+class SpendingLimits(object):
+    """
+    Caps what the L402 wrappers may pay, checked against the locally
+    decoded invoice amount before any payment is attempted.
+
+    max_price_sat limits any single invoice. endpoint_max_price_sat maps URL
+    prefixes to tighter or looser per-endpoint limits, the longest matching
+    prefix taking precedence. budget_sat caps the total paid across all
+    requests, routing fees included. Invoices without an amount are refused
+    once any limit applies, as their price can't be checked.
+
+    Concurrent payments reserve their amount plus their fee limit against
+    the budget up front, so in-flight payments can't jointly overrun it.
+    Once a payment completes only what it actually cost is counted.
+    """
+
+    def __init__(self, max_price_sat=None, endpoint_max_price_sat=None,
+                 budget_sat=None):
+
+        self.max_price_msat = _sat_to_msat(max_price_sat)
+        self.budget_msat = _sat_to_msat(budget_sat)
+
+        self._endpoint_limits = sorted(
+            (
+                (prefix, _sat_to_msat(limit))
+                for prefix, limit in (endpoint_max_price_sat or {}).items()
+            ),
+            key=lambda entry: len(entry[0]), reverse=True,
+        )
+
+        self._lock = threading.Lock()
+        self._reserved_msat = 0
+        self.spent_msat = 0
+
+    @property
+    def remaining_msat(self):
+        if self.budget_msat is None:
+            return None
+
+        with self._lock:
+            return self.budget_msat - self.spent_msat - self._reserved_msat
+
+    def price_limit_msat(self, url):
+        for prefix, limit in self._endpoint_limits:
+            if url.startswith(prefix):
+                return limit
+
+        return self.max_price_msat
+
+    def reserve(self, url, price_msat, fee_limit_msat=0):
+        """
+        Checks price_msat against the limits for url and reserves it, plus
+        fee_limit_msat, against the budget. Returns the Reservation.
+        """
+        limit_msat = self.price_limit_msat(url)
+
+        if price_msat == 0 and (
+            limit_msat is not None or self.budget_msat is not None
+        ):
+            raise AmountlessInvoiceError(
+                "refusing amountless invoice for {}".format(url),
+            )
+
+        if limit_msat is not None and price_msat > limit_msat:
+            raise PriceLimitExceededError(url, price_msat, limit_msat)
+
+        reservation = Reservation(price_msat, fee_limit_msat)
+
+        with self._lock:
+            if self.budget_msat is not None:
+                remaining_msat = (
+                    self.budget_msat - self.spent_msat - self._reserved_msat
+                )
+                if reservation.reserved_msat > remaining_msat:
+                    raise BudgetExceededError(
+                        price_msat, remaining_msat, fee_limit_msat,
+                    )
+
+            self._reserved_msat += reservation.reserved_msat
+
+        return reservation
+
+    def release(self, reservation, paid):
+        """
+        Returns a reservation to the budget, counting what it spent if the
+        payment went through.
+        """
+        with self._lock:
+            self._reserved_msat -= reservation.reserved_msat
+            if paid:
+                self.spent_msat += reservation.spent_msat
+
+    @contextlib.contextmanager
+    def payment(self, url, price_msat, fee_limit_msat=0):
+        """
+        Reserves price_msat plus fee_limit_msat for the duration of the
+        block, which is given the Reservation to settle. What it spent is
+        counted if the block completes, and it's released if it raises.
+        """
+        reservation = self.reserve(url, price_msat, fee_limit_msat)
+        try:
+            yield reservation
+        except BaseException:
+            self.release(reservation, paid=False)
+            raise
+
+        self.release(reservation, paid=True)
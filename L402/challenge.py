@@ -0,0 +1,173 @@
+from types import MappingProxyType
+from typing import Mapping, NamedTuple, Optional, Tuple
+
+import functools
+import re
+
+from .exceptions import InvalidChallengeError
+
+# The scheme names an L402 challenge may be issued under. LSAT is the
+# original name and is still sent by older servers, often alongside L402.
+L402_SCHEMES = ('L402', 'LSAT')
+
+# Grammar from RFC 7235 section 2.1:
+#
+#   challenge  = auth-scheme [ 1*SP ( token68 / #auth-param ) ]
+#   auth-param = token BWS "=" BWS ( token / quoted-string )
+#
+# Each match consumes the separators before it and then either an auth-param
+# of the current challenge or the scheme (plus optional token68) of a new
+# one. An auth-param is tried first, as "scheme param=value" can't match it:
+# the scheme must be followed by "=" to be read as a parameter name.
+#
+# Quoted strings are first scanned up to the next quote, which the regex
+# engine does far faster than a class excluding both quote and backslash.
+# Only if the value contains a backslash, and so may end on an escaped quote,
+# is it rescanned with the full quoted-string rule.
+_TOKEN = r"[!#$%&'*+\-.^_`|~0-9A-Za-z]+"
+_CHALLENGE_PART_RE = re.compile(r'''
+    [\s,]*
+    (?:
+        (?P<name>{token})[ \t]*=[ \t]*
+        (?:(?P<value>{token})|"(?P<quoted>[^"]*)")
+      |
+        (?P<scheme>{token})
+        (?:[ \t]+(?P<token68>[A-Za-z0-9\-._~+/]+=*)(?=[ \t]*(?:,|$)))?
+    )
+'''.format(token=_TOKEN), re.VERBOSE)
+
+_SEPARATORS = ' \t\r\n,'
+_QUOTED_STRING_RE = re.compile(r'"([^"\\]*(?:\\.[^"\\]*)*)"')
+_QUOTED_PAIR_RE = re.compile(r'\\(.)')
+
+
+class Challenge(NamedTuple):
+    """
+    A single authentication challenge. Parameter names are lower cased, as
+    they're matched case-insensitively.
+    """
+
+    scheme: str
+    params: Mapping[str, str]
+    token68: Optional[str] = None
+
+
+class L402Challenge(NamedTuple):
+    """
+    The parts of an L402 challenge needed to pay for and present a token.
+    """
+
+    scheme: str
+    macaroon: str
+    invoice: str
+
+
+@functools.lru_cache(maxsize=1024)
+def parse_challenges(auth_header) -> Tuple[Challenge, ...]:
+    """
+    Parses every challenge in a WWW-Authenticate header value. Several
+    headers may be passed joined by commas, as done by requests.
+    """
+    challenges = []
+
+    scheme = None
+    token68 = None
+    params = {}
+
+    # Trailing separators are dropped up front so that every iteration is a
+    # single match that either makes progress or fails.
+    pos = 0
+    end = len(auth_header.rstrip(_SEPARATORS))
+    while pos < end:
+        match = _CHALLENGE_PART_RE.match(auth_header, pos, end)
+        if match is None:
+            raise InvalidChallengeError(
+                "malformed challenge at offset {}: {!r}".format(
+                    pos, auth_header,
+                ),
+            )
+        pos = match.end()
+
+        name, value, quoted, new_scheme, new_token68 = match.group(
+            'name', 'value', 'quoted', 'scheme', 'token68',
+        )
+
+        if name is None:
+            if scheme is not None:
+                challenges.append(Challenge(
+                    scheme, MappingProxyType(params), token68,
+                ))
+
+            scheme = new_scheme
+            token68 = new_token68
+            params = {}
+            continue
+
+        if scheme is None:
+            raise InvalidChallengeError(
+                "auth-param before any scheme: {!r}".format(auth_header),
+            )
+
+        if value is None:
+            value = quoted
+            if '\\' in value:
+                quoted_match = _QUOTED_STRING_RE.match(
+                    auth_header, match.start('quoted') - 1, end,
+                )
+                if quoted_match is None:
+                    raise InvalidChallengeError(
+                        "unterminated quoted string: {!r}".format(
+                            auth_header,
+                        ),
+                    )
+
+                value = _QUOTED_PAIR_RE.sub(r'\1', quoted_match.group(1))
+                pos = quoted_match.end()
+
+        params[name.lower()] = value
+
+    if scheme is not None:
+        challenges.append(Challenge(scheme, MappingProxyType(params), token68))
+
+    return tuple(challenges)
+
+
+def _select_L402_challenge(challenges):
+    candidates = {}
+    for challenge in challenges:
+        scheme = challenge.scheme.upper()
+        if scheme not in L402_SCHEMES or scheme in candidates:
+            continue
+
+        macaroon = challenge.params.get('macaroon')
+        invoice = challenge.params.get('invoice')
+        if not macaroon or not invoice:
+            continue
+
+        candidates[scheme] = L402Challenge(scheme, macaroon, invoice)
+
+    for scheme in L402_SCHEMES:
+        if scheme in candidates:
+            return candidates[scheme]
+
+    return None
+
+
+@functools.lru_cache(maxsize=1024)
+def parse_L402_challenge(auth_header) -> L402Challenge:
+    """
+    Picks the L402 challenge out of a WWW-Authenticate header value,
+    preferring the L402 scheme over LSAT when the server offers both.
+    Results are cached, so the header of a challenge shared by concurrent
+    requests is only parsed once.
+    """
+    if not auth_header:
+        raise InvalidChallengeError("missing WWW-Authenticate header")
+
+    challenge = _select_L402_challenge(parse_challenges(auth_header))
+    if challenge is None:
+        raise InvalidChallengeError(
+            "no L402 challenge in header: {!r}".format(auth_header),
+        )
+
+    return challenge
@@ -0,0 +1,75 @@
+class L402Error(Exception):
+    """
+    Base class for all errors raised while handling L402 payments.
+    """
+
+
+class InvalidChallengeError(L402Error, ValueError):
+    """
+    Raised when a 402 response doesn't carry a usable L402 challenge.
+    """
+
+
+class InvoiceExpiredError(L402Error):
+    """
+    Raised instead of attempting to pay a challenge invoice that has
+    already expired.
+    """
+
+
+class PaymentRefusedError(L402Error):
+    """
+    Raised when a challenge invoice is refused by the configured spending
+    limits. No payment is attempted.
+    """
+
+
+class PriceLimitExceededError(PaymentRefusedError):
+    """
+    Raised when an invoice asks for more than the price limit of the
+    endpoint it was issued for.
+    """
+
+    def __init__(self, url, price_msat, limit_msat):
+        super().__init__(
+            "invoice for {} asks {} msat, over the limit of {} msat".format(
+                url, price_msat, limit_msat,
+            ),
+        )
+
+        self.url = url
+        self.price_msat = price_msat
+        self.limit_msat = limit_msat
+
+
+class BudgetExceededError(PaymentRefusedError):
+    """
+    Raised when paying an invoice, with the most it may cost in routing
+    fees, could overrun the global budget.
+    """
+
+    def __init__(self, price_msat, remaining_msat, fee_limit_msat=0):
+        super().__init__(
+            "invoice asks {} msat plus up to {} msat in fees, but only {} "
+            "msat of budget remain".format(
+                price_msat, fee_limit_msat, remaining_msat,
+            ),
+        )
+
+        self.price_msat = price_msat
+        self.remaining_msat = remaining_msat
+        self.fee_limit_msat = fee_limit_msat
+
+
+class AmountlessInvoiceError(PaymentRefusedError):
+    """
+    Raised when spending limits are configured and an invoice doesn't
+    specify an amount, so its price can't be checked.
+    """
+
+
+class DownloadError(L402Error):
+    """
+    Raised when a download can't be completed: it kept being interrupted,
+    or the server stopped serving the byte ranges it was asked for.
+    """
@@ -1,5 +1,3 @@
-import requests
-
 from typing import Any, Dict, Optional
 from langchain.chains.api.prompt import API_RESPONSE_PROMPT, API_URL_PROMPT
 from langchain.chains import APIChain
@@ -7,12 +5,24 @@ from langchain.prompts import BasePromptTemplate
 from langchain.base_language import BaseLanguageModel
 from langchain.chains.llm import LLMChain
 
+from .aiohttp_l402 import AsyncRequestsL402Wrapper
 from .requests_l402 import RequestsL402Wrapper
 from .requests_l402 import ResponseTextWrapper
+from .token_store import TokenStore
 
 from lightning import LightningNode
 
 class L402APIChain(APIChain):
+    """
+    An APIChain that pays for L402 protected endpoints. Both run and arun
+    are supported, the latter paying and fetching without blocking the
+    event loop.
+
+    arun doesn't hold on to its aiohttp session between calls, so each call
+    can run on its own event loop. close, or aclose from a coroutine,
+    releases the blocking wrapper's pooled connections.
+    """
+
     requests_wrapper: Any
 
     @classmethod
@@ -28,9 +38,20 @@ class L402APIChain(APIChain):
     ) -> APIChain:
         """Load chain from just an LLM and the api docs."""
 
-        requests_L402 = RequestsL402Wrapper(lightning_node, requests)
+        # The blocking and async wrappers share one token store, so a token
+        # paid for on one path is reused by the other.
+        token_store = TokenStore()
+
+        requests_L402 = RequestsL402Wrapper.with_session(
+                lightning_node, headers=headers, token_store=token_store,
+        )
+        async_requests_L402 = AsyncRequestsL402Wrapper(
+                lightning_node, headers=headers, token_store=token_store,
+                keep_alive=False,
+        )
         lang_chain_request_L402 = ResponseTextWrapper(
                 requests_wrapper=requests_L402,
+                async_requests_wrapper=async_requests_L402,
         )
 
         get_request_chain = LLMChain(llm=llm, prompt=api_url_prompt)
@@ -43,3 +64,9 @@ class L402APIChain(APIChain):
             api_docs=api_docs,
             **kwargs,
         )
+
+    def close(self):
+        self.requests_wrapper.close()
+
+    async def aclose(self):
+        await self.requests_wrapper.aclose()
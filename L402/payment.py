@@ -0,0 +1,198 @@
+"""
+The parts of answering a 402 that don't depend on how requests are sent,
+shared by RequestsL402Wrapper and AsyncRequestsL402Wrapper: reading the
+challenge, checking and accounting for its payment, and keeping track of
+the tokens it buys.
+"""
+
+import contextlib
+import logging
+import time
+
+from lightning import bolt11
+from lightning.lightning import PaymentResult, default_fee_limit_msat
+
+from .challenge import parse_L402_challenge
+from .exceptions import InvalidChallengeError, InvoiceExpiredError
+from .token_store import L402Token
+
+L402_ERROR_CODE = 402
+
+AUTH_HEADER = "WWW-Authenticate"
+
+# Names of the metrics reported to the wrappers' metrics sink.
+METRIC_REQUEST_SECONDS = "l402_request_seconds"
+METRIC_CHALLENGES = "l402_challenges_total"
+METRIC_TOKEN_REJECTIONS = "l402_token_rejections_total"
+METRIC_CHALLENGE_TO_PAYMENT_SECONDS = "l402_challenge_to_payment_seconds"
+METRIC_PAYMENTS = "l402_payments_total"
+METRIC_PAYMENT_FAILURES = "l402_payment_failures_total"
+METRIC_PAYMENT_SECONDS = "l402_payment_seconds"
+METRIC_PAID_MSAT = "l402_paid_msat_total"
+METRIC_RETRY_SECONDS = "l402_retry_seconds"
+METRIC_BYTES_SENT = "l402_bytes_sent_total"
+METRIC_BYTES_RECEIVED = "l402_bytes_received_total"
+
+log = logging.getLogger(__name__)
+
+
+def read_challenge(header_values):
+    """
+    Picks the L402 challenge out of a response's WWW-Authenticate header
+    values. Servers commonly send one header per challenge, which requests
+    folds into one and aiohttp doesn't.
+    """
+    return parse_L402_challenge(', '.join(v for v in header_values if v))
+
+
+def _decode_invoice(invoice, required=False):
+    """
+    Decodes a challenge invoice locally so it can be checked before paying
+    it. Unless required, returns None if it can't be decoded, leaving that
+    to the node.
+    """
+    try:
+        pay_req = bolt11.decode(invoice)
+    except ValueError as e:
+        if required:
+            raise InvalidChallengeError(
+                "unable to decode L402 invoice: {}".format(e),
+            ) from e
+
+        log.warning("Unable to decode L402 invoice locally: %s", e)
+        return None
+
+    if pay_req.timestamp + pay_req.expiry < time.time():
+        raise InvoiceExpiredError(
+            "invoice {} expired".format(pay_req.payment_hash),
+        )
+
+    return pay_req
+
+
+def _spending(spending_limits, url, pay_req, fee_limit_msat):
+    if spending_limits is None:
+        return contextlib.nullcontext()
+
+    return spending_limits.payment(
+        url, pay_req.num_msat, fee_limit_msat(pay_req.num_msat),
+    )
+
+
+def node_fee_limit(lnd_node):
+    """
+    Returns lnd_node's fee limit policy, a function of the amount paid in
+    msat, falling back to lnd's default for nodes that don't have one.
+    """
+    return getattr(lnd_node, 'fee_limit_msat', default_fee_limit_msat)
+
+
+class _Payment(object):
+    """
+    Yielded by paying, to record the outcome of the payment on.
+    """
+
+    def __init__(self):
+        self.result = None
+
+    def record(self, result):
+        """
+        Takes what the node's pay or pay_invoice returned and returns the
+        preimage. pay_invoice only returns the preimage, so the payment is
+        taken to have been made, at an unknown fee.
+        """
+        if not isinstance(result, PaymentResult):
+            result = PaymentResult(result, fee_msat=None)
+
+        self.result = result
+
+        return result.preimage
+
+
+@contextlib.contextmanager
+def paying(challenge, url, metrics, spending_limits=None,
+           fee_limit_msat=default_fee_limit_msat):
+    """
+    Wraps paying challenge's invoice for url. The invoice is checked
+    against spending_limits before the block runs, reserving its price plus
+    fee_limit_msat(price) of the budget. The block records the outcome on
+    the _Payment it's given, which settles what was really spent, and the
+    payment, or its failure, is reported to metrics.
+    """
+    pay_req = _decode_invoice(
+        challenge.invoice, required=spending_limits is not None,
+    )
+    if pay_req is not None:
+        log.debug(
+            "Paying L402 invoice %s of %d msat for %s",
+            pay_req.payment_hash, pay_req.num_msat, url,
+        )
+
+    payment = _Payment()
+
+    start = time.perf_counter()
+    try:
+        with _spending(spending_limits, url, pay_req,
+                       fee_limit_msat) as reservation:
+            yield payment
+
+            if reservation is not None:
+                reservation.settle(
+                    payment.result.paid, payment.result.fee_msat,
+                )
+    except Exception:
+        metrics.incr(METRIC_PAYMENT_FAILURES)
+        raise
+    elapsed = time.perf_counter() - start
+
+    if not payment.result.paid:
+        log.info("L402 invoice for %s had already been paid", url)
+        return
+
+    metrics.incr(METRIC_PAYMENTS)
+    metrics.observe(METRIC_PAYMENT_SECONDS, elapsed)
+    if pay_req is not None:
+        metrics.incr(METRIC_PAID_MSAT, pay_req.num_msat)
+
+    log.info("Paid L402 invoice for %s in %.3fs", url, elapsed)
+
+
+def challenge_token(challenge, preimage):
+    return L402Token(
+        macaroon=challenge.macaroon, preimage=preimage,
+        scheme=challenge.scheme,
+    )
+
+
+def fresh_token(token_store, scope, stale_token):
+    """
+    Returns the token stored for scope unless it's stale_token: another
+    caller may have paid for the scope between our request going out and
+    the 402 coming back, in which case we reuse its token rather than
+    paying again.
+    """
+    token = token_store.get(scope)
+    if token is not None and token != stale_token:
+        return token
+
+    return None
+
+
+def reject_token(token_store, metrics, scope, token):
+    """
+    Drops a cached token the server no longer accepts, before paying for a
+    new one.
+    """
+    metrics.incr(METRIC_TOKEN_REJECTIONS)
+    log.info("Cached L402 token for %s was rejected", scope)
+
+    token_store.invalidate(scope, token)
+
+
+def with_token(headers, token):
+    # Copy the caller's headers rather than updating them in place, as the
+    # same dict is often reused across requests.
+    headers = dict(headers or {})
+    headers['Authorization'] = token.authorization
+
+    return headers
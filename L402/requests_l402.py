@@ -1,66 +1,853 @@
 from pydantic import BaseModel
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-from typing import Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, NamedTuple, Optional
 
-import requests
+import contextlib
+import logging
+import os
 import re
+import requests
+import tempfile
+import time
 
-L402_ERROR_CODE = 402
+from metrics import NullMetricsSink
 
-AUTH_HEADER = "WWW-Authenticate"
+from .exceptions import DownloadError
+from .payment import AUTH_HEADER, L402_ERROR_CODE
+from .payment import METRIC_BYTES_RECEIVED, METRIC_BYTES_SENT
+from .payment import METRIC_CHALLENGES, METRIC_CHALLENGE_TO_PAYMENT_SECONDS
+from .payment import METRIC_REQUEST_SECONDS, METRIC_RETRY_SECONDS
+from .payment import challenge_token, fresh_token, node_fee_limit, paying
+from .payment import read_challenge, reject_token, with_token
+from .single_flight import SingleFlight
+from .token_store import TokenStore, token_scope
 
-class RequestsL402Wrapper(object):
+# Request bodies that can only be read once (generators, iterators and
+# unseekable files) are buffered so the paid retry can send them again: in
+# memory up to this many bytes, in a temporary file beyond it.
+DEFAULT_SPOOL_THRESHOLD = 1 << 20
+
+# Ways of finding out whether a request needs paying for before sending a
+# body that can only be read once: a HEAD request, or the request itself
+# with an empty body.
+PROBE_HEAD = 'head'
+PROBE_EMPTY = 'empty'
+
+# Downloads are written this many bytes at a time, and resumed from where
+# an interruption left off up to DEFAULT_MAX_RESUMES times.
+DEFAULT_DOWNLOAD_CHUNK_SIZE = 1 << 16
+DEFAULT_MAX_RESUMES = 3
+
+# A download is written to its path plus this suffix until it completes.
+PART_SUFFIX = '.part'
+
+# The validator a part file's bytes were served with is kept next to it, at
+# its path plus this suffix, so a later call can resume it with If-Range.
+VALIDATOR_SUFFIX = '.validator'
+
+_SPOOL_CHUNK_SIZE = 1 << 16
+
+_BODY_METHODS = frozenset(('post', 'put', 'patch'))
+
+# Body types requests can send any number of times.
+_REPLAYABLE_BODY_TYPES = (bytes, bytearray, str, dict, list, tuple)
+
+# Arguments a probe doesn't pass on from the request it stands in for.
+_PROBE_EXCLUDED_KWARGS = frozenset(('url', 'data', 'json', 'files', 'stream'))
+
+_CONTENT_RANGE = re.compile(r'bytes\s+(?:(\d+)-(\d+)|\*)/(\d+|\*)')
+
+# Errors that cut a transfer short, after which a download is resumed.
+_TRANSFER_ERRORS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.ChunkedEncodingError,
+    requests.exceptions.Timeout,
+)
+
+log = logging.getLogger(__name__)
+
+class BatchResult(NamedTuple):
     """
+    The outcome of one request in a batch: either the response or the
+    exception the request raised.
     """
 
-    def __init__(self, lnd_node, requests):
-        self.lnd_node = lnd_node
-        self.requests = requests
+    url: str
+    response: Optional[Any] = None
+    error: Optional[BaseException] = None
 
-    def _L402_auth(self, response):
-        auth_header = response.headers.get(AUTH_HEADER)
+    @property
+    def ok(self):
+        return self.error is None
 
-        # Extract macaroon value
-        macaroon = re.search(r'macaroon="(.*?)"', auth_header).group(1)
+class DownloadResult(NamedTuple):
+    """
+    A completed download: the path it was written to, its size in bytes,
+    and how many times it was resumed after being interrupted.
+    """
 
-        # Extract invoice value
-        invoice = re.search(r'invoice="(.*?)"', auth_header).group(1)
+    path: str
+    size: int
+    resumes: int = 0
 
-        print("Paying invoice: ", invoice)
+def _body_chunks(data):
+    if hasattr(data, 'read'):
+        while True:
+            chunk = data.read(_SPOOL_CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+    else:
+        for chunk in data:
+            yield chunk.encode('utf-8') if isinstance(chunk, str) else chunk
 
-        pre_image = self.lnd_node.pay_invoice(invoice)
 
-        print("Obtained preimage: ", pre_image)
+def _spool(data, threshold):
+    """
+    Reads a body that can only be read once, returning bytes if it's no
+    larger than threshold, or otherwise a temporary file holding it.
+    """
+    chunks = _body_chunks(data)
 
-        headers = {
-            'Authorization': 'LSAT {macaroon}:{pre_image}'.format(
-                macaroon=macaroon, pre_image=pre_image,
-            ),
-        }
+    buffered = []
+    size = 0
+    for chunk in chunks:
+        buffered.append(chunk)
+        size += len(chunk)
 
-        print("Assembling final authorization header: ", headers)
+        if size > threshold:
+            spooled = tempfile.TemporaryFile()
+            spooled.writelines(buffered)
+            spooled.writelines(chunks)
+            spooled.seek(0)
 
-        return headers
+            return spooled
+
+    return b''.join(buffered)
+
+
+def _body_kwargs(args, kwargs):
+    # post(url, data, json) and put/patch(url, data) may be passed their
+    # body positionally; move it into kwargs so it can be swapped out.
+    if len(args) > 1:
+        kwargs['data'] = args[1]
+        if len(args) > 2:
+            kwargs['json'] = args[2]
+
+        args = args[:1]
+
+    return args, kwargs
+
+
+class _BodyPart(object):
+    """
+    Keeps one stream of a request body, its data or an uploaded file,
+    sendable a second time. Seekable files are rewound to where they
+    started; streams that can only be read once are flagged as such until
+    they're spooled.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.once = False
+
+        self._position = None
+        self._spooled = None
+
+        if data is None or isinstance(data, _REPLAYABLE_BODY_TYPES):
+            return
+
+        try:
+            if data.seekable():
+                self._position = data.tell()
+                return
+        except (AttributeError, OSError, ValueError):
+            pass
+
+        self.once = True
+
+    def spool(self, threshold):
+        self.data = _spool(self.data, threshold)
+        self.once = False
+
+        if not isinstance(self.data, bytes):
+            self._spooled = self.data
+            self._position = 0
+
+    def rewind(self):
+        if self._position is not None:
+            self.data.seek(self._position)
+
+    def close(self):
+        if self._spooled is not None:
+            self._spooled.close()
+
+
+class _RequestBody(object):
+    """
+    Keeps a request's body, its data and any files it uploads, sendable a
+    second time for the paid retry.
+    """
+
+    def __init__(self, data, files=None):
+        self._data = _BodyPart(data)
+        self._files = None
+
+        if files is not None:
+            items = files.items() if isinstance(files, dict) else files
+
+            # requests takes each file as the file itself or as a tuple
+            # (filename, file[, content_type[, headers]]).
+            self._files = [
+                (name, value, _BodyPart(
+                    value[1] if isinstance(value, (tuple, list)) else value,
+                ))
+                for name, value in items
+            ]
+
+    @property
+    def _parts(self):
+        yield self._data
+        for _, _, part in self._files or ():
+            yield part
+
+    @property
+    def once(self):
+        return any(part.once for part in self._parts)
+
+    def spool(self, threshold, kwargs):
+        """
+        Spools the parts that can only be read once, updating the request's
+        kwargs to send the spooled copies.
+        """
+        for part in self._parts:
+            if part.once:
+                part.spool(threshold)
+
+        kwargs['data'] = self._data.data
+        if self._files is not None:
+            kwargs['files'] = [
+                (name, self._file(name, value, part))
+                for name, value, part in self._files
+            ]
+
+    @staticmethod
+    def _file(name, value, part):
+        if isinstance(value, (tuple, list)):
+            return (value[0], part.data) + tuple(value[2:])
+
+        if part.data is value:
+            return value
+
+        # The spooled copy no longer carries the original's file name.
+        return (requests.utils.guess_filename(value) or name, part.data)
+
+    def rewind(self):
+        for part in self._parts:
+            part.rewind()
+
+    def close(self):
+        for part in self._parts:
+            part.close()
 
-    def _L402(func):
-        def wrapper(self, *args, **kwargs):
-            requests_func = getattr(self.requests, func.__name__)
 
-            response = requests_func(*args, **kwargs)
+def _open_part(path):
+    # Writable at any offset, without truncating what an earlier attempt
+    # left behind.
+    return os.fdopen(os.open(path, os.O_RDWR | os.O_CREAT, 0o644), 'r+b')
 
-            if response.status_code != L402_ERROR_CODE:
-                return response
 
-            print("L402 error path={path}, attempting to pay invoice and retry request...".format(path=args[0]))
+def _content_range(response):
+    """
+    Parses a response's Content-Range into (first, last, total), each None
+    where the server left it out. Returns None if there isn't one.
+    """
+    match = _CONTENT_RANGE.fullmatch(
+        response.headers.get('Content-Range', '').strip(),
+    )
+    if match is None:
+        return None
+
+    return tuple(
+        int(value) if value and value != '*' else None
+        for value in match.groups()
+    )
+
+
+def _load_validator(path):
+    try:
+        with open(path) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _remove(path):
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(path)
+
+
+def _validator(response):
+    # If-Range only accepts a strong ETag or a Last-Modified date.
+    etag = response.headers.get('ETag')
+    if etag and not etag.startswith('W/'):
+        return etag
+
+    return response.headers.get('Last-Modified')
+
+
+class _Download(object):
+    """
+    What the requests making up one download share: the resource's size,
+    once known, and the validator it was first served with, sent as
+    If-Range so resumed ranges only come from that same version of it.
+
+    Once validator_path is set, the validator is also saved there for as
+    long as the download is written to the part file, so a later call can
+    tell whether what's in it can be resumed.
+    """
+
+    def __init__(self, wrapper, url, chunk_size, max_resumes, kwargs):
+        self.wrapper = wrapper
+        self.url = url
+        self.chunk_size = chunk_size
+        self.max_resumes = max_resumes
+
+        # Byte ranges are offsets into the body as stored, so it mustn't
+        # be compressed in transit.
+        self.headers = dict(kwargs.pop('headers', None) or {})
+        self.headers.setdefault('Accept-Encoding', 'identity')
+        self.kwargs = kwargs
+
+        self.size = None
+        self.validator = None
+        self.validator_path = None
+
+    def _served_with(self, validator):
+        if validator == self.validator:
+            return
+
+        self.validator = validator
+
+        if self.validator_path is None:
+            return
+
+        if validator is None:
+            _remove(self.validator_path)
+        else:
+            with open(self.validator_path, 'w') as f:
+                f.write(validator)
+
+    def fetch(self, f, start, end=None):
+        """
+        Streams bytes start through end (to the end of the resource if end
+        is None) into f at the same offsets, returning the offset after the
+        last byte written.
+
+        If the server ignores the range, or the resource changed since the
+        download began, the whole body is written from the start of f
+        instead, unless a bounded range was asked for.
+        """
+        headers = dict(self.headers)
+        if start or end is not None:
+            headers['Range'] = 'bytes={}-{}'.format(
+                start, '' if end is None else end,
+            )
+            if self.validator:
+                headers['If-Range'] = self.validator
+
+        response = self.wrapper.get(
+            self.url, **dict(self.kwargs, headers=headers, stream=True),
+        )
+        with contextlib.closing(response):
+            content_range = _content_range(response)
+
+            # Nothing lies past start: an earlier attempt got all of it.
+            if (response.status_code == 416 and end is None and
+                    content_range is not None and content_range[2] == start):
+                self.size = start
+                return start
+
+            response.raise_for_status()
+
+            if response.status_code == 206:
+                if content_range is None or content_range[0] != start:
+                    raise DownloadError(
+                        "{} didn't serve the range from byte {}".format(
+                            self.url, start,
+                        ),
+                    )
+
+                self.size = content_range[2]
+                if self.validator is None:
+                    self._served_with(_validator(response))
+            elif end is not None:
+                raise DownloadError(
+                    "{} stopped serving byte ranges".format(self.url),
+                )
+            else:
+                if start:
+                    log.info("Restarting download of %s", self.url)
+                start = 0
+
+                length = response.headers.get('Content-Length')
+                self.size = int(length) if length else None
+                self._served_with(_validator(response))
+
+                f.truncate(0)
+
+            f.seek(start)
+            for chunk in response.iter_content(self.chunk_size):
+                f.write(chunk)
+
+            return f.tell()
+
+    def fetch_resuming(self, f, start, end=None):
+        """
+        Fetches bytes start through end, resuming from wherever a transfer
+        was cut short up to max_resumes times. Returns how many times it
+        resumed.
+        """
+        resumes = 0
+        while True:
+            f.seek(start)
+
+            error = None
+            try:
+                offset = self.fetch(f, start, end)
+            except _TRANSFER_ERRORS as e:
+                error = e
+                offset = f.tell()
+
+            last = end
+            if last is None and self.size is not None:
+                last = self.size - 1
+
+            if error is None and (last is None or offset > last):
+                return resumes
+
+            if resumes == self.max_resumes:
+                raise DownloadError(
+                    "download of {} was interrupted at byte {}".format(
+                        self.url, offset,
+                    ),
+                ) from error
+
+            resumes += 1
+            start = offset
+
+            log.info(
+                "Resuming download of %s from byte %d: %s", self.url, start,
+                error or "response ended early",
+            )
+
+
+# Only retry on statuses that signal a transient upstream failure. A 402 must
+# never be retried blindly, as it's answered by paying instead.
+RETRY_STATUSES = (502, 503, 504)
+
+def new_session(pool_connections=10, pool_maxsize=10, max_retries=0,
+                backoff_factor=0.0, headers=None):
+    """
+    Returns a requests.Session that keeps up to pool_maxsize warm connections
+    to each of up to pool_connections hosts. Idempotent requests that fail to
+    connect or hit a 502/503/504 are retried up to max_retries times.
+    """
+    retry = Retry(
+        total=max_retries, backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES, raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+        max_retries=retry,
+    )
+
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+
+    if headers:
+        session.headers.update(headers)
+
+    return session
+
+class RequestsL402Wrapper(object):
+    """
+    Wraps the requests API such that any request answered with a 402 is paid
+    for over Lightning and then retried with the resulting L402 token.
+
+    Paid tokens are kept in token_store, keyed by the origin and first
+    scope_depth path segments of the request URL, and attached up front to
+    later requests within the same scope. A new invoice is only paid if the
+    server rejects the cached token. Concurrent requests that hit a 402 for
+    the same scope share a single payment: the first one pays and the rest
+    wait for its token.
+
+    requests may be the requests module itself or a requests.Session. Use
+    with_session to have the wrapper own a pooled session, so the challenge
+    and the paid retry share one warm connection.
+
+    Timings of each stage of a paid request, along with payment and byte
+    counts, are reported to metrics, which defaults to discarding them.
+
+    If spending_limits is set, each invoice's amount is checked against it
+    before paying, raising a PaymentRefusedError if it's over a limit.
+
+    max_workers bounds how many requests map runs at once. It should match
+    the connection pool size, which with_session does by default.
+
+    Request bodies, uploaded files included, are resent as-is on the paid
+    retry; seekable files are rewound first. Bodies that can only be read
+    once, like generators or pipes, are spooled up front (in memory up to
+    spool_threshold bytes, to a temporary file beyond it) unless probe is
+    set. With probe set to PROBE_HEAD or PROBE_EMPTY, a request without a
+    cached token is preceded by a HEAD or empty-bodied probe, which is paid
+    for if challenged, and the body is then streamed exactly once. As it
+    can't be resent, a 402 to that one attempt is returned as-is.
+    """
+
+    def __init__(self, lnd_node, requests, token_store=None, scope_depth=1,
+                 metrics=None, spending_limits=None, max_workers=10,
+                 probe=None, spool_threshold=DEFAULT_SPOOL_THRESHOLD):
+
+        if probe not in (None, PROBE_HEAD, PROBE_EMPTY):
+            raise ValueError("unknown probe: {!r}".format(probe))
 
-            L402_auth_header = self._L402_auth(response)
+        self.lnd_node = lnd_node
+        self.requests = requests
+        self.scope_depth = scope_depth
+        self.spending_limits = spending_limits
+        self.max_workers = max_workers
+        self.probe = probe
+        self.spool_threshold = spool_threshold
+
+        if metrics is None:
+            metrics = NullMetricsSink()
+        self.metrics = metrics
+
+        if token_store is None:
+            token_store = TokenStore()
+        self.token_store = token_store
+
+        self._single_flight = SingleFlight()
+
+    @classmethod
+    def with_session(cls, lnd_node, pool_connections=10, pool_maxsize=10,
+                     max_retries=0, backoff_factor=0.0, headers=None,
+                     **kwargs):
+        """
+        Creates a wrapper backed by its own pooled session, see new_session.
+        """
+        session = new_session(
+            pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+            max_retries=max_retries, backoff_factor=backoff_factor,
+            headers=headers,
+        )
+
+        kwargs.setdefault('max_workers', pool_maxsize)
+
+        return cls(lnd_node, session, **kwargs)
+
+    def close(self):
+        """
+        Closes the pooled connections if the wrapper is backed by a session.
+        """
+        if isinstance(self.requests, requests.Session):
+            self.requests.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _L402_auth(self, response):
+        challenge = read_challenge([response.headers.get(AUTH_HEADER)])
+
+        # Nodes with pay report the fee and whether anything was paid,
+        # which settles the budget exactly.
+        pay = getattr(self.lnd_node, 'pay', self.lnd_node.pay_invoice)
+
+        with paying(challenge, response.url, self.metrics,
+                    self.spending_limits,
+                    node_fee_limit(self.lnd_node)) as payment:
+            pre_image = payment.record(pay(challenge.invoice))
+
+        return challenge_token(challenge, pre_image)
+
+    def _obtain_token(self, scope, response, stale_token):
+        token = fresh_token(self.token_store, scope, stale_token)
+        if token is not None:
+            return token
+
+        token = self._L402_auth(response)
+        self.token_store.put(scope, token)
+
+        return token
+
+    def _record_transfer(self, response, stream):
+        if not self.metrics.enabled:
+            return
+
+        sent = response.request.headers.get('Content-Length')
+        if sent:
+            self.metrics.incr(METRIC_BYTES_SENT, int(sent))
+
+        # A streamed body hasn't been read yet, so fall back to what the
+        # server says it's sending rather than consuming it here.
+        if stream:
+            received = response.headers.get('Content-Length')
+            if received:
+                self.metrics.incr(METRIC_BYTES_RECEIVED, int(received))
+        else:
+            self.metrics.incr(METRIC_BYTES_RECEIVED, len(response.content))
+
+    def _probe(self, method, url, scope, kwargs):
+        """
+        Sends a bodiless stand-in for a request to find out whether it needs
+        paying for, returning the token paid for if it was challenged.
+        """
+        probe_kwargs = {
+            name: value for name, value in kwargs.items()
+            if name not in _PROBE_EXCLUDED_KWARGS
+        }
+
+        if self.probe == PROBE_HEAD:
+            response = self.requests.head(url, **probe_kwargs)
+        else:
+            response = getattr(self.requests, method)(
+                url, data=b'', **probe_kwargs,
+            )
+        self._record_transfer(response, False)
+
+        if response.status_code != L402_ERROR_CODE:
+            return None
 
-            kwargs.setdefault('headers', {})
-            kwargs['headers'].update(L402_auth_header)
+        self.metrics.incr(METRIC_CHALLENGES)
+        log.debug("Got L402 challenge for probe of %s", url)
 
-            return requests_func(*args, **kwargs)
+        return self._single_flight.do(
+            scope, lambda: self._obtain_token(scope, response, None),
+        )
+
+    def _L402(func):
+        def wrapper(self, *args, **kwargs):
+            body = None
+            if func.__name__ in _BODY_METHODS:
+                args, kwargs = _body_kwargs(args, kwargs)
+                body = _RequestBody(kwargs.get('data'), kwargs.get('files'))
+
+            try:
+                return self._request(func.__name__, body, args, kwargs)
+            finally:
+                if body is not None:
+                    body.close()
         return wrapper
 
+    def _request(self, method, body, args, kwargs):
+        requests_func = getattr(self.requests, method)
+
+        url = args[0] if args else kwargs['url']
+        scope = token_scope(url, self.scope_depth)
+
+        stream = kwargs.get('stream', False)
+
+        start = time.perf_counter()
+
+        token = self.token_store.get(scope)
+
+        # A body that can only be read once is either spooled so the paid
+        # retry can resend it, or sent just once after a probe.
+        send_once = body is not None and body.once
+        if send_once and self.probe is None:
+            body.spool(self.spool_threshold, kwargs)
+            send_once = False
+        elif send_once and token is None:
+            token = self._probe(method, url, scope, kwargs)
+
+        if token is not None:
+            kwargs['headers'] = with_token(kwargs.get('headers'), token)
+
+        response = requests_func(*args, **kwargs)
+        self._record_transfer(response, stream)
+
+        if response.status_code != L402_ERROR_CODE:
+            self.metrics.observe(
+                METRIC_REQUEST_SECONDS, time.perf_counter() - start,
+            )
+            return response
+
+        challenged = time.perf_counter()
+        self.metrics.incr(METRIC_CHALLENGES)
+
+        # If we sent a cached token, the server no longer accepts it, so
+        # drop it before paying for a new one.
+        if token is not None:
+            reject_token(self.token_store, self.metrics, scope, token)
+
+        log.debug("Got L402 challenge for %s", url)
+
+        # The body has been consumed, so the challenge can't be answered.
+        if send_once:
+            self.metrics.observe(METRIC_REQUEST_SECONDS, challenged - start)
+            return response
+
+        # A streamed challenge holds on to its connection until its body is
+        # read. It's short, so read it and let the retry reuse it.
+        if stream:
+            response.content
+
+        stale_token = token
+        token = self._single_flight.do(
+            scope,
+            lambda: self._obtain_token(scope, response, stale_token),
+        )
+
+        kwargs['headers'] = with_token(kwargs.get('headers'), token)
+        if body is not None:
+            body.rewind()
+
+        retry_start = time.perf_counter()
+        self.metrics.observe(
+            METRIC_CHALLENGE_TO_PAYMENT_SECONDS, retry_start - challenged,
+        )
+
+        response = requests_func(*args, **kwargs)
+        self._record_transfer(response, stream)
+
+        end = time.perf_counter()
+        self.metrics.observe(METRIC_RETRY_SECONDS, end - retry_start)
+        self.metrics.observe(METRIC_REQUEST_SECONDS, end - start)
+
+        return response
+
+    def map(self, urls, method='get', max_workers=None, **kwargs):
+        """
+        Issues the same kind of request to each of urls concurrently over a
+        bounded thread pool, passing kwargs to every request. Tokens are
+        shared, so requests within one scope pay at most once between them.
+
+        Returns a BatchResult per URL, in the same order as urls. A failing
+        request doesn't affect the others, its exception is returned in its
+        result instead.
+        """
+        urls = list(urls)
+        if not urls:
+            return []
+
+        request_func = getattr(self, method.lower())
+
+        def fetch(url):
+            try:
+                return BatchResult(url, response=request_func(url, **kwargs))
+            except Exception as e:
+                return BatchResult(url, error=e)
+
+        max_workers = min(max_workers or self.max_workers, len(urls))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(fetch, urls))
+
+    def download(self, url, path, chunk_size=DEFAULT_DOWNLOAD_CHUNK_SIZE,
+                 parts=1, max_resumes=DEFAULT_MAX_RESUMES, **kwargs):
+        """
+        Streams url into the file at path chunk_size bytes at a time, so a
+        large paid resource is never held in memory. It's paid for like any
+        other GET, and kwargs are passed on to every request made.
+
+        The body is written to path + PART_SUFFIX and only moved to path
+        once complete. A transfer that's cut short is resumed with a Range
+        request, reusing the token already paid for, up to max_resumes
+        times. The validator the body was served with, its ETag or
+        Last-Modified, is saved at path + PART_SUFFIX + VALIDATOR_SUFFIX, so
+        a part file left behind by an earlier call is resumed the same way,
+        with If-Range. One without a saved validator can't be checked
+        against the resource and is discarded. If the server ignores Range,
+        or the resource changed, it starts over.
+
+        With parts > 1, and a server that advertises byte ranges in answer
+        to a HEAD request, the body is split into that many ranges fetched
+        concurrently over pooled connections, each resumed on its own. A
+        split download that fails is discarded rather than left to resume,
+        and its validator isn't saved.
+
+        Returns a DownloadResult. Raises a DownloadError if the download
+        can't be completed, and requests.HTTPError on an error status.
+        """
+        part_path = path + PART_SUFFIX
+        validator_path = part_path + VALIDATOR_SUFFIX
+        download = _Download(self, url, chunk_size, max_resumes, kwargs)
+
+        resumes = None
+        if parts > 1 and not os.path.exists(part_path):
+            resumes = self._download_parts(download, part_path, parts)
+
+        if resumes is None:
+            download.validator_path = validator_path
+
+            with _open_part(part_path) as f:
+                start = f.seek(0, os.SEEK_END)
+                if start:
+                    download.validator = _load_validator(validator_path)
+                    if download.validator is None:
+                        log.info(
+                            "Discarding part file of %s without a validator",
+                            url,
+                        )
+                        start = 0
+
+                resumes = download.fetch_resuming(f, start)
+                f.truncate()
+
+        os.replace(part_path, path)
+        _remove(validator_path)
+
+        return DownloadResult(path, os.path.getsize(path), resumes)
+
+    def _download_parts(self, download, part_path, parts):
+        """
+        Fetches a download as parts concurrent ranges, returning how many
+        times they were resumed in all, or None if the server doesn't serve
+        ranges of it.
+        """
+        # The HEAD request also pays for the resource if it needs to be, so
+        # the ranges all go out with the token.
+        response = self.head(
+            download.url, headers=download.headers,
+            **dict({'allow_redirects': True}, **download.kwargs),
+        )
+        response.raise_for_status()
+
+        size = int(response.headers.get('Content-Length') or 0)
+        if (response.headers.get('Accept-Ranges', '').lower() != 'bytes' or
+                size < parts):
+            return None
+
+        download.size = size
+        download.validator = _validator(response)
+
+        part_size = -(-size // parts)
+        ranges = [
+            (start, min(start + part_size, size) - 1)
+            for start in range(0, size, part_size)
+        ]
+
+        def fetch(byte_range):
+            with _open_part(part_path) as f:
+                return download.fetch_resuming(f, *byte_range)
+
+        try:
+            with _open_part(part_path) as f:
+                f.truncate(size)
+
+            with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+                return sum(executor.map(fetch, ranges))
+        except BaseException:
+            os.remove(part_path)
+            raise
+
     # TODO(roasbeef): should also be able to set the set of headers, etc
 
     @_L402
@@ -90,6 +877,10 @@ class RequestsL402Wrapper(object):
 class ResponseTextWrapper(BaseModel):
     requests_wrapper: Any
 
+    # An AsyncRequestsL402Wrapper backing the a-prefixed methods that
+    # APIChain's async path calls.
+    async_requests_wrapper: Any = None
+
     @staticmethod
     def response_text(func):
         def wrapper(*args, **kwargs):
@@ -97,6 +888,18 @@ class ResponseTextWrapper(BaseModel):
             return response.text
         return wrapper
 
+    @staticmethod
+    def async_response_text(func):
+        async def wrapper(self, *args, **kwargs):
+            if self.async_requests_wrapper is None:
+                raise ValueError(
+                    "async requests need an async_requests_wrapper",
+                )
+
+            response = await func(self, *args, **kwargs)
+            return await response.text()
+        return wrapper
+
     @response_text
     def get(self, url, **kwargs):
         return self.requests_wrapper.get(url, **kwargs)
@@ -120,3 +923,38 @@ class ResponseTextWrapper(BaseModel):
     @response_text
     def patch(self, url, data=None, **kwargs):
         return self.requests_wrapper.patch(url, data, **kwargs)
+
+    @async_response_text
+    async def aget(self, url, **kwargs):
+        return await self.async_requests_wrapper.get(url, **kwargs)
+
+    @async_response_text
+    async def apost(self, url, data=None, json=None, **kwargs):
+        return await self.async_requests_wrapper.post(
+            url, data, json, **kwargs,
+        )
+
+    @async_response_text
+    async def aput(self, url, data=None, **kwargs):
+        return await self.async_requests_wrapper.put(url, data, **kwargs)
+
+    @async_response_text
+    async def adelete(self, url, **kwargs):
+        return await self.async_requests_wrapper.delete(url, **kwargs)
+
+    @async_response_text
+    async def ahead(self, url, **kwargs):
+        return await self.async_requests_wrapper.head(url, **kwargs)
+
+    @async_response_text
+    async def apatch(self, url, data=None, **kwargs):
+        return await self.async_requests_wrapper.patch(url, data, **kwargs)
+
+    def close(self):
+        self.requests_wrapper.close()
+
+    async def aclose(self):
+        self.close()
+
+        if self.async_requests_wrapper is not None:
+            await self.async_requests_wrapper.close()
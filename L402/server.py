@@ -0,0 +1,290 @@
+"""
+A small Aperture-style L402 server for tests and benchmarks: every request
+without a valid token is answered with a 402 challenge carrying a freshly
+minted macaroon and an invoice from a node backend (a live LndNode or a
+lightning.FakeLnd), and requests presenting a paid token get a payload.
+"""
+
+import asyncio
+import collections
+import hashlib
+import inspect
+import logging
+import os
+import struct
+import threading
+import time
+
+import pymacaroons
+from aiohttp import web
+
+from .challenge import L402_SCHEMES
+from .payment import AUTH_HEADER, L402_ERROR_CODE
+
+log = logging.getLogger(__name__)
+
+DEFAULT_PRICE = 10
+DEFAULT_PAYLOAD_SIZE = 1024
+DEFAULT_INVOICE_EXPIRY = 3600
+
+# Aperture's identifier layout: a version, the payment hash the token is
+# bought with, then a random token id.
+_IDENTIFIER_VERSION = 0
+_IDENTIFIER = struct.Struct('>H32s32s')
+
+
+def _payment_hash(identifier):
+    version, payment_hash, _ = _IDENTIFIER.unpack(identifier)
+    if version != _IDENTIFIER_VERSION:
+        raise ValueError("unknown identifier version {}".format(version))
+
+    return payment_hash
+
+
+class L402Server(object):
+    """
+    Serves payload on every path, behind an L402 paywall of price satoshis.
+
+    Challenges are issued under both the L402 and LSAT schemes, as Aperture
+    does, each with a macaroon bound to the invoice's payment hash and
+    signed with root_key. If valid_for is set, macaroons carry a caveat
+    expiring them that many seconds after they're minted.
+
+    Invoices come from lnd_node.create_invoice, awaited if it's a coroutine
+    function and run in the default executor otherwise, or from
+    invoice_pool.take when an InvoicePool is given.
+
+    payload may be bytes or str; by default it's payload_size bytes of
+    filler. latency seconds are slept before answering each paid request,
+    to stand in for a slow backend.
+
+    stats counts the 'challenges' issued, and the requests 'authorized' and
+    'rejected' (those presenting an invalid token).
+
+    Run it on the caller's event loop with start and stop, or on a
+    background thread with start_in_thread and stop_in_thread (or as a
+    context manager) when the client under test is blocking.
+    """
+
+    def __init__(self, lnd_node=None, price=DEFAULT_PRICE, payload=None,
+                 payload_size=DEFAULT_PAYLOAD_SIZE,
+                 content_type='application/octet-stream', latency=0.0,
+                 root_key=None, service='l402-server', valid_for=None,
+                 invoice_expiry=DEFAULT_INVOICE_EXPIRY, invoice_pool=None):
+
+        if lnd_node is None and invoice_pool is None:
+            raise ValueError("an lnd_node or invoice_pool is required")
+
+        if payload is None:
+            payload = (b'L402 payload ' * (payload_size // 13 + 1))
+            payload = payload[:payload_size]
+        elif isinstance(payload, str):
+            payload = payload.encode('utf-8')
+
+        self.lnd_node = lnd_node
+        self.invoice_pool = invoice_pool
+        self.price = price
+        self.payload = payload
+        self.content_type = content_type
+        self.latency = latency
+        self.root_key = root_key or os.urandom(32)
+        self.service = service
+        self.valid_for = valid_for
+        self.invoice_expiry = invoice_expiry
+
+        self.stats = collections.Counter()
+        self.url = None
+
+        self._services_caveat = 'services={}:0'.format(service)
+
+        # Pooled invoices are minted before the request they answer, so
+        # they share one memo template per service rather than naming the
+        # path. Braces in the service name are escaped from the template.
+        self._pool_memo = '{} #{{seq}}'.format(
+            service.replace('{', '{{').replace('}', '}}'),
+        )
+        self._valid_until_prefix = '{}_valid_until='.format(service)
+
+        self._runner = None
+        self._loop = None
+        self._thread = None
+
+    def __enter__(self):
+        self.start_in_thread()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop_in_thread()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.stop()
+
+    def app(self) -> web.Application:
+        """
+        Returns an aiohttp application serving every path and method.
+        """
+        app = web.Application()
+        app.router.add_route('*', '/{tail:.*}', self._handle)
+
+        return app
+
+    async def start(self, host='127.0.0.1', port=0):
+        """
+        Starts serving on the running loop and returns the base URL. Pass
+        port=0 to pick a free port.
+        """
+        self._runner = web.AppRunner(self.app(), access_log=None)
+        await self._runner.setup()
+
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+
+        port = self._runner.addresses[0][1]
+        self.url = 'http://{}:{}'.format(host, port)
+
+        return self.url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def start_in_thread(self, host='127.0.0.1', port=0):
+        """
+        Runs the server on its own event loop in a daemon thread and returns
+        the base URL.
+        """
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name='l402-server', daemon=True,
+        )
+        self._thread.start()
+
+        return asyncio.run_coroutine_threadsafe(
+            self.start(host, port), self._loop,
+        ).result()
+
+    def stop_in_thread(self):
+        if self._loop is None:
+            return
+
+        asyncio.run_coroutine_threadsafe(self.stop(), self._loop).result()
+
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+        self._loop = None
+        self._thread = None
+
+    async def _create_invoice(self, path):
+        if self.invoice_pool is not None:
+            create_invoice = self.invoice_pool.take
+            args = (self.price, self._pool_memo)
+        else:
+            create_invoice = self.lnd_node.create_invoice
+            args = (
+                '{} {}'.format(self.service, path), self.price,
+                self.invoice_expiry,
+            )
+
+        if inspect.iscoroutinefunction(create_invoice):
+            return await create_invoice(*args)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, create_invoice, *args)
+
+    def _mint_macaroon(self, payment_hash):
+        macaroon = pymacaroons.Macaroon(
+            location=self.service,
+            identifier=_IDENTIFIER.pack(
+                _IDENTIFIER_VERSION, payment_hash, os.urandom(32),
+            ),
+            key=self.root_key,
+            version=pymacaroons.MACAROON_V2,
+        )
+        macaroon.add_first_party_caveat(self._services_caveat)
+
+        if self.valid_for is not None:
+            macaroon.add_first_party_caveat('{}{}'.format(
+                self._valid_until_prefix, int(time.time() + self.valid_for),
+            ))
+
+        return macaroon.serialize()
+
+    def _check_caveat(self, caveat):
+        if caveat == self._services_caveat:
+            return True
+
+        if caveat.startswith(self._valid_until_prefix):
+            valid_until = caveat[len(self._valid_until_prefix):]
+            return valid_until.isdigit() and time.time() < int(valid_until)
+
+        return False
+
+    def _authorized(self, authorization):
+        """
+        Checks an "L402 <macaroon>:<preimage>" (or LSAT) Authorization
+        header: the macaroon must verify against root_key and the preimage
+        must hash to the payment hash it was minted for.
+        """
+        scheme, _, credentials = authorization.partition(' ')
+        if scheme.upper() not in L402_SCHEMES:
+            return False
+
+        serialized, _, preimage = credentials.strip().rpartition(':')
+        try:
+            macaroon = pymacaroons.Macaroon.deserialize(serialized)
+
+            verifier = pymacaroons.Verifier()
+            verifier.satisfy_general(self._check_caveat)
+            verifier.verify(macaroon, self.root_key)
+
+            payment_hash = _payment_hash(macaroon.identifier_bytes)
+            preimage = bytes.fromhex(preimage)
+        except Exception as e:
+            log.debug("Rejected L402 token: %s", e)
+            return False
+
+        return hashlib.sha256(preimage).digest() == payment_hash
+
+    async def _challenge(self, request):
+        invoice = await self._create_invoice(request.path)
+        macaroon = self._mint_macaroon(invoice.r_hash)
+
+        self.stats['challenges'] += 1
+
+        response = web.Response(
+            status=L402_ERROR_CODE, text='payment required\n',
+        )
+        for scheme in L402_SCHEMES:
+            response.headers.add(
+                AUTH_HEADER, '{} macaroon="{}", invoice="{}"'.format(
+                    scheme, macaroon, invoice.payment_request,
+                ),
+            )
+
+        return response
+
+    async def _handle(self, request):
+        authorization = request.headers.get('Authorization')
+        if authorization is None:
+            return await self._challenge(request)
+
+        if not self._authorized(authorization):
+            self.stats['rejected'] += 1
+            return await self._challenge(request)
+
+        self.stats['authorized'] += 1
+
+        # Drain the body so uploads cost what they would on a real backend.
+        await request.read()
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        return web.Response(body=self.payload, content_type=self.content_type)
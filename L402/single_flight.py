@@ -0,0 +1,81 @@
+import asyncio
+import threading
+
+
+class _Call(object):
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """
+    Collapses concurrent calls that share a key into a single execution.
+
+    The first caller for a key runs the function; any caller arriving while
+    it is still in flight blocks until it finishes and then receives the
+    same result, or has the same exception raised.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+
+            return call.result
+
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result
+
+
+class AsyncSingleFlight(object):
+    """
+    The asyncio counterpart of SingleFlight: concurrent awaits of do() for
+    the same key share a single run of the coroutine function.
+
+    The shared run is a task of its own, so cancelling any one caller,
+    including the one that started it, leaves it running for the rest.
+    """
+
+    def __init__(self):
+        self._calls = {}
+
+    def _done(self, key, call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+        # Mark the exception as retrieved so asyncio doesn't complain when
+        # every caller was cancelled before it came in.
+        if not call.cancelled():
+            call.exception()
+
+    async def do(self, key, func):
+        call = self._calls.get(key)
+        if call is None:
+            call = asyncio.ensure_future(func())
+            call.add_done_callback(lambda call: self._done(key, call))
+            self._calls[key] = call
+
+        return await asyncio.shield(call)
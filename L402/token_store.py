@@ -0,0 +1,172 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional
+from urllib.parse import urlsplit
+
+import json
+import os
+import tempfile
+import threading
+import time
+
+EVICT_LRU = "lru"
+EVICT_FIFO = "fifo"
+
+EVICTION_POLICIES = (EVICT_LRU, EVICT_FIFO)
+
+
+def token_scope(url, scope_depth=1):
+    """
+    Returns the cache key a token obtained for url is stored under: the
+    origin plus the first scope_depth path segments. A scope_depth of zero
+    shares a single token across the whole origin.
+    """
+    parts = urlsplit(url)
+
+    origin = '{}://{}'.format(parts.scheme.lower(), parts.netloc.lower())
+
+    segments = [s for s in parts.path.split('/') if s]
+
+    return '{}/{}'.format(origin, '/'.join(segments[:scope_depth]))
+
+
+@dataclass(frozen=True)
+class L402Token:
+    """
+    A paid L402 credential: the macaroon handed out in the challenge along
+    with the preimage of the invoice that was paid for it.
+    """
+
+    macaroon: str
+    preimage: str
+    scheme: str = "LSAT"
+    created_at: float = field(default_factory=time.time)
+
+    @property
+    def authorization(self):
+        return '{scheme} {macaroon}:{preimage}'.format(
+                scheme=self.scheme, macaroon=self.macaroon,
+                preimage=self.preimage,
+        )
+
+
+class TokenStore(object):
+    """
+    Thread-safe cache of paid L402 tokens keyed by scope (see token_scope).
+
+    At most max_tokens are kept, evicting either the least recently used
+    ("lru") or the oldest inserted ("fifo") token once full. If ttl is set,
+    tokens older than ttl seconds are dropped on lookup. If path is set, the
+    store is loaded from and written back to that file so tokens survive a
+    restart.
+    """
+
+    def __init__(self, max_tokens=1024, ttl=None, eviction_policy=EVICT_LRU,
+                 path=None):
+
+        if eviction_policy not in EVICTION_POLICIES:
+            raise ValueError(
+                "unknown eviction policy: {}".format(eviction_policy),
+            )
+
+        self.max_tokens = max_tokens
+        self.ttl = ttl
+        self.eviction_policy = eviction_policy
+        self.path = os.path.expanduser(path) if path else None
+
+        self._tokens = OrderedDict()
+        self._lock = threading.Lock()
+
+        if self.path and os.path.exists(self.path):
+            self._load()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._tokens)
+
+    def _expired(self, token):
+        return (
+            self.ttl is not None and time.time() - token.created_at > self.ttl
+        )
+
+    def get(self, scope) -> Optional[L402Token]:
+        with self._lock:
+            token = self._tokens.get(scope)
+            if token is None:
+                return None
+
+            if self._expired(token):
+                del self._tokens[scope]
+                self._flush()
+                return None
+
+            if self.eviction_policy == EVICT_LRU:
+                self._tokens.move_to_end(scope)
+
+            return token
+
+    def put(self, scope, token):
+        with self._lock:
+            self._tokens.pop(scope, None)
+            self._tokens[scope] = token
+
+            while len(self._tokens) > self.max_tokens:
+                self._tokens.popitem(last=False)
+
+            self._flush()
+
+    def invalidate(self, scope, token=None):
+        """
+        Drops the token stored for scope. If token is given, the entry is
+        only dropped if it is still that token, so a rejected stale token
+        can't evict a fresh one stored concurrently.
+        """
+        with self._lock:
+            current = self._tokens.get(scope)
+            if current is None or (token is not None and current != token):
+                return
+
+            del self._tokens[scope]
+            self._flush()
+
+    def clear(self):
+        with self._lock:
+            self._tokens.clear()
+            self._flush()
+
+    def _load(self):
+        with open(self.path, 'r') as f:
+            entries = json.load(f)
+
+        for scope, entry in entries.items():
+            token = L402Token(**entry)
+            if not self._expired(token):
+                self._tokens[scope] = token
+
+    def _flush(self):
+        if not self.path:
+            return
+
+        entries = {
+            scope: {
+                'macaroon': token.macaroon,
+                'preimage': token.preimage,
+                'scheme': token.scheme,
+                'created_at': token.created_at,
+            }
+            for scope, token in self._tokens.items()
+        }
+
+        # Write to a temporary file in the same directory and atomically
+        # swap it in, so a crash mid-write never leaves a truncated store.
+        # mkstemp creates the file as 0600, which is what we want given the
+        # tokens are bearer credentials.
+        dir_name = os.path.dirname(self.path) or '.'
+        fd, tmp_path = tempfile.mkstemp(dir=dir_name, prefix='.l402-tokens-')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
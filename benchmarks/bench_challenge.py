@@ -0,0 +1,62 @@
+"""
+Micro-benchmark of WWW-Authenticate parsing: the original pair of
+uncompiled re.search calls against the single-pass challenge parser, both
+for headers seen for the first time and for repeated identical headers.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_challenge --number 100000
+"""
+
+import argparse
+import re
+import timeit
+
+from L402.challenge import _select_L402_challenge
+from L402.challenge import parse_challenges, parse_L402_challenge
+
+HEADER = (
+    'LSAT macaroon="AgEEbHNhdAJCAADXNkGQ3QeKDN1ZQ7YrB7+v4yO/ByFOzqKX4LvxBBR'
+    'iqwbeCVQr2wcRhiYL7m0H8a1wGCHZ8p6z0Wy5vt7Zr3a8AAIPc2VydmljZXM9bW9jazowA'
+    'AISbW9ja19jYXBhYmlsaXRpZXM9AAAGIH2s0f6JQXRB3ubZP1+3cOyV9+8xfJ8mgmX4DD'
+    'tmjRQZ", invoice="lnbc10n1pjg9y6hpp5wqw4nvd0hmlnxf4zemd9vk0vamxdhzw0tp'
+    '3t8sfrqe9xgyyepg6sdq8w3jhxaqcqzzsxqyz5vqsp5qmjxyl4fdxj9sw0h6z4uk6ywy'
+    'n2m3rzfjgz0kdjpqs8lnwuzkjxq9qyyssqkvpfrhrx3kuuf0ljtdtm2t8c2m2c8kvw30'
+    'j3xu9zc9p9wnqs2xdfxm8ucjgv3emkz2eqkq2dtlvav43xnxq6d0pnl6a8yfy8l6lh6u'
+    'qpzlx0ns"'
+)
+
+
+def regex_parse(auth_header):
+    macaroon = re.search(r'macaroon="(.*?)"', auth_header).group(1)
+    invoice = re.search(r'invoice="(.*?)"', auth_header).group(1)
+
+    return macaroon, invoice
+
+
+def parser_cold(auth_header):
+    # Bypass both caches, as every fresh challenge carries a new invoice.
+    return _select_L402_challenge(parse_challenges.__wrapped__(auth_header))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--number', type=int, default=100000)
+    args = parser.parse_args()
+
+    cases = (
+        ('regex', regex_parse),
+        ('parser (uncached)', parser_cold),
+        ('parser (cached)', parse_L402_challenge),
+    )
+
+    print('{:<20}{:>14}'.format('path', 'ns per call'))
+    for name, func in cases:
+        elapsed = min(timeit.repeat(
+            lambda: func(HEADER), number=args.number, repeat=5,
+        ))
+        print('{:<20}{:>14.0f}'.format(name, elapsed / args.number * 1e9))
+
+
+if __name__ == '__main__':
+    main()
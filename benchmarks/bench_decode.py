@@ -0,0 +1,88 @@
+"""
+Compares decoding an L402 challenge's invoice locally, with coincurve and
+with the pure-Python fallback, against asking lnd with DecodePayReq.
+
+Every challenge carries a fresh invoice, so each is decoded only once and
+no run is served from the decode cache. The RPC goes to a FakeLnd on
+localhost, which decodes with coincurve itself, so its figure is a lower
+bound on what the round trip to a real node costs.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_decode --invoices 500
+"""
+
+import argparse
+import hashlib
+import statistics
+import time
+
+from lightning import FakeLnd, bolt11, secp256k1
+
+
+def _invoices(count, tag):
+    key = hashlib.sha256(b'bench-decode').digest()
+
+    return [
+        bolt11.encode(
+            key, hashlib.sha256(b'%s-%d' % (tag, i)).digest(),
+            amount_msat=10000, description='bench', currency='bcrt',
+        )
+        for i in range(count)
+    ]
+
+
+def _measure(decode, invoices):
+    bolt11._decode.cache_clear()
+
+    latencies = []
+    for invoice in invoices:
+        start = time.perf_counter()
+        decode(invoice)
+        latencies.append(time.perf_counter() - start)
+
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--invoices', type=int, default=500)
+    args = parser.parse_args()
+
+    coincurve = secp256k1.coincurve
+    if coincurve is None:
+        print('coincurve is not installed, skipping its run')
+
+    with FakeLnd() as fake:
+        node = fake.node()
+        node.warm_up()
+
+        def local_pure(invoice):
+            secp256k1.coincurve = None
+            try:
+                return bolt11.decode(invoice)
+            finally:
+                secp256k1.coincurve = coincurve
+
+        cases = [('rpc', lambda invoice: node.decode_invoice(
+            invoice, local=False,
+        ))]
+        if coincurve is not None:
+            cases.append(('local', bolt11.decode))
+        cases.append(('local (pure)', local_pure))
+
+        print('{:<16}{:>12}{:>12}'.format('path', 'mean (us)', 'p50 (us)'))
+        for name, decode in cases:
+            latencies = _measure(
+                decode, _invoices(args.invoices, name.encode()),
+            )
+            print('{:<16}{:>12.1f}{:>12.1f}'.format(
+                name, statistics.mean(latencies) * 1e6,
+                statistics.median(latencies) * 1e6,
+            ))
+
+        node.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Measures how long a fresh interpreter takes to import the lightning package
+and construct an LndNode, against bare interpreter startup and against
+importing the grpc stubs that are now only loaded on first RPC.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_import --runs 20
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+_SNIPPETS = (
+    ('interpreter', 'pass'),
+    ('import lightning', 'import lightning'),
+    (
+        'construct LndNode',
+        'import lightning; '
+        'lightning.LndNode("tls.cert", "admin.macaroon")',
+    ),
+    ('import L402', 'import L402'),
+    (
+        'import grpc stubs',
+        'import grpc; import protos.lightning_pb2_grpc',
+    ),
+)
+
+
+def _measure(code, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], check=True)
+        timings.append(time.perf_counter() - start)
+
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    print('{:<20}{:>12}{:>12}'.format('step', 'p50 (ms)', 'min (ms)'))
+
+    for name, code in _SNIPPETS:
+        timings = _measure(code, args.runs)
+
+        print('{:<20}{:>12.1f}{:>12.1f}'.format(
+            name, statistics.median(timings) * 1000, min(timings) * 1000,
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,253 @@
+"""
+Benchmarks the paid-request pipeline end to end: RequestsL402Wrapper paying
+an L402Server through two FakeLnd nodes, all in process on localhost.
+
+Each workload is run at every concurrency level and reports requests/sec,
+p50/p99 latency, payments per request, and how the time was split between
+LndNode.pay_invoice and HTTP:
+
+    cold    every request is to a new scope, so every request pays
+    warm    every request reuses one token paid for before timing starts
+    mixed   requests spread over --scopes scopes, each paid for once
+
+Run from the repository root:
+
+    python -m benchmarks.bench_pipeline --requests 500 --json results.json
+
+Pass --baseline with an earlier --json file to compare against it; the
+exit status is 1 if any run's throughput dropped, or its p99 rose, by more
+than --tolerance.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+
+from L402 import L402Server, RequestsL402Wrapper
+from L402.payment import METRIC_PAYMENTS, METRIC_PAYMENT_SECONDS
+from lightning import FakeLedger, FakeLnd
+from metrics import InMemoryMetricsSink
+
+WORKLOADS = ('cold', 'warm', 'mixed')
+
+
+def _percentile(ordered, q):
+    # Nearest-rank percentile of an already sorted list.
+    index = max(int(round(q / 100.0 * len(ordered))) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+def _metric_total(metrics, name):
+    return sum(
+        value for (metric, _), value in metrics.items() if metric == name
+    )
+
+
+def _urls(workload, base_url, num_requests, num_scopes, rng):
+    if workload == 'cold':
+        return [
+            '{}/cold{}/item'.format(base_url, i) for i in range(num_requests)
+        ]
+
+    if workload == 'warm':
+        return [
+            '{}/warm/item{}'.format(base_url, i) for i in range(num_requests)
+        ]
+
+    return [
+        '{}/mixed{}/item{}'.format(base_url, rng.randrange(num_scopes), i)
+        for i in range(num_requests)
+    ]
+
+
+def _run(node, base_url, workload, concurrency, args, run):
+    metrics = InMemoryMetricsSink()
+
+    # Every run gets its own path prefix, so no run starts with scopes an
+    # earlier one already paid for. Tokens are scoped below it.
+    wrapper = RequestsL402Wrapper.with_session(
+        node, pool_connections=concurrency, pool_maxsize=concurrency,
+        metrics=metrics, scope_depth=2,
+    )
+    base_url = '{}/run{}'.format(base_url, run)
+    urls = _urls(
+        workload, base_url, args.requests, args.scopes,
+        random.Random(args.seed),
+    )
+
+    if workload == 'warm':
+        wrapper.get('{}/warm/item'.format(base_url))
+        metrics.reset()
+
+    def fetch(url):
+        start = time.perf_counter()
+        response = wrapper.get(url)
+        elapsed = time.perf_counter() - start
+
+        if response.status_code != 200:
+            raise RuntimeError(
+                '{} returned {}'.format(url, response.status_code),
+            )
+
+        return elapsed
+
+    with wrapper:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            latencies = sorted(executor.map(fetch, urls))
+        wall_seconds = time.perf_counter() - start
+
+    counters, histograms = metrics.collect()
+
+    payments = _metric_total(counters, METRIC_PAYMENTS)
+    pay_seconds = sum(
+        histogram.sum for (name, _), histogram in histograms.items()
+        if name == METRIC_PAYMENT_SECONDS
+    )
+    request_seconds = sum(latencies)
+
+    return {
+        'workload': workload,
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'seconds': wall_seconds,
+        'requests_per_second': len(latencies) / wall_seconds,
+        'p50_ms': _percentile(latencies, 50) * 1000,
+        'p99_ms': _percentile(latencies, 99) * 1000,
+        'mean_ms': request_seconds / len(latencies) * 1000,
+        'payments_per_request': payments / len(latencies),
+        'pay_seconds': pay_seconds,
+        'http_seconds': max(request_seconds - pay_seconds, 0.0),
+        'pay_share': pay_seconds / request_seconds,
+    }
+
+
+def _compare(results, baseline, tolerance):
+    """
+    Prints the runs that regressed against baseline and returns how many
+    did.
+    """
+    previous = {
+        (r['workload'], r['concurrency']): r for r in baseline['results']
+    }
+
+    regressions = 0
+    for result in results:
+        before = previous.get((result['workload'], result['concurrency']))
+        if before is None:
+            continue
+
+        rps = result['requests_per_second'] / before['requests_per_second']
+        p99 = result['p99_ms'] / before['p99_ms']
+        if rps < 1 - tolerance or p99 > 1 + tolerance:
+            regressions += 1
+            print('REGRESSION {} x{}: {:.0f} -> {:.0f} req/s, p99 {:.2f} -> '
+                  '{:.2f} ms'.format(
+                      result['workload'], result['concurrency'],
+                      before['requests_per_second'],
+                      result['requests_per_second'],
+                      before['p99_ms'], result['p99_ms'],
+                  ))
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument(
+        '--concurrency', type=int, nargs='+', default=[1, 4, 16],
+    )
+    parser.add_argument(
+        '--workloads', nargs='+', choices=WORKLOADS, default=list(WORKLOADS),
+    )
+    parser.add_argument('--scopes', type=int, default=16)
+    parser.add_argument('--payment-latency', type=float, default=0.0)
+    parser.add_argument('--server-latency', type=float, default=0.0)
+    parser.add_argument('--payload-size', type=int, default=1024)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="write results to this file")
+    parser.add_argument('--baseline', help="compare against earlier results")
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args()
+
+    ledger = FakeLedger(args.seed)
+    server_lnd = FakeLnd(ledger=ledger, alias='server').start()
+    client_lnd = FakeLnd(
+        ledger=ledger, alias='client', seed=args.seed,
+        payment_latency=args.payment_latency,
+        local_balance=10 ** 9,
+    ).start()
+
+    server_node = server_lnd.node()
+    client_node = client_lnd.node()
+
+    server = L402Server(
+        server_node, payload_size=args.payload_size,
+        latency=args.server_latency,
+    )
+    base_url = server.start_in_thread()
+
+    print('{:<8}{:>6}{:>10}{:>10}{:>10}{:>10}{:>8}'.format(
+        'workload', 'conc', 'req/s', 'p50 ms', 'p99 ms', 'pay/req', 'pay %',
+    ))
+
+    results = []
+    try:
+        for workload in args.workloads:
+            for concurrency in args.concurrency:
+                result = _run(
+                    client_node, base_url, workload, concurrency, args,
+                    run=len(results),
+                )
+                results.append(result)
+
+                print('{:<8}{:>6}{:>10.0f}{:>10.2f}{:>10.2f}{:>10.2f}'
+                      '{:>8.1f}'.format(
+                          workload, concurrency,
+                          result['requests_per_second'], result['p50_ms'],
+                          result['p99_ms'], result['payments_per_request'],
+                          result['pay_share'] * 100,
+                      ))
+    finally:
+        server.stop_in_thread()
+        client_node.close()
+        server_node.close()
+        client_lnd.stop()
+        server_lnd.stop()
+
+    report = {
+        'benchmark': 'pipeline',
+        'created_at': time.time(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'params': {
+            'requests': args.requests,
+            'scopes': args.scopes,
+            'payment_latency': args.payment_latency,
+            'server_latency': args.server_latency,
+            'payload_size': args.payload_size,
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+        if _compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+Compares per-request latency of RequestsL402Wrapper when backed by the bare
+requests module against a pooled session, using a local HTTP server that
+issues L402 challenges and a stub node that pays instantly.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_session --requests 500
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import argparse
+import hashlib
+import statistics
+import threading
+import time
+
+import requests
+
+from L402 import RequestsL402Wrapper
+from lightning import bolt11
+
+# Any key will do, the stub node doesn't check who signed the invoice.
+_BENCH_KEY = hashlib.sha256(b'bench-session').digest()
+
+
+class _ChallengeHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so the server honours keep-alive, and no Nagle so the split
+    # header/body writes don't stall on delayed ACKs over a reused socket.
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    # A real encoded invoice, so the wrapper's local decode succeeds just as
+    # it would against a live server.
+    invoice = None
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        auth = self.headers.get('Authorization', '')
+        if not auth.startswith('LSAT bench-macaroon:'):
+            self.send_response(402)
+            self.send_header(
+                'WWW-Authenticate',
+                'LSAT macaroon="bench-macaroon", invoice="{}"'.format(
+                    self.invoice,
+                ),
+            )
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _InstantNode(object):
+    def pay_invoice(self, invoice, amt=None):
+        return hashlib.sha256(invoice.encode('utf-8')).hexdigest()
+
+
+def _measure(wrapper, url, num_requests, cold):
+    latencies = []
+    for _ in range(num_requests):
+        if cold:
+            wrapper.token_store.clear()
+
+        start = time.perf_counter()
+        response = wrapper.get(url)
+        latencies.append(time.perf_counter() - start)
+
+        assert response.status_code == 200
+
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+
+    _ChallengeHandler.invoice = bolt11.encode(
+        _BENCH_KEY, hashlib.sha256(b'bench-preimage').digest(),
+        amount_msat=1000, description='bench',
+    )
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _ChallengeHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = 'http://127.0.0.1:{}/bench'.format(server.server_address[1])
+
+    node = _InstantNode()
+
+    print('{:<10}{:<8}{:>12}{:>12}'.format(
+        'mode', 'token', 'mean (ms)', 'p50 (ms)',
+    ))
+
+    for cold in (True, False):
+        for mode in ('module', 'session'):
+            if mode == 'module':
+                wrapper = RequestsL402Wrapper(node, requests)
+            else:
+                wrapper = RequestsL402Wrapper.with_session(node)
+
+            with wrapper:
+                latencies = _measure(wrapper, url, args.requests, cold)
+
+            print('{:<10}{:<8}{:>12.3f}{:>12.3f}'.format(
+                mode, 'cold' if cold else 'warm',
+                statistics.mean(latencies) * 1000,
+                statistics.median(latencies) * 1000,
+            ))
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -4,8 +4,9 @@ from langchain.tools import BaseTool, tool
 from protos import lightning_pb2 as ln
 
 from lightning import LndNode
+from lightning import bolt11
 
-from typing import List
+from typing import List, Union
 
 
 class LndTools(BaseToolkit):
@@ -46,14 +47,14 @@ class LndTools(BaseToolkit):
             This can be used to get more information about an invoice before
             trying to pay it.
             """
-            decoded_invoice = self.lnd_node.decode_invoice(invoice)
+            decoded_invoice = bolt11.decode(invoice)
             return decoded_invoice
 
         return decode_invoice
 
     def _send_payment_tool(self):
         @tool
-        def send_payment(invoice: str) -> ln.SendResponse:
+        def send_payment(invoice: str) -> Union[ln.SendResponse, ln.Payment]:
             """
             Can be used to make a payment to a valid Lightning invoice.
             Information about the payment is returned, such as the pre-image,
@@ -66,6 +67,18 @@ class LndTools(BaseToolkit):
                 payment_route: <Route>,
                 payment_hash: <bytes>,
             }
+
+            Nodes that pay through the router instead return the final
+            payment, which looks like:
+            {
+                payment_hash: <string>,
+                payment_preimage: <string>,
+                value_msat: <int64>,
+                fee_msat: <int64>,
+                status: <PaymentStatus>,
+                htlcs: <HTLCAttempt[]>,
+                failure_reason: <PaymentFailureReason>,
+            }
             """
             payment_resp = self.lnd_node.send_payment(invoice)
             return payment_resp
@@ -157,7 +170,7 @@ class LndTools(BaseToolkit):
     def _check_invoice_status(self):
         pass
 
-    def _create_invoice(self):
+    def _create_invoice_tool(self):
         @tool
         def create_invoice(memo: str, value: int) -> ln.AddInvoiceResponse:
             """
@@ -1,2 +1,37 @@
 from .lightning import LndNode
-from .lightning import LightningNode
+from .lightning import LightningNode, PaymentResult
+from .channel_pool import ChannelPool, default_channel_pool
+from .exceptions import InvoiceCanceledError, InvoiceWatcherStoppedError
+from .exceptions import PaymentError, PaymentTimeoutError
+from .invoice_pool import InvoicePool
+from .preimage_store import PreimageStore
+from .query_cache import DEFAULT_CACHE_TTLS, QueryCache
+from .snapshot import ChannelSummary, NodeSnapshot, PendingChannelSummary
+
+
+def __getattr__(name):
+    # AsyncLndNode pulls in asyncio, which blocking users of the package
+    # shouldn't have to pay for at import time.
+    if name == 'AsyncLndNode':
+        from .async_lightning import AsyncLndNode
+        return AsyncLndNode
+
+    # As does waiting on invoices asynchronously.
+    if name == 'InvoiceWatcher':
+        from .invoice_watcher import InvoiceWatcher
+        return InvoiceWatcher
+
+    # Likewise the interceptor needs grpc, which is otherwise only imported
+    # once a node connects.
+    if name in ('MetricsInterceptor', 'RPC_METRIC_BUCKETS'):
+        from . import interceptors
+        return getattr(interceptors, name)
+
+    # The fake lnd serves gRPC, so it's only loaded when asked for.
+    if name in ('FakeLedger', 'FakeLnd'):
+        from . import fake_lnd
+        return getattr(fake_lnd, name)
+
+    raise AttributeError(
+        'module {!r} has no attribute {!r}'.format(__name__, name),
+    )
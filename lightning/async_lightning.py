@@ -0,0 +1,332 @@
+import asyncio
+
+from . import bolt11
+from .channel_pool import channel_credentials, channel_options
+from .lazy_module import LazyModule
+from .exceptions import PaymentError, PaymentTimeoutError
+from .lightning import DEFAULT_MAX_PARTS, DEFAULT_PAYMENT_TIMEOUT
+from .lightning import LIST_PAYMENTS_MAX_PAGES
+from .lightning import PAYMENT_DEADLINE_GRACE, LightningNode, PaymentResult
+from .lightning import already_paying
+from .lightning import find_payment_preimage, invoice_payment_hash
+from .lightning import list_payments_request, payment_done
+from .lightning import payment_fee_limit_msat, router_options, send_request
+from .lightning import send_payment_request, sync_payment_result
+from .lightning import track_payment_failed, track_payment_request
+from .lightning import tracked_preimage
+from .preimage_store import PreimageStore
+from .snapshot import build_snapshot
+
+grpc = LazyModule('grpc')
+aio = LazyModule('grpc.aio')
+ln = LazyModule('protos.lightning_pb2')
+lnrpc = LazyModule('protos.lightning_pb2_grpc')
+router = LazyModule('protos.router_pb2')
+routerrpc = LazyModule('protos.router_pb2_grpc')
+
+
+class AsyncLndNode(LightningNode):
+    """
+    An LndNode for asyncio applications, built on grpc.aio. All RPC methods
+    are coroutines, and any number of them may be in flight at once over
+    the node's single channel.
+
+    The channel is bound to the event loop it's created on, so it's opened
+    on the first call (or by awaiting warm_up) rather than in the
+    constructor. It uses the same keepalive and message size options as
+    pooled LndNode channels.
+
+    use_router, timeout_seconds, fee_limit_sat, max_parts and
+    preimage_store work as they do for LndNode.
+    """
+
+    def __init__(self, cert_path, macaroon_path, host='localhost', port='10009',
+                 use_router=False, timeout_seconds=DEFAULT_PAYMENT_TIMEOUT,
+                 fee_limit_sat=None, max_parts=DEFAULT_MAX_PARTS,
+                 preimage_store=None):
+        self.cert_path = cert_path
+        self.macaroon_path = macaroon_path
+        self.host = host
+        self.port = port
+
+        self.use_router = use_router
+        self.timeout_seconds = timeout_seconds
+        self.fee_limit_sat = fee_limit_sat
+        self.max_parts = max_parts
+
+        if preimage_store is None:
+            preimage_store = PreimageStore()
+        self.preimage_store = preimage_store
+
+        self._channel = None
+        self._grpc_conn_stub = None
+        self._router_stub = None
+
+    @property
+    def _grpc_conn(self):
+        if self._grpc_conn_stub is None:
+            creds = channel_credentials(self.cert_path, self.macaroon_path)
+            self._channel = aio.secure_channel(
+                    '{}:{}'.format(self.host, self.port), creds,
+                    options=channel_options(),
+            )
+            self._grpc_conn_stub = lnrpc.LightningStub(self._channel)
+
+        return self._grpc_conn_stub
+
+    @property
+    def _router_conn(self):
+        if self._router_stub is None:
+            self._grpc_conn
+            self._router_stub = routerrpc.RouterStub(self._channel)
+
+        return self._router_stub
+
+    async def warm_up(self, timeout=None):
+        """
+        Opens the channel and waits until the connection to lnd, including
+        the TLS handshake, is established. Run it as a task to connect in
+        the background while the application starts up.
+        """
+        self._grpc_conn
+
+        await asyncio.wait_for(self._channel.channel_ready(), timeout)
+
+    async def close(self):
+        if self._channel is not None:
+            await self._channel.close()
+
+            self._channel = None
+            self._grpc_conn_stub = None
+            self._router_stub = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def pay_invoice(self, invoice, amt=None, use_router=None, **kwargs):
+        result = await self.pay(
+                invoice, amt=amt, use_router=use_router, **kwargs,
+        )
+
+        return result.preimage
+
+    async def pay(self, invoice, amt=None, use_router=None, **kwargs):
+        payment_hash = invoice_payment_hash(invoice)
+        if payment_hash is None:
+            return await self._pay_invoice(
+                    invoice, None, amt, use_router, **kwargs,
+            )
+
+        async with self.preimage_store.async_lock(payment_hash):
+            pre_image = self.preimage_store.get(payment_hash)
+            if pre_image is not None:
+                return PaymentResult(pre_image, paid=False)
+
+            result = await self._pay_invoice(
+                    invoice, payment_hash, amt, use_router, **kwargs,
+            )
+
+            # A journaled store fsyncs, which shouldn't block the loop.
+            await asyncio.get_running_loop().run_in_executor(
+                    None, self.preimage_store.put, payment_hash,
+                    result.preimage,
+            )
+
+        return result
+
+    def fee_limit_msat(self, amt_msat):
+        return payment_fee_limit_msat(amt_msat, self.fee_limit_sat)
+
+    async def _pay_invoice(self, invoice, payment_hash, amt, use_router,
+                           **kwargs):
+        if use_router is None:
+            use_router = self.use_router
+
+        if use_router:
+            try:
+                payment = await self.send_payment_v2(
+                        invoice, amt=amt, **kwargs,
+                )
+            except grpc.RpcError as e:
+                if not already_paying(e, payment_hash):
+                    raise
+
+                pre_image = await self.lookup_preimage(payment_hash)
+                if pre_image is None:
+                    raise
+
+                return PaymentResult(pre_image, paid=False)
+
+            return PaymentResult(payment.payment_preimage, payment.fee_msat)
+
+        pay_resp = await self._grpc_conn.SendPaymentSync(
+                send_request(invoice, amt, self.fee_limit_sat),
+        )
+
+        result = sync_payment_result(pay_resp)
+        if result is not None:
+            return result
+
+        pre_image = None
+        if payment_hash is not None:
+            pre_image = await self.lookup_preimage(payment_hash)
+
+        if pre_image is None:
+            raise PaymentError(payment_hash, pay_resp.payment_error)
+
+        return PaymentResult(pre_image, paid=False)
+
+    async def lookup_preimage(self, payment_hash,
+                              max_pages=LIST_PAYMENTS_MAX_PAGES):
+        updates = self._router_conn.TrackPaymentV2(
+                track_payment_request(payment_hash),
+                timeout=self.timeout_seconds + PAYMENT_DEADLINE_GRACE,
+        )
+
+        # lnd ends the stream once the payment resolves. It's read to the
+        # end rather than cancelled, which would fail the call as CANCELLED.
+        done = False
+        try:
+            async for payment in updates:
+                if not done:
+                    done, pre_image = tracked_preimage(payment)
+        except grpc.RpcError as e:
+            if done:
+                return pre_image
+
+            if not track_payment_failed(e, payment_hash):
+                return None
+
+            return await self._list_payments_preimage(
+                    payment_hash, max_pages,
+            )
+
+        if done:
+            return pre_image
+
+        raise PaymentTimeoutError(payment_hash)
+
+    async def _list_payments_preimage(self, payment_hash, max_pages):
+        index_offset = 0
+        for _ in range(max_pages):
+            resp = await self._grpc_conn.ListPayments(
+                    list_payments_request(index_offset),
+            )
+
+            pre_image, index_offset = find_payment_preimage(
+                    resp, payment_hash,
+            )
+            if pre_image is not None or index_offset is None:
+                return pre_image
+
+        return None
+
+    async def send_payment(self, invoice, use_router=None, **kwargs):
+        if use_router is None:
+            use_router = self.use_router
+
+        if use_router:
+            return await self.send_payment_v2(invoice, **kwargs)
+
+        return await self._grpc_conn.SendPaymentSync(
+                ln.SendRequest(payment_request=invoice),
+        )
+
+    async def send_payment_v2(self, invoice, amt=None, timeout_seconds=None,
+                              fee_limit_sat=None, max_parts=None,
+                              on_update=None):
+        timeout_seconds, fee_limit_sat, max_parts = router_options(
+                self, timeout_seconds, fee_limit_sat, max_parts,
+        )
+
+        req = send_payment_request(
+                invoice, amt=amt, timeout_seconds=timeout_seconds,
+                fee_limit_sat=fee_limit_sat, max_parts=max_parts,
+                no_inflight_updates=on_update is None,
+        )
+
+        updates = self._router_conn.SendPaymentV2(
+                req, timeout=timeout_seconds + PAYMENT_DEADLINE_GRACE,
+        )
+
+        payment_hash = None
+        final = None
+        try:
+            async for payment in updates:
+                payment_hash = payment.payment_hash
+                if on_update is not None:
+                    on_update(payment)
+
+                # The final update is followed by the end of the stream.
+                if payment_done(payment):
+                    final = payment
+        except grpc.RpcError as e:
+            # Once the final update is in, only the stream's end was lost.
+            deadline = e.code() == grpc.StatusCode.DEADLINE_EXCEEDED
+            if final is None and not deadline:
+                raise
+
+        if final is not None:
+            return final
+
+        if payment_hash is None:
+            payment_hash = bolt11.decode(invoice).payment_hash
+
+        raise PaymentTimeoutError(payment_hash)
+
+    async def create_invoice(self, memo, value, expiry=None):
+        invoice = ln.Invoice(memo=memo, value=value)
+        if expiry is not None:
+            invoice.expiry = expiry
+
+        return await self._grpc_conn.AddInvoice(invoice)
+
+    async def decode_invoice(self, invoice, local=True):
+        if local:
+            return bolt11.decode(invoice)
+
+        req = ln.PayReqString(pay_req=invoice)
+        return await self._grpc_conn.DecodePayReq(req)
+
+    async def channel_balance(self):
+        return await self._grpc_conn.ChannelBalance(ln.ChannelBalanceRequest())
+
+    async def wallet_balance(self):
+        return await self._grpc_conn.WalletBalance(ln.WalletBalanceRequest())
+
+    async def get_info(self):
+        return await self._grpc_conn.GetInfo(ln.GetInfoRequest())
+
+    async def snapshot(self, channels=False, pending_channels=False,
+                       timeout=None):
+        conn = self._grpc_conn
+
+        calls = {
+            'info': conn.GetInfo(ln.GetInfoRequest(), timeout=timeout),
+            'channel_balance': conn.ChannelBalance(
+                    ln.ChannelBalanceRequest(), timeout=timeout,
+            ),
+            'wallet_balance': conn.WalletBalance(
+                    ln.WalletBalanceRequest(), timeout=timeout,
+            ),
+        }
+        if channels:
+            calls['channels'] = conn.ListChannels(
+                    ln.ListChannelsRequest(), timeout=timeout,
+            )
+        if pending_channels:
+            calls['pending_channels'] = conn.PendingChannels(
+                    ln.PendingChannelsRequest(), timeout=timeout,
+            )
+
+        try:
+            responses = await asyncio.gather(*calls.values())
+        except BaseException:
+            for call in calls.values():
+                call.cancel()
+            raise
+
+        return build_snapshot(**dict(zip(calls, responses)))
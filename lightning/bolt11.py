@@ -0,0 +1,482 @@
+from . import secp256k1
+from .lazy_module import LazyModule
+
+import functools
+import hashlib
+import operator
+import re
+import time
+
+ln = LazyModule('protos.lightning_pb2')
+
+CHARSET = "qpzry9x8gf2tvdw0s3jn54khce6mua7l"
+_CHARSET_REV = {c: i for i, c in enumerate(CHARSET)}
+
+_BECH32_CONST = 1
+_BECH32M_CONST = 0x2bc830a3
+
+_BASE58_ALPHABET = (
+    "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+)
+
+# Values lnd falls back to when an invoice omits the x or c field.
+DEFAULT_EXPIRY = 3600
+DEFAULT_MIN_FINAL_CLTV_EXPIRY = 18
+
+# Tagged field types, named by their bech32 character.
+_TAG_PAYMENT_HASH = _CHARSET_REV['p']
+_TAG_PAYMENT_ADDR = _CHARSET_REV['s']
+_TAG_DESCRIPTION = _CHARSET_REV['d']
+_TAG_DESTINATION = _CHARSET_REV['n']
+_TAG_DESCRIPTION_HASH = _CHARSET_REV['h']
+_TAG_EXPIRY = _CHARSET_REV['x']
+_TAG_MIN_FINAL_CLTV_EXPIRY = _CHARSET_REV['c']
+_TAG_FALLBACK_ADDR = _CHARSET_REV['f']
+_TAG_ROUTE_HINT = _CHARSET_REV['r']
+_TAG_FEATURES = _CHARSET_REV['9']
+
+# Number of 5-bit groups in the timestamp and trailing signature.
+_TIMESTAMP_LEN = 7
+_SIGNATURE_LEN = 104
+
+_HOP_HINT_LEN = 51
+
+# Currency prefix -> (segwit hrp, p2pkh version, p2sh version), used to
+# render fallback addresses.
+_NETWORKS = {
+    'bc': ('bc', 0x00, 0x05),
+    'tb': ('tb', 0x6f, 0xc4),
+    'tbs': ('tb', 0x6f, 0xc4),
+    'bcrt': ('bcrt', 0x6f, 0xc4),
+    'sb': ('sb', 0x3f, 0x7b),
+}
+
+# Features set on encoded invoices: tlv-onion and payment-addr required,
+# multi-path-payments optional, as lnd sets them.
+DEFAULT_INVOICE_FEATURES = 1 << 8 | 1 << 14 | 1 << 17
+
+_HRP_RE = re.compile(r'^ln(bcrt|bc|tbs|tb|sb)(\d+)?([munp])?$')
+
+# Millisatoshis per unit of each amount multiplier. Pico-bitcoin is a tenth
+# of a millisatoshi, so it's handled separately.
+_MSAT_PER_UNIT = {
+    None: 100000000000,
+    'm': 100000000,
+    'u': 100000,
+    'n': 100,
+}
+
+# Feature bit names as reported by lnd. Both bits of a pair share a name.
+FEATURE_NAMES = {
+    0: 'data-loss-protect',
+    2: 'initial-routing-sync',
+    4: 'upfront-shutdown-script',
+    6: 'gossip-queries',
+    8: 'tlv-onion',
+    12: 'static-remote-key',
+    14: 'payment-addr',
+    16: 'multi-path-payments',
+    18: 'wumbo-channels',
+    20: 'anchor-commitments',
+    22: 'anchors-zero-fee-htlc-tx',
+    26: 'shutdown-any-segwit',
+    30: 'amp',
+    44: 'explicit-commitment-type',
+    46: 'scid-alias',
+    48: 'payment-metadata',
+    50: 'zero-conf',
+    54: 'keysend',
+    2022: 'script-enforced-lease',
+}
+
+
+class Bolt11DecodeError(ValueError):
+    """
+    Raised when a payment request isn't a valid BOLT11 invoice.
+    """
+
+
+_BECH32_GENERATOR = (
+    0x3b6a57b2, 0x26508e6d, 0x1ea119fa, 0x3d4233dd, 0x2a1462b3,
+)
+
+# What the checksum is XORed with for each value of its top five bits,
+# so each step is one lookup rather than a loop over the generator.
+_BECH32_POLYMOD_TABLE = tuple(
+    functools.reduce(
+        operator.xor,
+        (g for i, g in enumerate(_BECH32_GENERATOR) if top >> i & 1),
+        0,
+    )
+    for top in range(32)
+)
+
+
+def _bech32_polymod(values):
+    table = _BECH32_POLYMOD_TABLE
+
+    chk = 1
+    for value in values:
+        chk = (chk & 0x1ffffff) << 5 ^ value ^ table[chk >> 25]
+
+    return chk
+
+
+def _bech32_hrp_expand(hrp):
+    return [ord(c) >> 5 for c in hrp] + [0] + [ord(c) & 31 for c in hrp]
+
+
+def _bech32_checksum(hrp, data, const):
+    values = _bech32_hrp_expand(hrp) + data
+    polymod = _bech32_polymod(values + [0] * 6) ^ const
+
+    return [(polymod >> 5 * (5 - i)) & 31 for i in range(6)]
+
+
+def _bech32_encode(hrp, data, const=_BECH32_CONST):
+    checksum = _bech32_checksum(hrp, data, const)
+
+    return hrp + '1' + ''.join(CHARSET[d] for d in data + checksum)
+
+
+def _bech32_decode(bech):
+    # Unlike segwit addresses, invoices aren't limited to 90 characters.
+    if bech.lower() != bech and bech.upper() != bech:
+        raise Bolt11DecodeError("mixed case payment request")
+    bech = bech.lower()
+
+    pos = bech.rfind('1')
+    if pos < 1 or pos + 7 > len(bech):
+        raise Bolt11DecodeError("missing bech32 separator")
+
+    hrp = bech[:pos]
+    try:
+        data = [_CHARSET_REV[c] for c in bech[pos + 1:]]
+    except KeyError as e:
+        raise Bolt11DecodeError(
+            "invalid bech32 character {}".format(e),
+        ) from None
+
+    if _bech32_polymod(_bech32_hrp_expand(hrp) + data) != _BECH32_CONST:
+        raise Bolt11DecodeError("invalid bech32 checksum")
+
+    return hrp, data[:-6]
+
+
+def _convert_bits(data, from_bits, to_bits):
+    acc = 0
+    bits = 0
+    out = []
+    max_value = (1 << to_bits) - 1
+    for value in data:
+        acc = (acc << from_bits) | value
+        bits += from_bits
+        while bits >= to_bits:
+            bits -= to_bits
+            out.append((acc >> bits) & max_value)
+
+    if bits:
+        out.append((acc << (to_bits - bits)) & max_value)
+
+    return out
+
+
+def _groups_to_int(groups):
+    value = 0
+    for group in groups:
+        value = (value << 5) | group
+
+    return value
+
+
+def _int_to_groups(value, length=0):
+    groups = []
+    while value:
+        groups.append(value & 31)
+        value >>= 5
+
+    groups.extend([0] * (length - len(groups)))
+    groups.reverse()
+
+    return groups
+
+
+def _groups_to_bytes(groups):
+    """
+    Packs 5-bit groups into bytes, dropping trailing padding bits.
+    """
+    num_bits = len(groups) * 5
+    num_bytes = num_bits // 8
+    value = _groups_to_int(groups) >> (num_bits - num_bytes * 8)
+
+    return value.to_bytes(num_bytes, 'big')
+
+
+def _base58check_encode(payload):
+    payload += hashlib.sha256(hashlib.sha256(payload).digest()).digest()[:4]
+
+    value = int.from_bytes(payload, 'big')
+    encoded = ''
+    while value:
+        value, mod = divmod(value, 58)
+        encoded = _BASE58_ALPHABET[mod] + encoded
+
+    leading_zeros = len(payload) - len(payload.lstrip(b'\x00'))
+
+    return '1' * leading_zeros + encoded
+
+
+def _fallback_address(currency, groups):
+    segwit_hrp, p2pkh_version, p2sh_version = _NETWORKS[currency]
+
+    version = groups[0]
+    program = _groups_to_bytes(groups[1:])
+
+    if version == 17:
+        return _base58check_encode(bytes([p2pkh_version]) + program)
+    if version == 18:
+        return _base58check_encode(bytes([p2sh_version]) + program)
+    if version > 16:
+        return ''
+
+    const = _BECH32_CONST if version == 0 else _BECH32M_CONST
+    data = [version] + _convert_bits(program, 8, 5)
+
+    return _bech32_encode(segwit_hrp, data, const)
+
+
+def _route_hint(raw):
+    if len(raw) % _HOP_HINT_LEN != 0:
+        raise Bolt11DecodeError("invalid route hint length")
+
+    hop_hints = []
+    for i in range(0, len(raw), _HOP_HINT_LEN):
+        hop = raw[i:i + _HOP_HINT_LEN]
+        hop_hints.append(ln.HopHint(
+            node_id=hop[:33].hex(),
+            chan_id=int.from_bytes(hop[33:41], 'big'),
+            fee_base_msat=int.from_bytes(hop[41:45], 'big'),
+            fee_proportional_millionths=int.from_bytes(hop[45:49], 'big'),
+            cltv_expiry_delta=int.from_bytes(hop[49:51], 'big'),
+        ))
+
+    return ln.RouteHint(hop_hints=hop_hints)
+
+
+def _amount_msat(amount, multiplier):
+    if amount is None:
+        return 0
+
+    if amount.startswith('0'):
+        raise Bolt11DecodeError("amount has leading zeros")
+
+    if multiplier == 'p':
+        if amount[-1] != '0':
+            raise Bolt11DecodeError("sub-millisatoshi amount")
+
+        return int(amount) // 10
+
+    return int(amount) * _MSAT_PER_UNIT[multiplier]
+
+
+def _hrp_amount(amount_msat):
+    """
+    Renders amount_msat with the largest multiplier that represents it
+    exactly.
+    """
+    if not amount_msat:
+        return ''
+
+    for multiplier in (None, 'm', 'u', 'n'):
+        unit = _MSAT_PER_UNIT[multiplier]
+        if amount_msat % unit == 0:
+            return '{}{}'.format(amount_msat // unit, multiplier or '')
+
+    return '{}p'.format(amount_msat * 10)
+
+
+def _parse_hrp(hrp):
+    match = _HRP_RE.match(hrp)
+    if match is None:
+        raise Bolt11DecodeError("unknown invoice prefix: {}".format(hrp))
+
+    currency, amount, multiplier = match.groups()
+
+    return currency, _amount_msat(amount, multiplier)
+
+
+@functools.lru_cache(maxsize=4096)
+def _decode(invoice):
+    hrp, data = _bech32_decode(invoice)
+
+    currency, amount_msat = _parse_hrp(hrp)
+
+    if len(data) < _TIMESTAMP_LEN + _SIGNATURE_LEN:
+        raise Bolt11DecodeError("payment request too short")
+
+    signature = _groups_to_bytes(data[-_SIGNATURE_LEN:])
+    data = data[:-_SIGNATURE_LEN]
+
+    pay_req = ln.PayReq(
+        timestamp=_groups_to_int(data[:_TIMESTAMP_LEN]),
+        num_msat=amount_msat,
+        num_satoshis=amount_msat // 1000,
+        expiry=DEFAULT_EXPIRY,
+        cltv_expiry=DEFAULT_MIN_FINAL_CLTV_EXPIRY,
+    )
+
+    destination = None
+    seen = set()
+
+    pos = _TIMESTAMP_LEN
+    while pos < len(data):
+        if pos + 3 > len(data):
+            raise Bolt11DecodeError("truncated tagged field")
+
+        tag = data[pos]
+        length = data[pos + 1] << 5 | data[pos + 2]
+        field = data[pos + 3:pos + 3 + length]
+        if len(field) != length:
+            raise Bolt11DecodeError("truncated tagged field")
+        pos += 3 + length
+
+        # Route hints may repeat; for every other field the first one with
+        # a valid length wins, and others are skipped as BOLT11 requires.
+        if tag in seen:
+            continue
+
+        if tag == _TAG_PAYMENT_HASH and length == 52:
+            pay_req.payment_hash = _groups_to_bytes(field).hex()
+        elif tag == _TAG_PAYMENT_ADDR and length == 52:
+            pay_req.payment_addr = _groups_to_bytes(field)
+        elif tag == _TAG_DESCRIPTION:
+            try:
+                pay_req.description = _groups_to_bytes(field).decode('utf-8')
+            except UnicodeDecodeError:
+                raise Bolt11DecodeError("description isn't valid utf-8")
+        elif tag == _TAG_DESTINATION and length == 53:
+            destination = _groups_to_bytes(field)
+        elif tag == _TAG_DESCRIPTION_HASH and length == 52:
+            pay_req.description_hash = _groups_to_bytes(field).hex()
+        elif tag == _TAG_EXPIRY:
+            pay_req.expiry = _groups_to_int(field)
+        elif tag == _TAG_MIN_FINAL_CLTV_EXPIRY:
+            pay_req.cltv_expiry = _groups_to_int(field)
+        elif tag == _TAG_FALLBACK_ADDR and length > 0:
+            pay_req.fallback_addr = _fallback_address(currency, field)
+        elif tag == _TAG_ROUTE_HINT:
+            pay_req.route_hints.append(_route_hint(_groups_to_bytes(field)))
+            continue
+        elif tag == _TAG_FEATURES:
+            _set_features(pay_req, _groups_to_int(field))
+        else:
+            continue
+
+        seen.add(tag)
+
+    if not pay_req.payment_hash:
+        raise Bolt11DecodeError("missing payment hash")
+
+    msg_hash = hashlib.sha256(
+        hrp.encode('utf-8') + bytes(_convert_bits(data, 5, 8)),
+    ).digest()
+
+    recovery_id = signature[64]
+    signature = signature[:64]
+
+    try:
+        if destination is None:
+            destination = secp256k1.recover_pubkey(
+                msg_hash, signature, recovery_id,
+            )
+        elif not secp256k1.verify(msg_hash, signature, destination):
+            raise ValueError("signature doesn't match destination")
+    except ValueError as e:
+        raise Bolt11DecodeError("invalid signature: {}".format(e)) from None
+
+    pay_req.destination = destination.hex()
+
+    return pay_req
+
+
+def _set_features(pay_req, bits):
+    bit = 0
+    while bits:
+        if bits & 1:
+            name = FEATURE_NAMES.get(bit & ~1)
+            pay_req.features[bit].CopyFrom(ln.Feature(
+                name=name or 'unknown',
+                is_required=bit % 2 == 0,
+                is_known=name is not None,
+            ))
+
+        bits >>= 1
+        bit += 1
+
+
+def decode(invoice) -> 'ln.PayReq':
+    """
+    Decodes a BOLT11 payment request locally into the same ln.PayReq that
+    lnd's DecodePayReq returns, without needing a node.
+
+    Results are cached by invoice string. Each call returns a fresh copy,
+    so callers are free to modify it.
+    """
+    invoice = invoice.strip()
+    if invoice[:10].lower() == 'lightning:':
+        invoice = invoice[10:]
+
+    pay_req = ln.PayReq()
+    pay_req.CopyFrom(_decode(invoice))
+
+    return pay_req
+
+
+def _tagged_field(tag, groups):
+    return [tag, len(groups) >> 5, len(groups) & 31] + groups
+
+
+def encode(secret, payment_hash, amount_msat=0, description='',
+           payment_addr=None, currency='bcrt', timestamp=None,
+           expiry=DEFAULT_EXPIRY,
+           min_final_cltv_expiry=DEFAULT_MIN_FINAL_CLTV_EXPIRY,
+           features=DEFAULT_INVOICE_FEATURES) -> str:
+    """
+    Encodes and signs a BOLT11 payment request with the 32 byte private key
+    secret. payment_hash and payment_addr are raw bytes; a zero amount_msat
+    leaves the amount for the payer to choose. timestamp defaults to now.
+    """
+    if currency not in _NETWORKS:
+        raise ValueError("unknown currency: {}".format(currency))
+    if len(payment_hash) != 32:
+        raise ValueError("payment hash must be 32 bytes")
+
+    if timestamp is None:
+        timestamp = int(time.time())
+
+    hrp = 'ln{}{}'.format(currency, _hrp_amount(amount_msat))
+
+    data = _int_to_groups(timestamp, _TIMESTAMP_LEN)
+    data += _tagged_field(_TAG_PAYMENT_HASH, _convert_bits(payment_hash, 8, 5))
+    if payment_addr is not None:
+        data += _tagged_field(
+            _TAG_PAYMENT_ADDR, _convert_bits(payment_addr, 8, 5),
+        )
+    data += _tagged_field(
+        _TAG_DESCRIPTION, _convert_bits(description.encode('utf-8'), 8, 5),
+    )
+    data += _tagged_field(_TAG_EXPIRY, _int_to_groups(expiry))
+    data += _tagged_field(
+        _TAG_MIN_FINAL_CLTV_EXPIRY, _int_to_groups(min_final_cltv_expiry),
+    )
+    if features:
+        data += _tagged_field(_TAG_FEATURES, _int_to_groups(features))
+
+    msg_hash = hashlib.sha256(
+        hrp.encode('utf-8') + bytes(_convert_bits(data, 5, 8)),
+    ).digest()
+    signature, recovery_id = secp256k1.sign_recoverable(msg_hash, secret)
+
+    data += _convert_bits(signature + bytes([recovery_id]), 8, 5)
+
+    return _bech32_encode(hrp, data)
@@ -0,0 +1,169 @@
+import codecs
+import os
+import threading
+
+from .lazy_module import LazyModule
+
+grpc = LazyModule('grpc')
+
+# lnd's own clients accept responses of up to 200MB, which large calls such
+# as DescribeGraph on mainnet need.
+MAX_MESSAGE_LENGTH = 200 * 1024 * 1024
+
+# Ping an idle connection every 30 seconds so half-dead connections are
+# noticed and replaced instead of hanging the next call. This is well above
+# the minimum ping interval lnd enforces on its clients.
+KEEPALIVE_TIME_MS = 30 * 1000
+KEEPALIVE_TIMEOUT_MS = 20 * 1000
+
+
+def channel_credentials(cert_path, macaroon_path):
+    """
+    Builds channel credentials that encrypt the connection with lnd's TLS
+    certificate and authenticate every call with the given macaroon.
+    """
+
+    # Due to updated ECDSA generated tls.cert we need to let gprc know that
+    # we need to use that cipher suite otherwise there will be a handhsake
+    # error when we communicate with the lnd rpc server. This is done here
+    # rather than at import so it happens only if we're talking to lnd, and
+    # doesn't override a value the application has chosen.
+    os.environ.setdefault("GRPC_SSL_CIPHER_SUITES", 'HIGH+ECDSA')
+
+    with open(os.path.expanduser(cert_path), 'rb') as f:
+        cert_bytes = f.read()
+        cert_creds = grpc.ssl_channel_credentials(cert_bytes)
+
+    with open(os.path.expanduser(macaroon_path), 'rb') as f:
+        macaroon_bytes = f.read()
+        macaroon = codecs.encode(macaroon_bytes, 'hex')
+
+    def metadata_callback(context, callback):
+        # for more info see grpc docs
+        callback([('macaroon', macaroon)], None)
+
+    # now build meta data credentials
+    auth_creds = grpc.metadata_call_credentials(metadata_callback)
+
+    # combine the cert credentials and the macaroon auth credentials
+    # such that every call is properly encrypted and authenticated
+    return grpc.composite_channel_credentials(cert_creds, auth_creds)
+
+
+def channel_options(keepalive_time_ms=KEEPALIVE_TIME_MS,
+                    keepalive_timeout_ms=KEEPALIVE_TIMEOUT_MS,
+                    max_message_length=MAX_MESSAGE_LENGTH,
+                    extra_options=None):
+    """
+    Returns the gRPC channel arguments used for connections to lnd.
+    """
+    options = [
+        ('grpc.keepalive_time_ms', keepalive_time_ms),
+        ('grpc.keepalive_timeout_ms', keepalive_timeout_ms),
+        ('grpc.keepalive_permit_without_calls', 1),
+        ('grpc.http2.max_pings_without_data', 0),
+        ('grpc.max_receive_message_length', max_message_length),
+        ('grpc.max_send_message_length', max_message_length),
+    ]
+
+    return options + list(extra_options or [])
+
+
+def channel_key(host, port, cert_path, macaroon_path):
+    return (
+        host, str(port),
+        os.path.realpath(os.path.expanduser(cert_path)),
+        os.path.realpath(os.path.expanduser(macaroon_path)),
+    )
+
+
+class ChannelPool(object):
+    """
+    Shares gRPC channels to lnd between nodes, keyed by (host, port, cert,
+    macaroon). A single HTTP/2 channel multiplexes any number of concurrent
+    calls, so every LndNode for the same node and credentials reuses one
+    connection, one TLS session and one read of the credential files.
+
+    Channels are reference counted: acquire hands out a channel and release
+    gives it back, closing it once nobody holds it. close_all tears down
+    every channel regardless.
+    """
+
+    def __init__(self, keepalive_time_ms=KEEPALIVE_TIME_MS,
+                 keepalive_timeout_ms=KEEPALIVE_TIMEOUT_MS,
+                 max_message_length=MAX_MESSAGE_LENGTH, compression=None,
+                 extra_options=None):
+
+        self.options = channel_options(
+            keepalive_time_ms=keepalive_time_ms,
+            keepalive_timeout_ms=keepalive_timeout_ms,
+            max_message_length=max_message_length,
+            extra_options=extra_options,
+        )
+        self.compression = compression
+
+        self._lock = threading.Lock()
+        self._channels = {}
+        self._refs = {}
+
+    def __len__(self):
+        with self._lock:
+            return len(self._channels)
+
+    def acquire(self, host, port, cert_path, macaroon_path):
+        key = channel_key(host, port, cert_path, macaroon_path)
+
+        with self._lock:
+            channel = self._channels.get(key)
+            if channel is None:
+                channel = grpc.secure_channel(
+                    '{}:{}'.format(host, port),
+                    channel_credentials(cert_path, macaroon_path),
+                    options=self.options, compression=self.compression,
+                )
+                self._channels[key] = channel
+                self._refs[key] = 0
+
+            self._refs[key] += 1
+
+            return key, channel
+
+    def release(self, key):
+        with self._lock:
+            if key not in self._refs:
+                return
+
+            self._refs[key] -= 1
+            if self._refs[key] > 0:
+                return
+
+            del self._refs[key]
+            channel = self._channels.pop(key)
+
+        channel.close()
+
+    def close_all(self):
+        with self._lock:
+            channels = list(self._channels.values())
+            self._channels.clear()
+            self._refs.clear()
+
+        for channel in channels:
+            channel.close()
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def default_channel_pool():
+    """
+    Returns the process-wide pool LndNode uses unless given its own.
+    """
+    global _default_pool
+
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = ChannelPool()
+
+        return _default_pool
@@ -0,0 +1,45 @@
+class PaymentError(Exception):
+    """
+    Raised when lnd reports that a payment failed.
+    """
+
+    def __init__(self, payment_hash, reason):
+        self.payment_hash = payment_hash
+        self.reason = reason
+
+        super().__init__(
+            'payment {} failed: {}'.format(payment_hash, reason),
+        )
+
+
+class PaymentTimeoutError(PaymentError):
+    """
+    Raised when a payment hasn't reached a final state by its deadline.
+
+    This doesn't mean the payment failed: HTLCs may still be in flight and
+    settle later, so the payment hash should be tracked before retrying.
+    """
+
+    def __init__(self, payment_hash):
+        super().__init__(payment_hash, 'no final state before the deadline')
+
+
+class InvoiceCanceledError(Exception):
+    """
+    Raised to waiters on an invoice that was canceled instead of settled.
+    """
+
+    def __init__(self, payment_hash):
+        self.payment_hash = payment_hash
+
+        super().__init__('invoice {} was canceled'.format(payment_hash))
+
+
+class InvoiceWatcherStoppedError(Exception):
+    """
+    Raised to waiters on an invoice whose InvoiceWatcher was stopped, for
+    instance by closing its node, before the invoice was resolved.
+    """
+
+    def __init__(self):
+        super().__init__('invoice watcher was stopped')
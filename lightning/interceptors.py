@@ -0,0 +1,158 @@
+import time
+
+import grpc
+
+from metrics import SIZE_BUCKETS
+
+METRIC_RPC_CALLS = "lnd_rpc_calls_total"
+METRIC_RPC_SECONDS = "lnd_rpc_seconds"
+METRIC_RPC_REQUEST_BYTES = "lnd_rpc_request_bytes"
+METRIC_RPC_RESPONSE_BYTES = "lnd_rpc_response_bytes"
+
+# Histogram bounds for the message size metrics, so they're bucketed by
+# bytes rather than seconds. MetricsInterceptor sets these on its sink.
+RPC_METRIC_BUCKETS = {
+    METRIC_RPC_REQUEST_BYTES: SIZE_BUCKETS,
+    METRIC_RPC_RESPONSE_BYTES: SIZE_BUCKETS,
+}
+
+
+class _InstrumentedStream(object):
+    """
+    Wraps a response-streaming call, measuring each message as it's read
+    while behaving like the call itself.
+    """
+
+    def __init__(self, call, on_message):
+        self._call = call
+        self._on_message = on_message
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        message = next(self._call)
+        self._on_message(message)
+
+        return message
+
+    def __getattr__(self, attr):
+        return getattr(self._call, attr)
+
+
+class MetricsInterceptor(grpc.UnaryUnaryClientInterceptor,
+                         grpc.UnaryStreamClientInterceptor,
+                         grpc.StreamUnaryClientInterceptor,
+                         grpc.StreamStreamClientInterceptor):
+    """
+    Client interceptor reporting every RPC to a MetricsSink, labelled by
+    method: a call count per status code, the latency until the call
+    completes (for streams, until the stream ends), and the size of every
+    request and response message.
+
+    When the sink is disabled calls pass straight through.
+    """
+
+    def __init__(self, metrics):
+        self.metrics = metrics
+
+        for name, buckets in RPC_METRIC_BUCKETS.items():
+            metrics.set_default_buckets(name, buckets)
+
+    def _start(self, details):
+        return {'method': details.method.lstrip('/')}, time.perf_counter()
+
+    def _finish(self, labels, start, call):
+        code = call.code()
+
+        self.metrics.observe(
+            METRIC_RPC_SECONDS, time.perf_counter() - start, labels,
+        )
+        self.metrics.incr(
+            METRIC_RPC_CALLS,
+            labels=dict(labels, code=code.name if code else 'UNKNOWN'),
+        )
+
+        return code
+
+    def _size_observer(self, name, labels):
+        def observe(message):
+            self.metrics.observe(name, message.ByteSize(), labels)
+            return message
+
+        return observe
+
+    def _requests(self, request_iterator, labels):
+        observe = self._size_observer(METRIC_RPC_REQUEST_BYTES, labels)
+        for request in request_iterator:
+            yield observe(request)
+
+    def _unary_response(self, labels, start, outcome):
+        def done(call):
+            if self._finish(labels, start, call) == grpc.StatusCode.OK:
+                self.metrics.observe(
+                    METRIC_RPC_RESPONSE_BYTES, call.result().ByteSize(),
+                    labels,
+                )
+
+        outcome.add_done_callback(done)
+
+        return outcome
+
+    def _stream_response(self, labels, start, call):
+        if not call.add_callback(lambda: self._finish(labels, start, call)):
+            self._finish(labels, start, call)
+
+        return _InstrumentedStream(
+            call, self._size_observer(METRIC_RPC_RESPONSE_BYTES, labels),
+        )
+
+    def intercept_unary_unary(self, continuation, details, request):
+        if not self.metrics.enabled:
+            return continuation(details, request)
+
+        labels, start = self._start(details)
+        self.metrics.observe(
+            METRIC_RPC_REQUEST_BYTES, request.ByteSize(), labels,
+        )
+
+        return self._unary_response(
+            labels, start, continuation(details, request),
+        )
+
+    def intercept_unary_stream(self, continuation, details, request):
+        if not self.metrics.enabled:
+            return continuation(details, request)
+
+        labels, start = self._start(details)
+        self.metrics.observe(
+            METRIC_RPC_REQUEST_BYTES, request.ByteSize(), labels,
+        )
+
+        return self._stream_response(
+            labels, start, continuation(details, request),
+        )
+
+    def intercept_stream_unary(self, continuation, details,
+                               request_iterator):
+        if not self.metrics.enabled:
+            return continuation(details, request_iterator)
+
+        labels, start = self._start(details)
+
+        return self._unary_response(
+            labels, start,
+            continuation(details, self._requests(request_iterator, labels)),
+        )
+
+    def intercept_stream_stream(self, continuation, details,
+                                request_iterator):
+        if not self.metrics.enabled:
+            return continuation(details, request_iterator)
+
+        labels, start = self._start(details)
+
+        return self._stream_response(
+            labels, start,
+            continuation(details, self._requests(request_iterator, labels)),
+        )
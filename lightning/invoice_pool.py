@@ -0,0 +1,167 @@
+from collections import deque
+
+import itertools
+import logging
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 5
+DEFAULT_INVOICE_EXPIRY = 3600
+
+# Pooled invoices are dropped once less than this many seconds of their
+# expiry remain, so a payer is never handed one that's about to lapse.
+DEFAULT_MIN_REMAINING = 600
+
+_RETRY_MIN_DELAY = 1
+_RETRY_MAX_DELAY = 60
+
+
+class InvoicePool(object):
+    """
+    Keeps a stock of ready-made invoices for common (value, memo_template)
+    pairs, minted in the background, so take can hand one out without
+    waiting on AddInvoice.
+
+    Pairs are stocked with stock, or automatically the first time they're
+    taken. memo_template is formatted with the invoice's sequence number as
+    seq, e.g. 'coffee #{seq}', so pooled invoices stay distinguishable.
+    Each pair is topped back up to size invoices after every take. Stock
+    that gets within min_remaining seconds of expiring is discarded and
+    replaced.
+
+    Every pooled invoice is a real invoice on the node, so keep size small:
+    unused ones simply expire.
+    """
+
+    def __init__(self, node, size=DEFAULT_POOL_SIZE,
+                 expiry=DEFAULT_INVOICE_EXPIRY,
+                 min_remaining=DEFAULT_MIN_REMAINING):
+
+        if min_remaining >= expiry:
+            raise ValueError("min_remaining must be shorter than expiry")
+
+        self.node = node
+        self.size = size
+        self.expiry = expiry
+        self.min_remaining = min_remaining
+
+        self._cond = threading.Condition()
+        self._stock = {}
+        self._seq = itertools.count()
+        self._stopped = False
+        self._thread = None
+
+    def __len__(self):
+        with self._cond:
+            return sum(len(invoices) for invoices in self._stock.values())
+
+    def stock(self, value, memo_template=''):
+        """
+        Starts keeping invoices for value satoshis and memo_template on
+        hand.
+        """
+        with self._cond:
+            self._stock.setdefault((value, memo_template), deque())
+            self._cond.notify()
+
+        self.start()
+
+    def take(self, value, memo_template=''):
+        """
+        Returns an AddInvoiceResponse for value satoshis, from the pool if
+        one is ready or minted on the spot otherwise.
+        """
+        key = (value, memo_template)
+
+        with self._cond:
+            invoices = self._stock.setdefault(key, deque())
+            self._drop_stale(invoices, time.monotonic())
+
+            invoice = invoices.popleft()[1] if invoices else None
+
+            # Wake the minter to top the pair back up.
+            self._cond.notify()
+
+        self.start()
+
+        if invoice is None:
+            invoice = self._mint(key)[1]
+
+        return invoice
+
+    def start(self):
+        with self._cond:
+            if self._thread is not None or self._stopped:
+                return
+
+            self._thread = threading.Thread(
+                target=self._run, name='lnd-invoice-pool', daemon=True,
+            )
+            self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    def _drop_stale(self, invoices, now):
+        while invoices and invoices[0][0] <= now:
+            invoices.popleft()
+
+    def _mint(self, key):
+        value, memo_template = key
+        memo = memo_template.format(seq=next(self._seq))
+
+        invoice = self.node.create_invoice(memo, value, expiry=self.expiry)
+
+        # The invoice is handed out only while enough of its expiry is left.
+        stale_at = time.monotonic() + self.expiry - self.min_remaining
+
+        return stale_at, invoice
+
+    def _next_to_mint(self):
+        now = time.monotonic()
+
+        next_stale = None
+        for key, invoices in self._stock.items():
+            self._drop_stale(invoices, now)
+
+            if len(invoices) < self.size:
+                return key, None
+
+            if next_stale is None or invoices[0][0] < next_stale:
+                next_stale = invoices[0][0]
+
+        timeout = None if next_stale is None else max(next_stale - now, 0)
+
+        return None, timeout
+
+    def _run(self):
+        delay = _RETRY_MIN_DELAY
+
+        while True:
+            with self._cond:
+                if self._stopped:
+                    return
+
+                key, timeout = self._next_to_mint()
+                if key is None:
+                    self._cond.wait(timeout)
+                    continue
+
+            try:
+                entry = self._mint(key)
+            except Exception as e:
+                log.debug("Minting pooled invoice failed: %s", e)
+
+                with self._cond:
+                    self._cond.wait(delay)
+                delay = min(delay * 2, _RETRY_MAX_DELAY)
+                continue
+
+            delay = _RETRY_MIN_DELAY
+
+            with self._cond:
+                self._stock[key].append(entry)
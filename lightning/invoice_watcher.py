@@ -0,0 +1,240 @@
+import logging
+import threading
+
+from .exceptions import InvoiceCanceledError, InvoiceWatcherStoppedError
+from .lazy_module import LazyModule
+
+grpc = LazyModule('grpc')
+ln = LazyModule('protos.lightning_pb2')
+
+log = logging.getLogger(__name__)
+
+_RESUBSCRIBE_MIN_DELAY = 1
+_RESUBSCRIBE_MAX_DELAY = 60
+
+
+def _fail(future, error):
+    # Futures cancelled by their caller are skipped.
+    if future.set_running_or_notify_cancel():
+        future.set_exception(error)
+
+
+class InvoiceWatcher(object):
+    """
+    Waits on any number of invoices over a single SubscribeInvoices stream.
+
+    watch returns a concurrent.futures.Future per call that resolves to the
+    settled ln.Invoice, or fails with InvoiceCanceledError if the invoice is
+    canceled. The stream is opened on the first watch and kept open on a
+    background thread, reconnecting with backoff if it drops. Once the
+    watcher is stopped, outstanding and new futures fail with
+    InvoiceWatcherStoppedError.
+
+    Reconnects resume from the highest settle_index seen, so lnd replays
+    any settlement that happened while the stream was down. Until a
+    settle_index is known, invoices are looked up when they're watched and
+    again after every (re)subscribe instead, so an invoice settled before
+    the stream was live isn't missed.
+    """
+
+    def __init__(self, node, settle_index=0):
+        self.node = node
+        self.settle_index = settle_index
+
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._waiters = {}
+        self._stream = None
+        self._thread = None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._waiters)
+
+    def watch(self, payment_hash, lookup=True):
+        """
+        Returns a Future for the settlement of the invoice with the given
+        hex encoded payment_hash. Unless lookup is False, the invoice is
+        looked up first so one that's already settled resolves right away.
+
+        Cancelling the returned future stops watching for this caller.
+        """
+        # Imported here, like asyncio below, so importing the package
+        # doesn't load either.
+        from concurrent.futures import Future
+
+        future = Future()
+
+        with self._lock:
+            stopped = self._stopped.is_set()
+            if not stopped:
+                self._waiters.setdefault(payment_hash, []).append(future)
+
+        if stopped:
+            _fail(future, InvoiceWatcherStoppedError())
+            return future
+
+        future.add_done_callback(
+            lambda future: self._forget(payment_hash, future),
+        )
+
+        self.start()
+
+        if lookup:
+            self._lookup(payment_hash)
+
+        return future
+
+    def wait(self, payment_hash, timeout=None):
+        """
+        Blocks until the invoice settles and returns it. Raises
+        concurrent.futures.TimeoutError if it hasn't within timeout.
+        """
+        future = self.watch(payment_hash)
+        try:
+            return future.result(timeout=timeout)
+        finally:
+            future.cancel()
+
+    async def wait_async(self, payment_hash, timeout=None):
+        """
+        The awaitable counterpart of wait. Raises asyncio.TimeoutError if
+        the invoice hasn't settled within timeout.
+        """
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+
+        # The initial lookup is a blocking call, keep it off the loop.
+        future = await loop.run_in_executor(None, self.watch, payment_hash)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        finally:
+            future.cancel()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None or self._stopped.is_set():
+                return
+
+            self._thread = threading.Thread(
+                target=self._run, name='lnd-invoice-watcher', daemon=True,
+            )
+            self._thread.start()
+
+    def stop(self):
+        """
+        Closes the stream and fails every outstanding future with
+        InvoiceWatcherStoppedError, as nothing will resolve them any more.
+        """
+        self._stopped.set()
+
+        with self._lock:
+            stream = self._stream
+            self._stream = None
+
+            waiters = self._waiters
+            self._waiters = {}
+
+        if stream is not None:
+            stream.cancel()
+
+        error = InvoiceWatcherStoppedError()
+        for futures in waiters.values():
+            for future in futures:
+                _fail(future, error)
+
+    def _forget(self, payment_hash, future):
+        with self._lock:
+            waiters = self._waiters.get(payment_hash)
+            if waiters is None or future not in waiters:
+                return
+
+            waiters.remove(future)
+            if not waiters:
+                del self._waiters[payment_hash]
+
+    def _lookup(self, payment_hash):
+        try:
+            invoice = self.node._grpc_conn.LookupInvoice(
+                ln.PaymentHash(r_hash=bytes.fromhex(payment_hash)),
+            )
+        except grpc.RpcError as e:
+            # An invoice lnd doesn't know about will never settle, anything
+            # else is left for the stream to resolve.
+            if e.code() == grpc.StatusCode.NOT_FOUND:
+                self._resolve(payment_hash, error=e)
+            else:
+                log.debug("Looking up invoice %s failed: %s", payment_hash, e)
+
+            return
+        except ValueError:
+            # The node's channel was closed under us, in which case stop
+            # has already failed the waiters.
+            if not self._stopped.is_set():
+                raise
+
+            return
+
+        self._update(invoice)
+
+    def _resolve(self, payment_hash, invoice=None, error=None):
+        with self._lock:
+            waiters = self._waiters.pop(payment_hash, ())
+
+        for future in waiters:
+            if error is not None:
+                _fail(future, error)
+            elif future.set_running_or_notify_cancel():
+                future.set_result(invoice)
+
+    def _update(self, invoice):
+        if invoice.settle_index > self.settle_index:
+            self.settle_index = invoice.settle_index
+
+        if invoice.state == ln.Invoice.SETTLED:
+            self._resolve(invoice.r_hash.hex(), invoice=invoice)
+        elif invoice.state == ln.Invoice.CANCELED:
+            payment_hash = invoice.r_hash.hex()
+            self._resolve(
+                payment_hash, error=InvoiceCanceledError(payment_hash),
+            )
+
+    def _run(self):
+        delay = _RESUBSCRIBE_MIN_DELAY
+
+        while not self._stopped.is_set():
+            stream = None
+            try:
+                stream = self.node._grpc_conn.SubscribeInvoices(
+                    ln.InvoiceSubscription(settle_index=self.settle_index),
+                )
+                with self._lock:
+                    if self._stopped.is_set():
+                        stream.cancel()
+                        return
+                    self._stream = stream
+
+                    pending = list(self._waiters)
+
+                # Without a settle_index lnd won't replay anything, so catch
+                # up on whatever settled before we were subscribed.
+                if not self.settle_index:
+                    for payment_hash in pending:
+                        self._lookup(payment_hash)
+
+                for invoice in stream:
+                    delay = _RESUBSCRIBE_MIN_DELAY
+                    self._update(invoice)
+            except Exception as e:
+                if self._stopped.is_set():
+                    return
+
+                log.debug("Invoice subscription failed: %s", e)
+            finally:
+                with self._lock:
+                    if self._stream is stream:
+                        self._stream = None
+
+            self._stopped.wait(delay)
+            delay = min(delay * 2, _RESUBSCRIBE_MAX_DELAY)
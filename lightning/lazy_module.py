@@ -0,0 +1,29 @@
+import importlib
+
+
+class LazyModule(object):
+    """
+    Stands in for a module that isn't imported until one of its attributes
+    is first used.
+
+    grpc and the generated lnd stubs take a large share of the time it takes
+    to import this package, so they're only loaded once a node actually
+    talks to lnd.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        module = self._module
+        if module is None:
+            # import_module holds the import lock, so concurrent first uses
+            # all end up with the same module.
+            module = importlib.import_module(self._name)
+            self._module = module
+
+        return getattr(module, attr)
+
+    def __repr__(self):
+        return '<LazyModule {!r}>'.format(self._name)
@@ -1,17 +1,255 @@
-from protos import lightning_pb2 as ln
-from protos import lightning_pb2_grpc as lnrpc
+from typing import NamedTuple
 
-import grpc
-import os
+import binascii
+import threading
 
-import codecs
+from . import bolt11
+from .channel_pool import default_channel_pool
+from .exceptions import PaymentError, PaymentTimeoutError
+from .lazy_module import LazyModule
+from .preimage_store import PreimageStore
+from .query_cache import EventInvalidator, Subscription
+from .snapshot import build_snapshot
 
-import binascii
+# grpc and the generated stubs are imported on first use, which keeps
+# importing this package (and anything built on it) fast.
+grpc = LazyModule('grpc')
+ln = LazyModule('protos.lightning_pb2')
+lnrpc = LazyModule('protos.lightning_pb2_grpc')
+router = LazyModule('protos.router_pb2')
+routerrpc = LazyModule('protos.router_pb2_grpc')
+
+DEFAULT_PAYMENT_TIMEOUT = 60
+DEFAULT_MAX_PARTS = 16
+
+# lnd gives up on pathfinding after timeout_seconds, but HTLCs already sent
+# can take a little longer to resolve, so the client side deadline for the
+# payment stream allows for that on top.
+PAYMENT_DEADLINE_GRACE = 30
+
+LIST_PAYMENTS_PAGE_SIZE = 100
+
+# How many pages of ListPayments lookup_preimage scans, newest first, when
+# lnd has no router to ask. Older payments are assumed not to be there.
+LIST_PAYMENTS_MAX_PAGES = 10
+
+# Matches lnd's own default fee limit when none is given: fees of up to 100%
+# for payments of 1000 sat or less, and 5% above that.
+_FULL_FEE_LIMIT_MSAT = 1000 * 1000
+_FEE_LIMIT_PERCENT = 5
+
+
+def default_fee_limit_msat(amt_msat):
+    if amt_msat <= _FULL_FEE_LIMIT_MSAT:
+        return amt_msat
+
+    return amt_msat * _FEE_LIMIT_PERCENT // 100
+
+
+def payment_fee_limit_msat(amt_msat, fee_limit_sat=None):
+    """
+    Returns the most a payment of amt_msat may pay in routing fees:
+    fee_limit_sat if it's set, lnd's default otherwise.
+    """
+    if fee_limit_sat is not None:
+        return fee_limit_sat * 1000
+
+    return default_fee_limit_msat(amt_msat)
+
+
+class PaymentResult(NamedTuple):
+    """
+    The outcome of LndNode.pay: the hex encoded preimage, the routing fee
+    paid in msat, and whether this call paid at all rather than finding an
+    earlier payment of the same invoice.
+    """
+
+    preimage: str
+    fee_msat: int = 0
+    paid: bool = True
+
+
+def _payment_amount_msat(invoice, amt=None):
+    """
+    Returns what paying invoice amounts to in msat, or None if it can't be
+    decoded, leaving lnd to reject it with its own error.
+    """
+    if amt:
+        return amt * 1000
+
+    try:
+        return bolt11.decode(invoice).num_msat
+    except bolt11.Bolt11DecodeError:
+        return None
+
+
+def send_request(invoice, amt=None, fee_limit_sat=None):
+    """
+    Builds the lnrpc.SendRequest for paying invoice with SendPaymentSync,
+    with the same fee limit the router would apply.
+    """
+    req = ln.SendRequest(payment_request=invoice, amt=amt)
+
+    amt_msat = _payment_amount_msat(invoice, amt)
+    if amt_msat is not None:
+        req.fee_limit.fixed_msat = payment_fee_limit_msat(
+            amt_msat, fee_limit_sat,
+        )
+
+    return req
+
+
+def send_payment_request(invoice, amt=None,
+                         timeout_seconds=DEFAULT_PAYMENT_TIMEOUT,
+                         fee_limit_sat=None, max_parts=DEFAULT_MAX_PARTS,
+                         no_inflight_updates=False):
+    """
+    Builds the routerrpc.SendPaymentRequest for paying invoice. amt is
+    only needed for invoices that don't specify an amount.
+    """
+    fee_limit = {}
+    if fee_limit_sat is not None:
+        fee_limit['fee_limit_sat'] = fee_limit_sat
+    else:
+        amt_msat = _payment_amount_msat(invoice, amt)
+        if amt_msat is not None:
+            fee_limit['fee_limit_msat'] = default_fee_limit_msat(amt_msat)
+
+    return router.SendPaymentRequest(
+            payment_request=invoice, amt=amt or 0,
+            timeout_seconds=timeout_seconds, max_parts=max_parts,
+            no_inflight_updates=no_inflight_updates, **fee_limit,
+    )
+
+
+def payment_done(payment):
+    """
+    Reports whether a payment update from the router is final, raising
+    PaymentError if the payment failed.
+    """
+    if payment.status == ln.Payment.SUCCEEDED:
+        return True
 
-# Due to updated ECDSA generated tls.cert we need to let gprc know that we need
-# to use that cipher suite otherwise there will be a handhsake error when we
-# communicate with the lnd rpc server.
-os.environ["GRPC_SSL_CIPHER_SUITES"] = 'HIGH+ECDSA'
+    if payment.status == ln.Payment.FAILED:
+        raise PaymentError(
+                payment.payment_hash,
+                ln.PaymentFailureReason.Name(payment.failure_reason),
+        )
+
+    return False
+
+def invoice_payment_hash(invoice):
+    """
+    Returns the hex encoded payment hash of invoice, or None if it can't be
+    decoded locally, in which case lnd is left to reject it with its own
+    error.
+    """
+    try:
+        return bolt11.decode(invoice).payment_hash
+    except bolt11.Bolt11DecodeError:
+        return None
+
+
+def router_options(node, timeout_seconds, fee_limit_sat, max_parts):
+    """
+    Fills in node's own settings for any router options not given for a
+    payment.
+    """
+    if timeout_seconds is None:
+        timeout_seconds = node.timeout_seconds
+    if fee_limit_sat is None:
+        fee_limit_sat = node.fee_limit_sat
+    if max_parts is None:
+        max_parts = node.max_parts
+
+    return timeout_seconds, fee_limit_sat, max_parts
+
+
+def sync_payment_result(pay_resp):
+    """
+    Returns the PaymentResult of a SendPaymentSync response, or None if it
+    reports a payment_error.
+    """
+    if pay_resp.payment_error:
+        return None
+
+    return PaymentResult(
+            binascii.hexlify(pay_resp.payment_preimage).decode('utf-8'),
+            pay_resp.payment_route.total_fees_msat,
+    )
+
+
+def track_payment_request(payment_hash):
+    return router.TrackPaymentRequest(
+            payment_hash=bytes.fromhex(payment_hash),
+            no_inflight_updates=True,
+    )
+
+
+def tracked_preimage(payment):
+    """
+    Reads a TrackPaymentV2 update, returning whether the payment is final
+    and, if it succeeded, its preimage.
+    """
+    if payment.status == ln.Payment.SUCCEEDED:
+        return True, payment.payment_preimage
+
+    return payment.status == ln.Payment.FAILED, None
+
+
+def already_paying(e, payment_hash):
+    """
+    Tells whether SendPaymentV2 failed with e because lnd won't pay the
+    invoice again: it was paid, or is still being paid, by an earlier
+    payment, e.g. one from another process.
+    """
+    return (
+        payment_hash is not None and
+        e.code() == grpc.StatusCode.ALREADY_EXISTS
+    )
+
+
+def track_payment_failed(e, payment_hash):
+    """
+    Interprets a TrackPaymentV2 error for a preimage lookup: returns True if
+    lnd has no router, so ListPayments has to be scanned instead, and False
+    if it has no payment to payment_hash. Raises PaymentTimeoutError if the
+    payment is still in flight, and re-raises anything else.
+    """
+    code = e.code()
+    if code == grpc.StatusCode.UNIMPLEMENTED:
+        return True
+    if code == grpc.StatusCode.NOT_FOUND:
+        return False
+    if code == grpc.StatusCode.DEADLINE_EXCEEDED:
+        # Paying again now could pay twice.
+        raise PaymentTimeoutError(payment_hash) from e
+
+    raise e
+
+
+def list_payments_request(index_offset):
+    # Completed payments are walked newest first, a page at a time.
+    return ln.ListPaymentsRequest(
+            reversed=True, index_offset=index_offset,
+            max_payments=LIST_PAYMENTS_PAGE_SIZE,
+    )
+
+
+def find_payment_preimage(resp, payment_hash):
+    """
+    Looks for a payment to payment_hash in a page of ListPayments, returning
+    its preimage if found, and the index_offset of the next page, or None
+    if this was the last one.
+    """
+    for payment in resp.payments:
+        if payment.payment_hash == payment_hash:
+            return payment.payment_preimage, None
+
+    if len(resp.payments) < LIST_PAYMENTS_PAGE_SIZE:
+        return None, None
+
+    return None, resp.first_index_offset
 
 class LightningNode(object):
     """
@@ -22,71 +260,516 @@ class LightningNode(object):
 
 class LndNode(LightningNode):
     """
+    A blocking client for lnd's gRPC API.
+
+    Nothing is read from disk or dialed in the constructor: the node's
+    channel is opened on the first RPC, or ahead of time with warm_up.
+
+    With use_router set, payments go through the router's SendPaymentV2
+    rather than the deprecated SendPaymentSync, so they can be split into
+    up to max_parts shards, are bounded by timeout_seconds and
+    fee_limit_sat (lnd's default fee limit if None), and stream their
+    progress. These node-wide settings can be overridden per payment.
+    fee_limit_sat bounds SendPaymentSync payments too.
+
+    pay_invoice is idempotent: preimages are remembered by payment hash in
+    preimage_store (in memory unless given a journaled PreimageStore), and
+    lnd is asked about earlier payments before paying, so paying the same
+    invoice again returns its preimage without paying twice.
+
+    Given a query_cache, get_info, channel_balance and wallet_balance are
+    served from it for up to their TTL. Unless watch_events is False,
+    channel, transaction and invoice subscriptions are opened in the
+    background on first use to invalidate cached results as soon as they
+    change, and the node's own payments invalidate the channel balance.
+
+    Given an enabled MetricsSink as metrics, every RPC's latency, status
+    code and message sizes are reported to it (see MetricsInterceptor).
     """
 
-    def __init__(self, cert_path, macaroon_path, host='localhost', port='10009'):
+    def __init__(self, cert_path, macaroon_path, host='localhost', port='10009',
+                 channel_pool=None, use_router=False,
+                 timeout_seconds=DEFAULT_PAYMENT_TIMEOUT, fee_limit_sat=None,
+                 max_parts=DEFAULT_MAX_PARTS, preimage_store=None,
+                 query_cache=None, watch_events=True, metrics=None):
         self.cert_path = cert_path
         self.macaroon_path = macaroon_path
         self.host = host
         self.port = port
 
+        self.use_router = use_router
+        self.timeout_seconds = timeout_seconds
+        self.fee_limit_sat = fee_limit_sat
+        self.max_parts = max_parts
+
+        if preimage_store is None:
+            preimage_store = PreimageStore()
+        self.preimage_store = preimage_store
+
+        self.query_cache = query_cache
+        self.watch_events = watch_events
+        self._invalidator = None
+
+        self._invoice_watcher = None
+
+        self.metrics = metrics
+
         # TODO(roasbeef): pick out other details for cert + macaroon path
 
-        self._grpc_conn = None
+        # Nodes pointed at the same lnd with the same credentials share a
+        # single channel out of the pool rather than each dialing their own.
+        if channel_pool is None:
+            channel_pool = default_channel_pool()
+        self._channel_pool = channel_pool
+
+        self._connect_lock = threading.Lock()
+        self._channel_key = None
+        self._channel = None
+        self._rpc_channel = None
+        self._stub = None
+        self._router_stub = None
+
+    @property
+    def _grpc_conn(self):
+        stub = self._stub
+        if stub is not None:
+            return stub
+
+        with self._connect_lock:
+            if self._stub is None:
+                self._channel_key, self._channel = self._channel_pool.acquire(
+                        self.host, self.port, self.cert_path,
+                        self.macaroon_path,
+                )
+
+                # The interceptor wraps only this node's view of the shared
+                # channel. It's imported here as it needs grpc at import.
+                self._rpc_channel = self._channel
+                if self.metrics is not None and self.metrics.enabled:
+                    from .interceptors import MetricsInterceptor
+
+                    self._rpc_channel = grpc.intercept_channel(
+                            self._channel, MetricsInterceptor(self.metrics),
+                    )
+
+                self._stub = lnrpc.LightningStub(self._rpc_channel)
+
+            return self._stub
+
+    @property
+    def _router_conn(self):
+        stub = self._router_stub
+        if stub is not None:
+            return stub
+
+        self._grpc_conn
+
+        with self._connect_lock:
+            if self._router_stub is None:
+                self._router_stub = routerrpc.RouterStub(self._rpc_channel)
+
+            return self._router_stub
+
+    def warm_up(self, timeout=None, background=False):
+        """
+        Opens the channel and waits until the connection to lnd, including
+        the TLS handshake, is established so the first RPC doesn't pay for
+        it. With background=True the connection is made on gRPC's own
+        threads and a grpc.Future that resolves once it's ready is returned
+        instead.
+        """
+        self._grpc_conn
+
+        ready = grpc.channel_ready_future(self._channel)
+        if background:
+            return ready
+
+        ready.result(timeout=timeout)
+
+    def close(self):
+        """
+        Hands the node's channel back to the pool, closing it if no other
+        node is using it.
+        """
+        with self._connect_lock:
+            if self._invalidator is not None:
+                self._invalidator.stop()
+                self._invalidator = None
+
+            if self._invoice_watcher is not None:
+                self._invoice_watcher.stop()
+                self._invoice_watcher = None
+
+            if self._channel_key is not None:
+                self._channel_pool.release(self._channel_key)
+
+            self._channel_key = None
+            self._channel = None
+            self._rpc_channel = None
+            self._stub = None
+            self._router_stub = None
+
+    @property
+    def invoice_watcher(self):
+        """
+        The node's InvoiceWatcher, which waits on any number of incoming
+        invoices over one SubscribeInvoices stream.
+        """
+        # Imported on first use, as waiting asynchronously pulls in asyncio.
+        from .invoice_watcher import InvoiceWatcher
+
+        with self._connect_lock:
+            if self._invoice_watcher is None:
+                self._invoice_watcher = InvoiceWatcher(self)
+
+            return self._invoice_watcher
+
+    def wait_for_invoice(self, payment_hash, timeout=None):
+        """
+        Blocks until the invoice with the given hex encoded payment hash is
+        settled and returns it. See InvoiceWatcher.wait.
+        """
+        return self.invoice_watcher.wait(payment_hash, timeout=timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def pay_invoice(self, invoice, amt=None, use_router=None, **kwargs):
+        """
+        Pays invoice and returns the hex encoded preimage, or the preimage
+        of an earlier payment of the same invoice. Any keyword arguments
+        are passed on to send_payment_v2 when paying through the router.
+        """
+        return self.pay(
+                invoice, amt=amt, use_router=use_router, **kwargs,
+        ).preimage
+
+    def pay(self, invoice, amt=None, use_router=None, **kwargs):
+        """
+        Pays invoice like pay_invoice, but returns a PaymentResult, which
+        also tells whether anything was paid and the fee it cost.
+        """
+        payment_hash = invoice_payment_hash(invoice)
+        if payment_hash is None:
+            return self._pay_invoice(invoice, None, amt, use_router, **kwargs)
+
+        with self.preimage_store.lock(payment_hash):
+            pre_image = self.preimage_store.get(payment_hash)
+            if pre_image is not None:
+                return PaymentResult(pre_image, paid=False)
+
+            # lnd refuses to pay an invoice twice, so an earlier payment
+            # we don't know of is only looked up once paying fails.
+            result = self._pay_invoice(
+                    invoice, payment_hash, amt, use_router, **kwargs,
+            )
+
+            self.preimage_store.put(payment_hash, result.preimage)
+
+        return result
+
+    def fee_limit_msat(self, amt_msat):
+        """
+        Returns the most paying amt_msat may cost in routing fees.
+        """
+        return payment_fee_limit_msat(amt_msat, self.fee_limit_sat)
+
+    def _cached(self, name, load):
+        if self.query_cache is None:
+            return load()
+
+        if self.watch_events and self._invalidator is None:
+            self._watch_events()
 
-        with open(os.path.expanduser(self.cert_path), 'rb') as f:
-            cert_bytes = f.read()
-            self._cert_creds = grpc.ssl_channel_credentials(cert_bytes)
+        # Hand out copies so callers can't modify the cached message.
+        cached = self.query_cache.get(name, load)
+        resp = type(cached)()
+        resp.CopyFrom(cached)
 
-        with open(os.path.expanduser(self.macaroon_path), 'rb') as f:
-            macaroon_bytes = f.read()
-            self._macaroon = codecs.encode(macaroon_bytes, 'hex')
+        return resp
 
-        def metadata_callback(context, callback):
-            # for more info see grpc docs
-            callback([('macaroon', self._macaroon)], None)
+    def _watch_events(self):
+        subscriptions = [
+            Subscription(
+                'channel-events',
+                lambda: self._grpc_conn.SubscribeChannelEvents(
+                        ln.ChannelEventSubscription(),
+                ),
+                ('channel_balance', 'wallet_balance', 'get_info'),
+            ),
+            Subscription(
+                'transactions',
+                lambda: self._grpc_conn.SubscribeTransactions(
+                        ln.GetTransactionsRequest(),
+                ),
+                ('wallet_balance',),
+            ),
+            Subscription(
+                'invoices',
+                lambda: self._grpc_conn.SubscribeInvoices(
+                        ln.InvoiceSubscription(),
+                ),
+                ('channel_balance',),
+                relevant=lambda invoice: invoice.state == ln.Invoice.SETTLED,
+            ),
+        ]
 
-        # now build meta data credentials
-        auth_creds = grpc.metadata_call_credentials(metadata_callback)
+        with self._connect_lock:
+            if self._invalidator is None:
+                self._invalidator = EventInvalidator(
+                        self.query_cache, subscriptions,
+                )
+                self._invalidator.start()
 
-        # combine the cert credentials and the macaroon auth credentials
-        # such that every call is properly encrypted and authenticated
-        combined_creds = grpc.composite_channel_credentials(
-                self._cert_creds, auth_creds,
+    def _payment_attempted(self):
+        if self.query_cache is not None:
+            self.query_cache.invalidate('channel_balance')
+
+    def _pay_invoice(self, invoice, payment_hash, amt, use_router, **kwargs):
+        if use_router is None:
+            use_router = self.use_router
+
+        if use_router:
+            try:
+                payment = self.send_payment_v2(invoice, amt=amt, **kwargs)
+            except grpc.RpcError as e:
+                if not already_paying(e, payment_hash):
+                    raise
+
+                pre_image = self.lookup_preimage(payment_hash)
+                if pre_image is None:
+                    raise
+
+                return PaymentResult(pre_image, paid=False)
+
+            return PaymentResult(payment.payment_preimage, payment.fee_msat)
+
+        try:
+            pay_resp = self._grpc_conn.SendPaymentSync(
+                    send_request(invoice, amt, self.fee_limit_sat),
+            )
+        finally:
+            self._payment_attempted()
+
+        result = sync_payment_result(pay_resp)
+        if result is not None:
+            return result
+
+        # A payment that raced us, e.g. from another process, leaves lnd
+        # reporting the invoice as already paid.
+        pre_image = None
+        if payment_hash is not None:
+            pre_image = self.lookup_preimage(payment_hash)
+
+        if pre_image is None:
+            raise PaymentError(payment_hash, pay_resp.payment_error)
+
+        return PaymentResult(pre_image, paid=False)
+
+    def lookup_preimage(self, payment_hash,
+                        max_pages=LIST_PAYMENTS_MAX_PAGES):
+        """
+        Asks lnd for the preimage of an earlier payment to payment_hash,
+        waiting for the payment to resolve if it's still in flight. Returns
+        None if lnd has no successful payment for it.
+
+        TrackPaymentV2 is used where the router is available, falling back
+        to scanning the newest max_pages pages of ListPayments otherwise.
+        """
+        updates = self._router_conn.TrackPaymentV2(
+                track_payment_request(payment_hash),
+                timeout=self.timeout_seconds + PAYMENT_DEADLINE_GRACE,
         )
 
-        # finally pass in the combined credentials when creating a channel
-        channel = grpc.secure_channel(
-                '{}:{}'.format(host, port), combined_creds,
+        # lnd ends the stream once the payment resolves. It's read to the
+        # end rather than cancelled, which would fail the call as CANCELLED.
+        done = False
+        try:
+            for payment in updates:
+                if not done:
+                    done, pre_image = tracked_preimage(payment)
+        except grpc.RpcError as e:
+            if done:
+                return pre_image
+
+            if not track_payment_failed(e, payment_hash):
+                return None
+
+            return self._list_payments_preimage(payment_hash, max_pages)
+
+        if done:
+            return pre_image
+
+        raise PaymentTimeoutError(payment_hash)
+
+    def _list_payments_preimage(self, payment_hash, max_pages):
+        index_offset = 0
+        for _ in range(max_pages):
+            resp = self._grpc_conn.ListPayments(
+                    list_payments_request(index_offset),
+            )
+
+            pre_image, index_offset = find_payment_preimage(
+                    resp, payment_hash,
+            )
+            if pre_image is not None or index_offset is None:
+                return pre_image
+
+        return None
+
+    def send_payment(self, invoice, use_router=None, **kwargs):
+        """
+        Pays invoice, returning lnd's SendResponse, or the final Payment if
+        paying through the router.
+        """
+        if use_router is None:
+            use_router = self.use_router
+
+        if use_router:
+            return self.send_payment_v2(invoice, **kwargs)
+
+        try:
+            return self._grpc_conn.SendPaymentSync(
+                    ln.SendRequest(payment_request=invoice),
+            )
+        finally:
+            self._payment_attempted()
+
+    def send_payment_v2(self, invoice, amt=None, timeout_seconds=None,
+                        fee_limit_sat=None, max_parts=None, on_update=None):
+        """
+        Pays invoice through the router and returns the final Payment.
+
+        on_update, if given, is called with every Payment update lnd
+        streams back while HTLCs are in flight. Raises PaymentError if the
+        payment fails, or PaymentTimeoutError if it hasn't resolved shortly
+        after timeout_seconds.
+        """
+        timeout_seconds, fee_limit_sat, max_parts = router_options(
+                self, timeout_seconds, fee_limit_sat, max_parts,
         )
 
-        self._grpc_conn = lnrpc.LightningStub(channel)
+        req = send_payment_request(
+                invoice, amt=amt, timeout_seconds=timeout_seconds,
+                fee_limit_sat=fee_limit_sat, max_parts=max_parts,
+                no_inflight_updates=on_update is None,
+        )
 
-    def pay_invoice(self, invoice, amt=None):
-        pay_resp = self._grpc_conn.SendPaymentSync(
-                ln.SendRequest(payment_request=invoice, amt=amt),
+        updates = self._router_conn.SendPaymentV2(
+                req, timeout=timeout_seconds + PAYMENT_DEADLINE_GRACE,
         )
 
-        pre_image = binascii.hexlify(pay_resp.payment_preimage).decode('utf-8')
+        payment_hash = None
+        final = None
+        try:
+            for payment in updates:
+                payment_hash = payment.payment_hash
+                if on_update is not None:
+                    on_update(payment)
 
-        return pre_image
+                # The final update is followed by the end of the stream.
+                if payment_done(payment):
+                    final = payment
+        except grpc.RpcError as e:
+            # Once the final update is in, only the stream's end was lost.
+            deadline = e.code() == grpc.StatusCode.DEADLINE_EXCEEDED
+            if final is None and not deadline:
+                raise
+        finally:
+            self._payment_attempted()
 
-    def send_payment(self, invoice):
-        return self._grpc_conn.SendPaymentSync(
-                ln.SendRequest(payment_request=invoice),
-        )
+        if final is not None:
+            return final
+
+        if payment_hash is None:
+            payment_hash = bolt11.decode(invoice).payment_hash
+
+        raise PaymentTimeoutError(payment_hash)
+
+    def create_invoice(self, memo, value, expiry=None):
+        """
+        Adds an invoice for value satoshis (or any amount if zero) and
+        returns lnd's AddInvoiceResponse. expiry is in seconds, lnd's
+        default of an hour if not given.
+        """
+        invoice = ln.Invoice(memo=memo, value=value)
+        if expiry is not None:
+            invoice.expiry = expiry
+
+        return self._grpc_conn.AddInvoice(invoice)
+
+    def decode_invoice(self, invoice, local=True):
+        # Decoding is a purely local operation, so by default we skip the
+        # DecodePayReq round trip. Pass local=False to have lnd decode it,
+        # which also checks the invoice is for the node's network.
+        if local:
+            return bolt11.decode(invoice)
 
-    def decode_invoice(self, invoice):
         req = ln.PayReqString(pay_req=invoice)
         decode_resp = self._grpc_conn.DecodePayReq(req)
 
         return decode_resp
 
     def channel_balance(self):
-        return self._grpc_conn.ChannelBalance(ln.ChannelBalanceRequest())
+        return self._cached(
+                'channel_balance',
+                lambda: self._grpc_conn.ChannelBalance(
+                        ln.ChannelBalanceRequest(),
+                ),
+        )
 
     def wallet_balance(self):
-        return self._grpc_conn.WalletBalance(ln.WalletBalanceRequest())
+        return self._cached(
+                'wallet_balance',
+                lambda: self._grpc_conn.WalletBalance(
+                        ln.WalletBalanceRequest(),
+                ),
+        )
 
     def get_info(self):
-        return self._grpc_conn.GetInfo(ln.GetInfoRequest())
+        return self._cached(
+                'get_info',
+                lambda: self._grpc_conn.GetInfo(ln.GetInfoRequest()),
+        )
+
+
+    def snapshot(self, channels=False, pending_channels=False, timeout=None):
+        """
+        Returns a NodeSnapshot of the node's info and balances, including
+        its channels and pending channels if asked for.
+
+        All the underlying calls are issued at once as gRPC futures, so
+        this takes about as long as the slowest of them rather than their
+        sum. It always reads fresh from lnd, bypassing any query cache.
+        """
+        conn = self._grpc_conn
+
+        calls = {
+            'info': conn.GetInfo.future(ln.GetInfoRequest(), timeout=timeout),
+            'channel_balance': conn.ChannelBalance.future(
+                    ln.ChannelBalanceRequest(), timeout=timeout,
+            ),
+            'wallet_balance': conn.WalletBalance.future(
+                    ln.WalletBalanceRequest(), timeout=timeout,
+            ),
+        }
+        if channels:
+            calls['channels'] = conn.ListChannels.future(
+                    ln.ListChannelsRequest(), timeout=timeout,
+            )
+        if pending_channels:
+            calls['pending_channels'] = conn.PendingChannels.future(
+                    ln.PendingChannelsRequest(), timeout=timeout,
+            )
+
+        try:
+            responses = {name: call.result() for name, call in calls.items()}
+        except BaseException:
+            for call in calls.values():
+                call.cancel()
+            raise
+
+        return build_snapshot(**responses)
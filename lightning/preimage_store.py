@@ -0,0 +1,225 @@
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+
+import hashlib
+import json
+import os
+import threading
+
+DEFAULT_MAX_PREIMAGES = 10000
+
+
+def preimage_matches(payment_hash, preimage):
+    try:
+        digest = hashlib.sha256(bytes.fromhex(preimage)).hexdigest()
+    except ValueError:
+        return False
+
+    return digest == payment_hash
+
+
+def _journal_line(payment_hash, preimage):
+    return (json.dumps(
+        {'payment_hash': payment_hash, 'preimage': preimage},
+    ) + '\n').encode('utf-8')
+
+
+def _fsync_dir(path):
+    dir_fd = os.open(os.path.dirname(path) or '.', os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+class PreimageStore(object):
+    """
+    Thread-safe cache of the preimages of settled payments, keyed by the
+    hex encoded payment hash.
+
+    If path is set, every preimage is appended to a journal at that path
+    and fsynced before put returns, and the journal is replayed on startup,
+    so a payment that completed is never forgotten across a crash or
+    restart. A line left half written by a crash is dropped on replay, and
+    entries whose preimage doesn't hash to their payment hash are ignored.
+
+    At most max_preimages are kept in memory (None for no limit), the
+    oldest being forgotten first. lnd still knows about those payments, so
+    paying one of them again finds its preimage there rather than paying
+    twice. A journal holding more entries than were kept is rewritten with
+    just those on startup.
+    """
+
+    def __init__(self, path=None, max_preimages=DEFAULT_MAX_PREIMAGES):
+        self.path = os.path.expanduser(path) if path else None
+        self.max_preimages = max_preimages
+
+        self._preimages = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Serializes journal appends, so a slow fsync holds up other puts
+        # but not readers or the payment hash locks.
+        self._journal_lock = threading.Lock()
+
+        # Payment hashes currently being paid, each with its lock and the
+        # number of threads holding or waiting on it, and the same for
+        # tasks on an event loop.
+        self._hash_locks = {}
+        self._async_hash_locks = {}
+
+        if self.path:
+            self._load()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._preimages)
+
+    def get(self, payment_hash):
+        with self._lock:
+            return self._preimages.get(payment_hash)
+
+    def put(self, payment_hash, preimage):
+        """
+        Stores the preimage of a settled payment, raising ValueError if it
+        doesn't hash to payment_hash.
+        """
+        if not preimage_matches(payment_hash, preimage):
+            raise ValueError(
+                "preimage doesn't match payment hash {}".format(payment_hash),
+            )
+
+        with self._journal_lock:
+            if self.get(payment_hash) == preimage:
+                return
+
+            # Journaled first, so a failed write doesn't leave us claiming
+            # a preimage that wouldn't survive a restart.
+            self._append(payment_hash, preimage)
+
+            with self._lock:
+                self._remember(payment_hash, preimage)
+
+    def _remember(self, payment_hash, preimage):
+        self._preimages.pop(payment_hash, None)
+        self._preimages[payment_hash] = preimage
+
+        if self.max_preimages is not None:
+            while len(self._preimages) > self.max_preimages:
+                self._preimages.popitem(last=False)
+
+    def _acquire_entry(self, hash_locks, payment_hash, new_lock):
+        with self._lock:
+            entry = hash_locks.get(payment_hash)
+            if entry is None:
+                entry = [new_lock(), 0]
+                hash_locks[payment_hash] = entry
+            entry[1] += 1
+
+        return entry
+
+    def _release_entry(self, hash_locks, payment_hash, entry):
+        with self._lock:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del hash_locks[payment_hash]
+
+    @contextmanager
+    def lock(self, payment_hash):
+        """
+        Serializes attempts to pay the same payment hash, so concurrent
+        callers wait for the first payment and then find its preimage in
+        the store instead of paying again.
+        """
+        entry = self._acquire_entry(
+            self._hash_locks, payment_hash, threading.Lock,
+        )
+        try:
+            with entry[0]:
+                yield
+        finally:
+            self._release_entry(self._hash_locks, payment_hash, entry)
+
+    @asynccontextmanager
+    async def async_lock(self, payment_hash):
+        """
+        The asyncio counterpart of lock, which waits without blocking the
+        event loop.
+        """
+        # asyncio is only imported for callers that use it.
+        import asyncio
+
+        entry = self._acquire_entry(
+            self._async_hash_locks, payment_hash, asyncio.Lock,
+        )
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            self._release_entry(self._async_hash_locks, payment_hash, entry)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, 'rb+') as f:
+            data = f.read()
+
+            # Anything after the last newline is a write that was cut short,
+            # drop it so the next entry starts on a fresh line.
+            end = data.rfind(b'\n') + 1
+            if end != len(data):
+                f.truncate(end)
+
+        lines = data[:end].splitlines()
+        for line in lines:
+            try:
+                entry = json.loads(line)
+                payment_hash = entry['payment_hash']
+                preimage = entry['preimage']
+            except (ValueError, KeyError, TypeError):
+                continue
+
+            if preimage_matches(payment_hash, preimage):
+                self._remember(payment_hash, preimage)
+
+        # Entries that were forgotten, repeated or invalid would otherwise
+        # be replayed on every startup, and the journal would only grow.
+        if len(lines) > len(self._preimages):
+            self._compact()
+
+    def _compact(self):
+        tmp_path = self.path + '.tmp'
+
+        fd = os.open(
+            tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600,
+        )
+        try:
+            os.write(fd, b''.join(
+                _journal_line(payment_hash, preimage)
+                for payment_hash, preimage in self._preimages.items()
+            ))
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+        os.replace(tmp_path, self.path)
+        _fsync_dir(self.path)
+
+    def _append(self, payment_hash, preimage):
+        if not self.path:
+            return
+
+        # Preimages are proof of payment, so the journal is only readable
+        # by its owner.
+        created = not os.path.exists(self.path)
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            os.write(fd, _journal_line(payment_hash, preimage))
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+        # A newly created file only survives a crash once its directory
+        # entry is on disk too.
+        if created:
+            _fsync_dir(self.path)
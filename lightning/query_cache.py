@@ -0,0 +1,167 @@
+from typing import Any, Callable, NamedTuple, Optional, Tuple
+
+import logging
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+# How long each read-only query may be served from the cache, in seconds.
+# Event subscriptions invalidate entries early, so these mostly bound how
+# stale a result can get while a subscription is down, or for changes no
+# subscription reports (such as new blocks in get_info).
+DEFAULT_CACHE_TTLS = {
+    'get_info': 30,
+    'channel_balance': 10,
+    'wallet_balance': 10,
+}
+
+_RESUBSCRIBE_MIN_DELAY = 1
+_RESUBSCRIBE_MAX_DELAY = 60
+
+
+class QueryCache(object):
+    """
+    Thread-safe read-through cache for read-only node queries, keyed by
+    query name with a TTL per name. Names without a TTL aren't cached.
+
+    Concurrent misses for the same name share a single load, and a load
+    that raced with an invalidation isn't stored, so an invalidation is
+    never undone by a result fetched before it.
+    """
+
+    def __init__(self, ttls=None):
+        self.ttls = dict(DEFAULT_CACHE_TTLS if ttls is None else ttls)
+
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._generations = {}
+        self._load_locks = {}
+
+    def get(self, name, load):
+        ttl = self.ttls.get(name)
+        if not ttl:
+            return load()
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(name)
+                if entry is not None and entry[1] > time.monotonic():
+                    return entry[0]
+
+                generation = self._generations.get(name, 0)
+
+            value = load()
+
+            with self._lock:
+                if self._generations.get(name, 0) == generation:
+                    self._entries[name] = (value, time.monotonic() + ttl)
+
+            return value
+
+    def invalidate(self, *names):
+        """
+        Drops the cached results for names, or for every query if none are
+        given.
+        """
+        with self._lock:
+            if not names:
+                names = list(self._entries)
+
+            for name in names:
+                self._entries.pop(name, None)
+                self._generations[name] = self._generations.get(name, 0) + 1
+
+
+class Subscription(NamedTuple):
+    """
+    An lnd event stream that makes the queries in names stale. subscribe
+    opens the stream, and if relevant is given only events it returns true
+    for invalidate.
+    """
+
+    name: str
+    subscribe: Callable[[], Any]
+    names: Tuple[str, ...]
+    relevant: Optional[Callable[[Any], bool]] = None
+
+
+class EventInvalidator(object):
+    """
+    Keeps a set of Subscriptions open on background threads and invalidates
+    cached queries as their events arrive.
+
+    Streams that drop are reopened with backoff, and a subscription's
+    queries are invalidated every time it (re)subscribes, since events may
+    have been missed while it wasn't listening.
+    """
+
+    def __init__(self, cache, subscriptions):
+        self.cache = cache
+        self.subscriptions = subscriptions
+
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._streams = []
+        self._threads = []
+
+    def start(self):
+        with self._lock:
+            if self._threads or self._stopped.is_set():
+                return
+
+            for subscription in self.subscriptions:
+                thread = threading.Thread(
+                    target=self._run, args=(subscription,),
+                    name='lnd-{}'.format(subscription.name), daemon=True,
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self):
+        self._stopped.set()
+
+        with self._lock:
+            streams = list(self._streams)
+            self._streams.clear()
+
+        for stream in streams:
+            stream.cancel()
+
+    def _run(self, subscription):
+        delay = _RESUBSCRIBE_MIN_DELAY
+
+        while not self._stopped.is_set():
+            stream = None
+            try:
+                stream = subscription.subscribe()
+                with self._lock:
+                    if self._stopped.is_set():
+                        stream.cancel()
+                        return
+                    self._streams.append(stream)
+
+                self.cache.invalidate(*subscription.names)
+
+                for event in stream:
+                    delay = _RESUBSCRIBE_MIN_DELAY
+
+                    relevant = subscription.relevant
+                    if relevant is None or relevant(event):
+                        self.cache.invalidate(*subscription.names)
+            except Exception as e:
+                if self._stopped.is_set():
+                    return
+
+                log.debug("%s subscription failed: %s", subscription.name, e)
+            finally:
+                if stream is not None:
+                    with self._lock:
+                        if stream in self._streams:
+                            self._streams.remove(stream)
+
+            self._stopped.wait(delay)
+            delay = min(delay * 2, _RESUBSCRIBE_MAX_DELAY)
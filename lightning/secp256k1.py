@@ -0,0 +1,285 @@
+"""
+Minimal pure-Python secp256k1 arithmetic for signing, recovering and
+verifying the compact signatures used by BOLT11 invoices. coincurve's
+libsecp256k1 bindings, a requirement of the package, are used instead
+whenever they're importable, which is roughly two orders of magnitude
+faster; the pure-Python code is a fallback for platforms without them.
+"""
+
+import hashlib
+import hmac
+
+try:
+    import coincurve
+    import coincurve.ecdsa
+except ImportError:
+    coincurve = None
+
+# Curve parameters, see SEC 2 section 2.4.1.
+P = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEFFFFFC2F
+N = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141
+G = (
+    0x79BE667EF9DCBBAC55A06295CE870B07029BFCDB2DCE28D959F2815B16F81798,
+    0x483ADA7726A3C4655DA4FBFC0E1108A8FD17B448A68554199C47D08FFB10D4B8,
+)
+
+# Points are kept in Jacobian coordinates while multiplying to avoid a
+# modular inversion per addition. A zero Z coordinate is the point at
+# infinity.
+_INFINITY = (0, 1, 0)
+
+
+def _double(p):
+    x, y, z = p
+    if z == 0 or y == 0:
+        return _INFINITY
+
+    y_sq = y * y % P
+    s = 4 * x * y_sq % P
+    m = 3 * x * x % P
+
+    nx = (m * m - 2 * s) % P
+    ny = (m * (s - nx) - 8 * y_sq * y_sq) % P
+    nz = 2 * y * z % P
+
+    return nx, ny, nz
+
+
+def _add(p, q):
+    if p[2] == 0:
+        return q
+    if q[2] == 0:
+        return p
+
+    x1, y1, z1 = p
+    x2, y2, z2 = q
+
+    z1_sq = z1 * z1 % P
+    z2_sq = z2 * z2 % P
+    u1 = x1 * z2_sq % P
+    u2 = x2 * z1_sq % P
+    s1 = y1 * z2_sq * z2 % P
+    s2 = y2 * z1_sq * z1 % P
+
+    if u1 == u2:
+        if s1 != s2:
+            return _INFINITY
+        return _double(p)
+
+    h = u2 - u1
+    r = s2 - s1
+    h_sq = h * h % P
+    h_cu = h * h_sq % P
+    u1_h_sq = u1 * h_sq % P
+
+    nx = (r * r - h_cu - 2 * u1_h_sq) % P
+    ny = (r * (u1_h_sq - nx) - s1 * h_cu) % P
+    nz = h * z1 * z2 % P
+
+    return nx, ny, nz
+
+
+def _to_affine(p):
+    x, y, z = p
+    if z == 0:
+        return None
+
+    z_inv = pow(z, -1, P)
+    z_inv_sq = z_inv * z_inv % P
+
+    return x * z_inv_sq % P, y * z_inv_sq * z_inv % P
+
+
+def _double_mul(k1, p1, k2, p2):
+    """
+    Computes k1*p1 + k2*p2 with a single shared chain of doublings
+    (Shamir's trick).
+    """
+    p1 = (p1[0], p1[1], 1)
+    p2 = (p2[0], p2[1], 1)
+    both = _add(p1, p2)
+
+    result = _INFINITY
+    for i in range(max(k1.bit_length(), k2.bit_length()) - 1, -1, -1):
+        result = _double(result)
+
+        bit1 = (k1 >> i) & 1
+        bit2 = (k2 >> i) & 1
+        if bit1 and bit2:
+            result = _add(result, both)
+        elif bit1:
+            result = _add(result, p1)
+        elif bit2:
+            result = _add(result, p2)
+
+    return _to_affine(result)
+
+
+def point_mul(k, point=G):
+    return _double_mul(k % N, point, 0, point)
+
+
+def serialize_pubkey(point):
+    x, y = point
+    return bytes([2 + (y & 1)]) + x.to_bytes(32, 'big')
+
+
+def parse_pubkey(pubkey):
+    if len(pubkey) != 33 or pubkey[0] not in (2, 3):
+        raise ValueError("invalid compressed public key")
+
+    return _lift_x(int.from_bytes(pubkey[1:], 'big'), pubkey[0] & 1)
+
+
+def _lift_x(x, odd):
+    if x >= P:
+        raise ValueError("x coordinate not on the curve")
+
+    y_sq = (pow(x, 3, P) + 7) % P
+    y = pow(y_sq, (P + 1) // 4, P)
+    if y * y % P != y_sq:
+        raise ValueError("x coordinate not on the curve")
+
+    if y & 1 != odd:
+        y = P - y
+
+    return x, y
+
+
+def public_key(secret):
+    """
+    Returns the compressed public key for a 32 byte private key.
+    """
+    if coincurve is not None:
+        return coincurve.PrivateKey(secret).public_key.format(compressed=True)
+
+    return serialize_pubkey(point_mul(_secret_to_int(secret)))
+
+
+def _secret_to_int(secret):
+    d = int.from_bytes(secret, 'big')
+    if len(secret) != 32 or not 0 < d < N:
+        raise ValueError("invalid private key")
+
+    return d
+
+
+def _rfc6979_nonce(d, msg_hash):
+    """
+    Derives the deterministic signing nonce of RFC 6979 section 3.2 with
+    HMAC-SHA256, as libsecp256k1 does.
+    """
+    x = d.to_bytes(32, 'big')
+    h = (int.from_bytes(msg_hash, 'big') % N).to_bytes(32, 'big')
+
+    v = b'\x01' * 32
+    k = b'\x00' * 32
+    k = hmac.new(k, v + b'\x00' + x + h, hashlib.sha256).digest()
+    v = hmac.new(k, v, hashlib.sha256).digest()
+    k = hmac.new(k, v + b'\x01' + x + h, hashlib.sha256).digest()
+    v = hmac.new(k, v, hashlib.sha256).digest()
+
+    while True:
+        v = hmac.new(k, v, hashlib.sha256).digest()
+        nonce = int.from_bytes(v, 'big')
+        if 0 < nonce < N:
+            return nonce
+
+        k = hmac.new(k, v + b'\x00', hashlib.sha256).digest()
+        v = hmac.new(k, v, hashlib.sha256).digest()
+
+
+def sign_recoverable(msg_hash, secret):
+    """
+    Signs the 32 byte msg_hash with a 32 byte private key, returning the 64
+    byte compact signature (with a low S value) and its recovery id.
+    """
+    if coincurve is not None:
+        signature = coincurve.PrivateKey(secret).sign_recoverable(
+            msg_hash, hasher=None,
+        )
+        return signature[:64], signature[64]
+
+    d = _secret_to_int(secret)
+    e = int.from_bytes(msg_hash, 'big') % N
+
+    k = _rfc6979_nonce(d, msg_hash)
+    x, y = point_mul(k)
+
+    r = x % N
+    s = pow(k, -1, N) * (e + r * d) % N
+    if not r or not s:
+        raise ValueError("invalid nonce")
+
+    recovery_id = (y & 1) | (2 if x >= N else 0)
+
+    # Negating s mirrors R, flipping the parity of its y coordinate.
+    if s > N // 2:
+        s = N - s
+        recovery_id ^= 1
+
+    return r.to_bytes(32, 'big') + s.to_bytes(32, 'big'), recovery_id
+
+
+def recover_pubkey(msg_hash, signature, recovery_id):
+    """
+    Recovers the compressed public key that produced the 64 byte compact
+    signature over the 32 byte msg_hash.
+    """
+    if coincurve is not None:
+        return coincurve.PublicKey.from_signature_and_message(
+            signature + bytes([recovery_id]), msg_hash, hasher=None,
+        ).format(compressed=True)
+
+    r = int.from_bytes(signature[:32], 'big')
+    s = int.from_bytes(signature[32:], 'big')
+    if not (0 < r < N and 0 < s < N) or not 0 <= recovery_id <= 3:
+        raise ValueError("invalid signature")
+
+    point_r = _lift_x(r + (recovery_id >> 1) * N, recovery_id & 1)
+
+    e = int.from_bytes(msg_hash, 'big') % N
+    r_inv = pow(r, -1, N)
+
+    # Q = r^-1 * (s*R - e*G)
+    point_q = _double_mul((-e * r_inv) % N, G, s * r_inv % N, point_r)
+    if point_q is None:
+        raise ValueError("invalid signature")
+
+    return serialize_pubkey(point_q)
+
+
+def verify(msg_hash, signature, pubkey):
+    """
+    Checks a 64 byte compact signature over msg_hash against a compressed
+    public key.
+    """
+    r = int.from_bytes(signature[:32], 'big')
+    s = int.from_bytes(signature[32:], 'big')
+    if not (0 < r < N and 0 < s < N):
+        return False
+
+    if coincurve is not None:
+        # libsecp256k1 only accepts low S values, but a signature and its
+        # mirror with N - s are equally valid.
+        if s > N // 2:
+            signature = signature[:32] + (N - s).to_bytes(32, 'big')
+
+        try:
+            return coincurve.PublicKey(pubkey).verify(
+                coincurve.ecdsa.cdata_to_der(
+                    coincurve.ecdsa.deserialize_compact(signature),
+                ),
+                msg_hash, hasher=None,
+            )
+        except ValueError:
+            return False
+
+    e = int.from_bytes(msg_hash, 'big') % N
+    s_inv = pow(s, -1, N)
+
+    point = _double_mul(e * s_inv % N, G, r * s_inv % N, parse_pubkey(pubkey))
+    if point is None:
+        return False
+
+    return point[0] % N == r
@@ -0,0 +1,154 @@
+from dataclasses import dataclass, field
+from typing import Optional, Tuple
+
+import time
+
+PENDING_OPEN = "pending_open"
+WAITING_CLOSE = "waiting_close"
+PENDING_FORCE_CLOSE = "pending_force_close"
+
+
+@dataclass(frozen=True)
+class ChannelSummary:
+    chan_id: int
+    remote_pubkey: str
+    channel_point: str
+    capacity_sat: int
+    local_balance_sat: int
+    remote_balance_sat: int
+    active: bool
+
+
+@dataclass(frozen=True)
+class PendingChannelSummary:
+    state: str
+    remote_pubkey: str
+    channel_point: str
+    capacity_sat: int
+    local_balance_sat: int
+    remote_balance_sat: int
+    limbo_balance_sat: int = 0
+
+
+@dataclass(frozen=True)
+class NodeSnapshot:
+    """
+    The node's identity, sync status and balances as of taken_at, reduced
+    to plain values. channels and pending_channels are None unless they
+    were asked for.
+    """
+
+    alias: str
+    identity_pubkey: str
+    block_height: int
+    synced_to_chain: bool
+    synced_to_graph: bool
+    num_peers: int
+    num_active_channels: int
+    num_inactive_channels: int
+    num_pending_channels: int
+
+    channel_local_sat: int
+    channel_remote_sat: int
+    channel_unsettled_local_sat: int
+    channel_pending_open_local_sat: int
+
+    wallet_total_sat: int
+    wallet_confirmed_sat: int
+    wallet_unconfirmed_sat: int
+    wallet_locked_sat: int
+
+    channels: Optional[Tuple[ChannelSummary, ...]] = None
+    pending_channels: Optional[Tuple[PendingChannelSummary, ...]] = None
+    pending_limbo_sat: Optional[int] = None
+
+    taken_at: float = field(default_factory=time.time)
+
+    @property
+    def total_balance_sat(self):
+        """
+        Funds the node controls: its side of its channels plus the on-chain
+        wallet.
+        """
+        return self.channel_local_sat + self.wallet_total_sat
+
+
+def _pending_summary(state, pending, limbo_balance=0):
+    channel = pending.channel
+
+    return PendingChannelSummary(
+        state=state,
+        remote_pubkey=channel.remote_node_pub,
+        channel_point=channel.channel_point,
+        capacity_sat=channel.capacity,
+        local_balance_sat=channel.local_balance,
+        remote_balance_sat=channel.remote_balance,
+        limbo_balance_sat=limbo_balance,
+    )
+
+
+def build_snapshot(info, channel_balance, wallet_balance, channels=None,
+                   pending_channels=None):
+    """
+    Builds a NodeSnapshot from lnd's GetInfo, ChannelBalance and
+    WalletBalance responses, and optionally its ListChannels and
+    PendingChannels responses.
+    """
+    channel_summaries = None
+    if channels is not None:
+        channel_summaries = tuple(
+            ChannelSummary(
+                chan_id=channel.chan_id,
+                remote_pubkey=channel.remote_pubkey,
+                channel_point=channel.channel_point,
+                capacity_sat=channel.capacity,
+                local_balance_sat=channel.local_balance,
+                remote_balance_sat=channel.remote_balance,
+                active=channel.active,
+            )
+            for channel in channels.channels
+        )
+
+    pending_summaries = None
+    pending_limbo_sat = None
+    if pending_channels is not None:
+        pending_summaries = tuple(
+            [
+                _pending_summary(PENDING_OPEN, pending)
+                for pending in pending_channels.pending_open_channels
+            ] + [
+                _pending_summary(WAITING_CLOSE, pending, pending.limbo_balance)
+                for pending in pending_channels.waiting_close_channels
+            ] + [
+                _pending_summary(
+                    PENDING_FORCE_CLOSE, pending, pending.limbo_balance,
+                )
+                for pending in pending_channels.pending_force_closing_channels
+            ]
+        )
+        pending_limbo_sat = pending_channels.total_limbo_balance
+
+    return NodeSnapshot(
+        alias=info.alias,
+        identity_pubkey=info.identity_pubkey,
+        block_height=info.block_height,
+        synced_to_chain=info.synced_to_chain,
+        synced_to_graph=info.synced_to_graph,
+        num_peers=info.num_peers,
+        num_active_channels=info.num_active_channels,
+        num_inactive_channels=info.num_inactive_channels,
+        num_pending_channels=info.num_pending_channels,
+        channel_local_sat=channel_balance.local_balance.sat,
+        channel_remote_sat=channel_balance.remote_balance.sat,
+        channel_unsettled_local_sat=channel_balance.unsettled_local_balance.sat,
+        channel_pending_open_local_sat=(
+            channel_balance.pending_open_local_balance.sat
+        ),
+        wallet_total_sat=wallet_balance.total_balance,
+        wallet_confirmed_sat=wallet_balance.confirmed_balance,
+        wallet_unconfirmed_sat=wallet_balance.unconfirmed_balance,
+        wallet_locked_sat=wallet_balance.locked_balance,
+        channels=channel_summaries,
+        pending_channels=pending_summaries,
+        pending_limbo_sat=pending_limbo_sat,
+    )
@@ -0,0 +1,3 @@
+from .sink import MetricsSink, NullMetricsSink, InMemoryMetricsSink
+from .sink import Histogram, LATENCY_BUCKETS, SIZE_BUCKETS
+from .prometheus import render, serve
@@ -0,0 +1,120 @@
+"""
+Exposes an InMemoryMetricsSink in the Prometheus text exposition format,
+either rendered to a string or served over HTTP for scraping.
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import re
+import threading
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_INVALID_NAME_CHARS = re.compile(r'[^a-zA-Z0-9_:]')
+
+
+def _metric_name(name):
+    name = _INVALID_NAME_CHARS.sub('_', name)
+    if name[:1].isdigit():
+        name = '_' + name
+
+    return name
+
+
+def _escape(value):
+    return (
+        str(value).replace('\\', '\\\\').replace('\n', '\\n')
+        .replace('"', '\\"')
+    )
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+
+    return '{' + ','.join(
+        '{}="{}"'.format(_metric_name(k), _escape(v)) for k, v in pairs
+    ) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(sink):
+    """
+    Renders every counter and histogram in sink as Prometheus text.
+    """
+    counters, histograms = sink.collect()
+
+    lines = []
+
+    by_name = {}
+    for (name, labels), value in counters.items():
+        by_name.setdefault(_metric_name(name), []).append((labels, value))
+
+    for name in sorted(by_name):
+        lines.append('# TYPE {} counter'.format(name))
+        for labels, value in sorted(by_name[name]):
+            lines.append('{}{} {}'.format(name, _labels(labels), _number(value)))
+
+    by_name = {}
+    for (name, labels), histogram in histograms.items():
+        by_name.setdefault(_metric_name(name), []).append((labels, histogram))
+
+    for name in sorted(by_name):
+        lines.append('# TYPE {} histogram'.format(name))
+        for labels, histogram in sorted(by_name[name], key=lambda e: e[0]):
+            cumulative = 0
+            bounds = histogram.buckets + (float('inf'),)
+            for bound, count in zip(bounds, histogram.counts):
+                cumulative += count
+                lines.append('{}_bucket{} {}'.format(
+                    name, _labels(labels + (('le', _number(bound)),)),
+                    cumulative,
+                ))
+
+            lines.append('{}_sum{} {}'.format(
+                name, _labels(labels), _number(histogram.sum),
+            ))
+            lines.append('{}_count{} {}'.format(
+                name, _labels(labels), histogram.count,
+            ))
+
+    return '\n'.join(lines) + '\n'
+
+
+def serve(sink, port=9100, host='127.0.0.1'):
+    """
+    Serves render(sink) at /metrics from a daemon thread and returns the
+    server; call shutdown() on it to stop. Pass port=0 to pick a free port,
+    which is then available as server.server_address[1].
+    """
+
+    class _MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split('?', 1)[0] != '/metrics':
+                self.send_error(404)
+                return
+
+            body = render(sink).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+
+    threading.Thread(
+        target=server.serve_forever, name='metrics-http', daemon=True,
+    ).start()
+
+    return server
@@ -0,0 +1,209 @@
+import bisect
+import threading
+
+# Upper bounds, in seconds, of the default histogram buckets. They span fast
+# local HTTP round trips up to multi-hop payments that take a minute.
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+# Upper bounds, in bytes, for histograms of message sizes: from tiny RPC
+# requests up to the 200MB messages lnd allows.
+SIZE_BUCKETS = (
+    64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216,
+    67108864, 209715200,
+)
+
+
+def _label_key(labels):
+    if not labels:
+        return ()
+
+    return tuple(sorted(labels.items()))
+
+
+class MetricsSink(object):
+    """
+    Interface that instrumented code reports counters and observations to.
+
+    Hot paths may check enabled to skip gathering measurements that would
+    only be discarded.
+    """
+
+    enabled = True
+
+    def incr(self, name, value=1, labels=None):
+        raise NotImplementedError()
+
+    def observe(self, name, value, labels=None):
+        raise NotImplementedError()
+
+    def set_default_buckets(self, name, buckets):
+        """
+        Tells the sink which histogram bounds suit observations of name,
+        for instance SIZE_BUCKETS for sizes in bytes. Sinks that bucket
+        observations use them unless configured otherwise.
+        """
+        pass
+
+
+class NullMetricsSink(MetricsSink):
+    """
+    Discards everything. Used when no sink is configured.
+    """
+
+    enabled = False
+
+    def incr(self, name, value=1, labels=None):
+        pass
+
+    def observe(self, name, value, labels=None):
+        pass
+
+
+class Histogram(object):
+    """
+    Fixed-bucket histogram. Quantiles are estimated by interpolating within
+    the bucket they fall into, which is accurate to the bucket resolution.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+
+        # One extra slot for observations above the largest bound.
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        if self.count == 0:
+            return None
+
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if bucket_count == 0 or seen + bucket_count < rank:
+                seen += bucket_count
+                continue
+
+            lower = self.buckets[i - 1] if i > 0 else self.min
+            upper = self.buckets[i] if i < len(self.buckets) else self.max
+            lower = max(lower, self.min)
+            upper = min(upper, self.max)
+
+            return lower + (upper - lower) * (rank - seen) / bucket_count
+
+        return self.max
+
+    def copy(self):
+        histogram = Histogram(self.buckets)
+        histogram.counts = list(self.counts)
+        histogram.count = self.count
+        histogram.sum = self.sum
+        histogram.min = self.min
+        histogram.max = self.max
+
+        return histogram
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'min': self.min,
+            'max': self.max,
+            'mean': self.sum / self.count if self.count else None,
+            'p50': self.quantile(0.5),
+            'p90': self.quantile(0.9),
+            'p99': self.quantile(0.99),
+        }
+
+
+class InMemoryMetricsSink(MetricsSink):
+    """
+    Thread-safe sink that aggregates everything in memory. Histograms use
+    LATENCY_BUCKETS unless other bounds are given for a metric name in
+    buckets, or by set_default_buckets.
+    """
+
+    def __init__(self, buckets=None):
+        self._buckets = dict(buckets or {})
+        self._lock = threading.Lock()
+
+        self.counters = {}
+        self.histograms = {}
+
+    def set_default_buckets(self, name, buckets):
+        with self._lock:
+            self._buckets.setdefault(name, tuple(buckets))
+
+    def incr(self, name, value=1, labels=None):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, labels=None):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = Histogram(
+                    self._buckets.get(name, LATENCY_BUCKETS),
+                )
+                self.histograms[key] = histogram
+
+            histogram.observe(value)
+
+    def counter(self, name, labels=None):
+        with self._lock:
+            return self.counters.get((name, _label_key(labels)), 0)
+
+    def histogram(self, name, labels=None):
+        with self._lock:
+            return self.histograms.get((name, _label_key(labels)))
+
+    def collect(self):
+        """
+        Returns consistent copies of the counters and histograms, each a
+        dict keyed by (name, label pairs).
+        """
+        with self._lock:
+            counters = dict(self.counters)
+            histograms = {
+                key: histogram.copy()
+                for key, histogram in self.histograms.items()
+            }
+
+        return counters, histograms
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def summary(self):
+        """
+        Returns a plain dict snapshot of every counter and histogram, keyed
+        by metric name and then by the label pairs it was reported with.
+        """
+        result = {}
+        with self._lock:
+            for (name, labels), value in self.counters.items():
+                result.setdefault(name, {})[labels] = value
+
+            for (name, labels), histogram in self.histograms.items():
+                result.setdefault(name, {})[labels] = histogram.summary()
+
+        return result
@@ -2,8 +2,8 @@
 """Client and server classes corresponding to protobuf-defined services."""
 import grpc
 
-import lightning_pb2 as lightning__pb2
-import router_pb2 as router__pb2
+from protos import lightning_pb2 as lightning__pb2
+from protos import router_pb2 as router__pb2
 
 
 class RouterStub(object):
@@ -0,0 +1,156 @@
+import hashlib
+
+import pytest
+
+from lightning import bolt11, secp256k1
+
+# The node key and payee every example in the BOLT11 spec is signed with.
+SPEC_KEY = bytes.fromhex(
+    'e126f68f7eafcc8b74f54d269fe206be715000f94dac067d1c04a8ca3b2db734',
+)
+SPEC_PAYEE = (
+    '03e7156ae33b0a208d0744199163177e909e80176e55d97a2f221ede0f934dd9ad'
+)
+SPEC_PAYMENT_HASH = (
+    '0001020304050607080900010203040506070809000102030405060708090102'
+)
+SPEC_PAYMENT_ADDR = bytes.fromhex('11' * 32)
+SPEC_TIMESTAMP = 1496314658
+
+DONATION = (
+    'lnbc1pvjluezsp5zyg3zyg3zyg3zyg3zyg3zyg3zyg3zyg3zyg3zyg3zyg3zyg3zygspp5'
+    'qqqsyqcyq5rqwzqfqqqsyqcyq5rqwzqfqqqsyqcyq5rqwzqfqypqdpl2pkx2ctnv5sxxm'
+    'mwwd5kgetjypeh2ursdae8g6twvus8g6rfwvs8qun0dfjkxaq9qrsgq357wnc5r2ueh7c'
+    'k6q93dj32dlqnls087fxdwk8qakdyafkq3yap9us6v52vjjsrvywa6rt52cm9r9zqt8r2'
+    't7mlcwspyetp5h2tztugp9lfyql'
+)
+COFFEE = (
+    'lnbc2500u1pvjluezsp5zyg3zyg3zyg3zyg3zyg3zyg3zyg3zyg3zyg3zyg3zyg3zyg3z'
+    'ygspp5qqqsyqcyq5rqwzqfqqqsyqcyq5rqwzqfqqqsyqcyq5rqwzqfqypqdq5xysxxats'
+    'yp3k7enxv4jsxqzpu9qrsgquk0rl77nj30yxdy8j9vdx85fkpmdla2087ne0xh8nhedh8'
+    'w27kyke0lp53ut353s06fv3qfegext0eh0ymjpf39tuven09sam30g4vgpfna3rh'
+)
+HASHED_DESCRIPTION = (
+    'lnbc20m1pvjluezsp5zyg3zyg3zyg3zyg3zyg3zyg3zyg3zyg3zyg3zyg3zyg3zyg3zyg'
+    'spp5qqqsyqcyq5rqwzqfqqqsyqcyq5rqwzqfqqqsyqcyq5rqwzqfqypqhp58yjmdan79s'
+    '6qqdhdzgynm4zwqd5d7xmw5fk98klysy043l2ahrqs9qrsgq7ea976txfraylvgzuxs8k'
+    'gcw23ezlrszfnh8r6qtfpr6cxga50aj6txm9rxrydzd06dfeawfk6swupvz4erwnyutnj'
+    'q7x39ymw6j38gp7ynn44'
+)
+TESTNET_FALLBACK = (
+    'lntb20m1pvjluezsp5zyg3zyg3zyg3zyg3zyg3zyg3zyg3zyg3zyg3zyg3zyg3zyg3zyg'
+    'shp58yjmdan79s6qqdhdzgynm4zwqd5d7xmw5fk98klysy043l2ahrqspp5qqqsyqcyq5'
+    'rqwzqfqqqsyqcyq5rqwzqfqqqsyqcyq5rqwzqfqypqfpp3x9et2e20v6pu37c5d9vax37'
+    'wxq72un989qrsgqdj545axuxtnfemtpwkc45hx9d2ft7x04mt8q7y6t0k2dge9e7h8kpy'
+    '9p34ytyslj3yu569aalz2xdk8xkd7ltxqld94u8h2esmsmacgpghe9k8'
+)
+
+CAKE = (
+    'One piece of chocolate cake, one icecream cone, one pickle, one slice '
+    'of swiss cheese, one slice of salami, one lollypop, one piece of '
+    'cherry pie, one sausage, one cupcake, and one slice of watermelon'
+)
+
+
+@pytest.fixture(params=['coincurve', 'pure'])
+def curve(request, monkeypatch):
+    if request.param == 'pure':
+        monkeypatch.setattr(secp256k1, 'coincurve', None)
+    elif secp256k1.coincurve is None:
+        pytest.skip('coincurve is not installed')
+
+    bolt11._decode.cache_clear()
+    yield request.param
+    bolt11._decode.cache_clear()
+
+
+def _assert_spec_invoice(pay_req):
+    assert pay_req.destination == SPEC_PAYEE
+    assert pay_req.payment_hash == SPEC_PAYMENT_HASH
+    assert pay_req.payment_addr == SPEC_PAYMENT_ADDR
+    assert pay_req.timestamp == SPEC_TIMESTAMP
+
+
+def test_donation_of_any_amount(curve):
+    pay_req = bolt11.decode(DONATION)
+
+    _assert_spec_invoice(pay_req)
+    assert pay_req.num_msat == 0
+    assert pay_req.description == 'Please consider supporting this project'
+    assert pay_req.expiry == bolt11.DEFAULT_EXPIRY
+    assert pay_req.cltv_expiry == bolt11.DEFAULT_MIN_FINAL_CLTV_EXPIRY
+    assert sorted(pay_req.features) == [8, 14]
+    assert pay_req.features[14].name == 'payment-addr'
+    assert pay_req.features[14].is_required
+
+
+def test_amount_and_expiry(curve):
+    pay_req = bolt11.decode(COFFEE)
+
+    _assert_spec_invoice(pay_req)
+    assert pay_req.num_msat == 250000000
+    assert pay_req.num_satoshis == 250000
+    assert pay_req.description == '1 cup coffee'
+    assert pay_req.expiry == 60
+
+
+def test_description_hash(curve):
+    pay_req = bolt11.decode(HASHED_DESCRIPTION)
+
+    _assert_spec_invoice(pay_req)
+    assert pay_req.num_msat == 2000000000
+    assert pay_req.description == ''
+    assert pay_req.description_hash == (
+        hashlib.sha256(CAKE.encode()).hexdigest()
+    )
+
+
+def test_testnet_fallback_address(curve):
+    pay_req = bolt11.decode(TESTNET_FALLBACK)
+
+    _assert_spec_invoice(pay_req)
+    assert pay_req.fallback_addr == 'mk2QpYatsKicvFVuTAQLBryyccRXMUaGHP'
+
+
+def test_accepts_uppercase_and_uri_prefix():
+    pay_req = bolt11.decode('LIGHTNING:' + COFFEE.upper())
+
+    assert pay_req.num_msat == 250000000
+    assert pay_req.destination == SPEC_PAYEE
+
+
+@pytest.mark.parametrize('invoice', [
+    # Last character changed, breaking the checksum.
+    DONATION[:-1] + 'q',
+    DONATION[:10] + DONATION[10:].upper(),
+    'lnxy1pvjluezpp5qqqsyqcyq5rqwzqfqqqsyqcyq5r',
+    'lnbc1qqqqqqqqqq',
+    'not an invoice',
+])
+def test_rejects_invalid_invoices(invoice):
+    with pytest.raises(bolt11.Bolt11DecodeError):
+        bolt11.decode(invoice)
+
+
+def test_encode_round_trip(curve):
+    invoice = bolt11.encode(
+        SPEC_KEY, bytes.fromhex(SPEC_PAYMENT_HASH), amount_msat=1500,
+        description='round trip', payment_addr=SPEC_PAYMENT_ADDR,
+        currency='bc', timestamp=SPEC_TIMESTAMP, expiry=600,
+    )
+    assert invoice.startswith('lnbc15n1')
+
+    pay_req = bolt11.decode(invoice)
+
+    _assert_spec_invoice(pay_req)
+    assert pay_req.num_msat == 1500
+    assert pay_req.description == 'round trip'
+    assert pay_req.expiry == 600
+    assert sorted(pay_req.features) == [8, 14, 17]
+
+
+def test_decode_returns_copies():
+    pay_req = bolt11.decode(COFFEE)
+    pay_req.description = 'changed'
+
+    assert bolt11.decode(COFFEE).description == '1 cup coffee'
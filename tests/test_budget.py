@@ -0,0 +1,103 @@
+import pytest
+
+from L402 import AmountlessInvoiceError, BudgetExceededError
+from L402 import PriceLimitExceededError, SpendingLimits
+
+URL = 'https://api.example.com/v1/items'
+
+
+def test_longest_prefix_limit_applies():
+    limits = SpendingLimits(max_price_sat=10, endpoint_max_price_sat={
+        'https://api.example.com/': 5,
+        'https://api.example.com/v1/items': 50,
+    })
+
+    assert limits.price_limit_msat(URL + '/42') == 50000
+    assert limits.price_limit_msat('https://api.example.com/v2') == 5000
+    assert limits.price_limit_msat('https://other.example.com/') == 10000
+
+
+def test_price_over_limit_is_refused():
+    limits = SpendingLimits(endpoint_max_price_sat={URL: 1})
+
+    with pytest.raises(PriceLimitExceededError) as excinfo:
+        limits.reserve(URL, 1001)
+
+    assert excinfo.value.url == URL
+    assert excinfo.value.price_msat == 1001
+    assert excinfo.value.limit_msat == 1000
+
+    # Other endpoints aren't limited.
+    limits.reserve('https://other.example.com/', 1001)
+
+
+def test_amountless_invoice_refused_once_limited():
+    SpendingLimits().reserve(URL, 0)
+
+    with pytest.raises(AmountlessInvoiceError):
+        SpendingLimits(budget_sat=10).reserve(URL, 0)
+
+    with pytest.raises(AmountlessInvoiceError):
+        SpendingLimits(max_price_sat=10).reserve(URL, 0)
+
+
+def test_reservations_include_the_fee_limit():
+    limits = SpendingLimits(budget_sat=10)
+
+    first = limits.reserve(URL, 4000, fee_limit_msat=1000)
+    assert limits.remaining_msat == 5000
+
+    # The price alone would fit, but not with its fee limit on top.
+    with pytest.raises(BudgetExceededError) as excinfo:
+        limits.reserve(URL, 4500, fee_limit_msat=1000)
+
+    assert excinfo.value.remaining_msat == 5000
+    assert excinfo.value.fee_limit_msat == 1000
+
+    second = limits.reserve(URL, 4000, fee_limit_msat=1000)
+    assert limits.remaining_msat == 0
+
+    limits.release(second, paid=False)
+    limits.release(first, paid=False)
+    assert limits.remaining_msat == 10000
+    assert limits.spent_msat == 0
+
+
+def test_settled_payment_counts_its_actual_fee():
+    limits = SpendingLimits(budget_sat=10)
+
+    with limits.payment(URL, 4000, fee_limit_msat=1000) as reservation:
+        reservation.settle(paid=True, fee_msat=12)
+
+    assert limits.spent_msat == 4012
+    assert limits.remaining_msat == 5988
+
+
+def test_unsettled_payment_counts_its_fee_limit():
+    limits = SpendingLimits(budget_sat=10)
+
+    with limits.payment(URL, 4000, fee_limit_msat=1000):
+        pass
+
+    assert limits.spent_msat == 5000
+
+
+def test_payment_that_needed_no_paying_spends_nothing():
+    limits = SpendingLimits(budget_sat=10)
+
+    with limits.payment(URL, 4000, fee_limit_msat=1000) as reservation:
+        reservation.settle(paid=False)
+
+    assert limits.spent_msat == 0
+    assert limits.remaining_msat == 10000
+
+
+def test_failed_payment_is_released():
+    limits = SpendingLimits(budget_sat=10)
+
+    with pytest.raises(RuntimeError):
+        with limits.payment(URL, 4000, fee_limit_msat=1000):
+            raise RuntimeError('no route')
+
+    assert limits.spent_msat == 0
+    assert limits.remaining_msat == 10000
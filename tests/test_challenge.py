@@ -0,0 +1,81 @@
+import pytest
+
+from L402 import InvalidChallengeError, L402Challenge, parse_L402_challenge
+from L402.challenge import parse_challenges
+
+
+def test_parses_single_challenge():
+    [challenge] = parse_challenges('L402 macaroon="AGIAJEem", invoice=lnbc1')
+
+    assert challenge.scheme == 'L402'
+    assert dict(challenge.params) == {
+        'macaroon': 'AGIAJEem', 'invoice': 'lnbc1',
+    }
+    assert challenge.token68 is None
+
+
+def test_parses_multiple_challenges():
+    challenges = parse_challenges(
+        'Bearer realm="api", LSAT macaroon="old", invoice="lnbc1", '
+        'Basic dXNlcjpwYXNz, L402 Macaroon="new" , invoice = "lnbc2",',
+    )
+
+    assert [c.scheme for c in challenges] == [
+        'Bearer', 'LSAT', 'Basic', 'L402',
+    ]
+    assert dict(challenges[0].params) == {'realm': 'api'}
+    assert challenges[2].token68 == 'dXNlcjpwYXNz'
+    # Parameter names are matched case-insensitively.
+    assert dict(challenges[3].params) == {
+        'macaroon': 'new', 'invoice': 'lnbc2',
+    }
+
+
+def test_unescapes_quoted_strings():
+    [challenge] = parse_challenges(
+        r'L402 realm="say \"hi\", \\ bye", macaroon="a,b=c", invoice="i"',
+    )
+
+    assert dict(challenge.params) == {
+        'realm': r'say "hi", \ bye', 'macaroon': 'a,b=c', 'invoice': 'i',
+    }
+
+
+@pytest.mark.parametrize('header', [
+    'macaroon="m", invoice="i"',
+    'L402 macaroon="m", invoice="unterminated\\"',
+    'L402 macaroon=@',
+])
+def test_rejects_malformed_headers(header):
+    with pytest.raises(InvalidChallengeError):
+        parse_challenges(header)
+
+
+def test_prefers_L402_over_LSAT():
+    header = (
+        'LSAT macaroon="old", invoice="lnbc1", '
+        'L402 macaroon="new", invoice="lnbc2"'
+    )
+
+    assert parse_L402_challenge(header) == L402Challenge(
+        'L402', 'new', 'lnbc2',
+    )
+
+
+def test_falls_back_to_LSAT():
+    header = (
+        'L402 macaroon="incomplete", '
+        'lsat macaroon="m", invoice="lnbc1"'
+    )
+
+    assert parse_L402_challenge(header) == L402Challenge('LSAT', 'm', 'lnbc1')
+
+
+@pytest.mark.parametrize('header', [
+    '',
+    'Bearer realm="api"',
+    'L402 macaroon="m"',
+])
+def test_requires_an_L402_challenge(header):
+    with pytest.raises(InvalidChallengeError):
+        parse_L402_challenge(header)
@@ -0,0 +1,83 @@
+import shutil
+
+import pytest
+
+from lightning import ChannelPool, FakeLnd, LndNode
+
+
+@pytest.fixture
+def fake_lnd():
+    with FakeLnd() as fake:
+        yield fake
+
+
+def test_nodes_share_one_channel(fake_lnd):
+    pool = ChannelPool()
+    first = fake_lnd.node(channel_pool=pool)
+    second = fake_lnd.node(channel_pool=pool)
+
+    first.create_invoice('first', 10)
+    second.create_invoice('second', 10)
+
+    assert len(pool) == 1
+    assert first._channel is second._channel
+
+    # The channel outlives the first node while the second still uses it.
+    first.close()
+    assert len(pool) == 1
+    second.create_invoice('still open', 10)
+
+    second.close()
+    assert len(pool) == 0
+
+
+def test_credentials_get_their_own_channel(fake_lnd, tmp_path):
+    macaroon_path = str(tmp_path / 'other.macaroon')
+    shutil.copy(fake_lnd.macaroon_path, macaroon_path)
+
+    pool = ChannelPool()
+    first = fake_lnd.node(channel_pool=pool)
+    second = LndNode(
+        fake_lnd.cert_path, macaroon_path, host=fake_lnd.host,
+        port=fake_lnd.port, channel_pool=pool,
+    )
+
+    first.create_invoice('first', 10)
+    second.create_invoice('second', 10)
+
+    assert len(pool) == 2
+    assert first._channel is not second._channel
+
+    first.close()
+    second.close()
+    assert len(pool) == 0
+
+
+def test_release_is_idempotent(fake_lnd):
+    pool = ChannelPool()
+    key, channel = pool.acquire(
+        fake_lnd.host, fake_lnd.port, fake_lnd.cert_path,
+        fake_lnd.macaroon_path,
+    )
+    assert pool.acquire(
+        fake_lnd.host, str(fake_lnd.port), fake_lnd.cert_path,
+        fake_lnd.macaroon_path,
+    ) == (key, channel)
+
+    pool.release(key)
+    pool.release(key)
+    assert len(pool) == 0
+
+    # Releasing a channel that's gone already is a no-op.
+    pool.release(key)
+
+
+def test_close_all(fake_lnd):
+    pool = ChannelPool()
+    node = fake_lnd.node(channel_pool=pool)
+    node.create_invoice('invoice', 10)
+
+    pool.close_all()
+    assert len(pool) == 0
+
+    node.close()
@@ -0,0 +1,245 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import hashlib
+import os
+import re
+import socket
+import threading
+
+import pytest
+import requests
+
+from L402 import DownloadError, RequestsL402Wrapper
+from L402.requests_l402 import PART_SUFFIX, VALIDATOR_SUFFIX
+from lightning import bolt11
+
+PREIMAGE = hashlib.sha256(b'test-preimage').digest()
+
+AUTHORIZATION = 'LSAT test-macaroon:{}'.format(PREIMAGE.hex())
+
+DATA = bytes(range(256)) * 4096
+
+
+class _RangeHandler(BaseHTTPRequestHandler):
+    """
+    Serves DATA under etag, honouring Range and If-Range, to requests with
+    a token. The first cuts responses are sent only in part.
+    """
+
+    protocol_version = 'HTTP/1.1'
+
+    invoice = None
+    etag = None
+    cuts = 0
+    requests = None
+
+    def log_message(self, *args):
+        pass
+
+    def _challenge(self):
+        self.send_response(402)
+        self.send_header(
+            'WWW-Authenticate',
+            'LSAT macaroon="test-macaroon", invoice="{}"'.format(
+                self.invoice,
+            ),
+        )
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_GET(self):
+        if self.headers.get('Authorization') != AUTHORIZATION:
+            return self._challenge()
+
+        byte_range = self.headers.get('Range')
+        if_range = self.headers.get('If-Range')
+        self.requests.append((byte_range, if_range))
+
+        start = 0
+        if byte_range and if_range in (None, self.etag):
+            start = int(re.match(r'bytes=(\d+)-$', byte_range).group(1))
+            if start >= len(DATA):
+                self.send_response(416)
+                self.send_header('Content-Range', 'bytes */{}'.format(
+                    len(DATA),
+                ))
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+            self.send_response(206)
+            self.send_header('Content-Range', 'bytes {}-{}/{}'.format(
+                start, len(DATA) - 1, len(DATA),
+            ))
+        else:
+            self.send_response(200)
+
+        body = DATA[start:]
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('ETag', self.etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+
+        if _RangeHandler.cuts:
+            _RangeHandler.cuts -= 1
+            self.wfile.write(body[:len(body) // 3])
+            self.wfile.flush()
+            self.connection.shutdown(socket.SHUT_RDWR)
+            self.close_connection = True
+            return
+
+        self.wfile.write(body)
+
+
+class _StubNode(object):
+    def __init__(self):
+        self.payments = 0
+
+    def pay_invoice(self, invoice, amt=None):
+        self.payments += 1
+        return PREIMAGE.hex()
+
+
+@pytest.fixture
+def server():
+    _RangeHandler.invoice = bolt11.encode(
+        hashlib.sha256(b'test-key').digest(),
+        hashlib.sha256(PREIMAGE).digest(), amount_msat=1000,
+    )
+    _RangeHandler.etag = '"v1"'
+    _RangeHandler.cuts = 0
+    _RangeHandler.requests = []
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _RangeHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def node():
+    return _StubNode()
+
+
+@pytest.fixture
+def wrapper(node):
+    return RequestsL402Wrapper(node, requests.Session())
+
+
+def _url(server):
+    return 'http://127.0.0.1:{}/file.bin'.format(server.server_address[1])
+
+
+def _write(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _assert_downloaded(path):
+    assert _read(path) == DATA
+    assert not os.path.exists(path + PART_SUFFIX)
+    assert not os.path.exists(path + PART_SUFFIX + VALIDATOR_SUFFIX)
+
+
+def test_download(server, node, wrapper, tmp_path):
+    path = str(tmp_path / 'file.bin')
+
+    result = wrapper.download(_url(server), path, chunk_size=4096)
+
+    assert result.size == len(DATA)
+    assert result.resumes == 0
+    assert node.payments == 1
+    assert _RangeHandler.requests == [(None, None)]
+    _assert_downloaded(path)
+
+
+def test_interrupted_download_resumes_with_if_range(
+        server, wrapper, tmp_path):
+    path = str(tmp_path / 'file.bin')
+    _RangeHandler.cuts = 1
+
+    result = wrapper.download(_url(server), path)
+
+    assert result.resumes == 1
+    [first, resumed] = _RangeHandler.requests
+    assert first == (None, None)
+    assert resumed[0].startswith('bytes=') and resumed[1] == '"v1"'
+    _assert_downloaded(path)
+
+
+def test_part_file_resumed_with_saved_validator(server, wrapper, tmp_path):
+    path = str(tmp_path / 'file.bin')
+    _write(path + PART_SUFFIX, DATA[:1000])
+    _write(path + PART_SUFFIX + VALIDATOR_SUFFIX, b'"v1"')
+
+    wrapper.download(_url(server), path)
+
+    assert _RangeHandler.requests == [('bytes=1000-', '"v1"')]
+    _assert_downloaded(path)
+
+
+def test_part_file_without_validator_discarded(server, wrapper, tmp_path):
+    path = str(tmp_path / 'file.bin')
+    _write(path + PART_SUFFIX, b'x' * 1000)
+
+    wrapper.download(_url(server), path)
+
+    assert _RangeHandler.requests == [(None, None)]
+    _assert_downloaded(path)
+
+
+def test_changed_resource_restarts(server, wrapper, tmp_path):
+    path = str(tmp_path / 'file.bin')
+    _write(path + PART_SUFFIX, b'x' * 1000)
+    _write(path + PART_SUFFIX + VALIDATOR_SUFFIX, b'"v0"')
+
+    wrapper.download(_url(server), path)
+
+    # The server sends the whole of the new version instead of the range.
+    assert _RangeHandler.requests == [('bytes=1000-', '"v0"')]
+    _assert_downloaded(path)
+
+
+def test_complete_part_file_finished_on_416(server, wrapper, tmp_path):
+    path = str(tmp_path / 'file.bin')
+    _write(path + PART_SUFFIX, DATA)
+    _write(path + PART_SUFFIX + VALIDATOR_SUFFIX, b'"v1"')
+
+    result = wrapper.download(_url(server), path)
+
+    assert result.size == len(DATA)
+    assert _RangeHandler.requests == [
+        ('bytes={}-'.format(len(DATA)), '"v1"'),
+    ]
+    _assert_downloaded(path)
+
+
+def test_gives_up_after_max_resumes(server, wrapper, tmp_path):
+    path = str(tmp_path / 'file.bin')
+    part_path = path + PART_SUFFIX
+    _RangeHandler.cuts = 3
+
+    with pytest.raises(DownloadError):
+        wrapper.download(_url(server), path, max_resumes=2)
+
+    # What was fetched is kept, with its validator, for the next call.
+    fetched = os.path.getsize(part_path)
+    assert 0 < fetched < len(DATA)
+    assert _read(part_path + VALIDATOR_SUFFIX) == b'"v1"'
+    assert not os.path.exists(path)
+
+    _RangeHandler.requests.clear()
+    result = wrapper.download(_url(server), path)
+
+    assert result.resumes == 0
+    assert _RangeHandler.requests == [('bytes={}-'.format(fetched), '"v1"')]
+    _assert_downloaded(path)
@@ -0,0 +1,93 @@
+from types import SimpleNamespace
+
+import time
+
+import pytest
+
+from lightning import FakeLnd, InvoicePool, bolt11, invoice_pool
+
+
+@pytest.fixture
+def fake_lnd():
+    with FakeLnd() as fake:
+        yield fake
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(
+        invoice_pool, 'time', SimpleNamespace(monotonic=lambda: now[0]),
+    )
+
+    return now
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def _memo(invoice):
+    return bolt11.decode(invoice.payment_request).description
+
+
+def test_stock_and_take(fake_lnd):
+    node = fake_lnd.node()
+    pool = InvoicePool(node, size=3)
+
+    pool.stock(100, 'coffee #{seq}')
+    _wait_for(lambda: len(pool) == 3)
+    assert fake_lnd.calls['AddInvoice'] == 3
+
+    invoice = pool.take(100, 'coffee #{seq}')
+    assert _memo(invoice) == 'coffee #0'
+    assert bolt11.decode(invoice.payment_request).num_satoshis == 100
+
+    # The taken invoice is replaced in the background.
+    _wait_for(lambda: fake_lnd.calls['AddInvoice'] == 4)
+    _wait_for(lambda: len(pool) == 3)
+
+    pool.stop()
+    node.close()
+
+
+def test_take_unstocked_mints_and_starts_stocking(fake_lnd):
+    node = fake_lnd.node()
+    pool = InvoicePool(node, size=2)
+
+    invoice = pool.take(250, 'tea')
+    assert _memo(invoice) == 'tea'
+    assert bolt11.decode(invoice.payment_request).num_satoshis == 250
+
+    _wait_for(lambda: len(pool) == 2)
+
+    pool.stop()
+    node.close()
+
+
+def test_stale_invoices_arent_handed_out(fake_lnd, clock):
+    node = fake_lnd.node()
+    pool = InvoicePool(node, size=2, expiry=3600, min_remaining=600)
+
+    pool.stock(100, 'coffee #{seq}')
+    _wait_for(lambda: len(pool) == 2)
+    pool.stop()
+
+    stock = pool._stock[(100, 'coffee #{seq}')]
+    pooled = {invoice.payment_request for _, invoice in stock}
+
+    clock[0] += 3000
+    invoice = pool.take(100, 'coffee #{seq}')
+
+    assert invoice.payment_request not in pooled
+    assert len(pool) == 0
+
+    node.close()
+
+
+def test_min_remaining_must_be_shorter_than_expiry(fake_lnd):
+    with pytest.raises(ValueError):
+        InvoicePool(fake_lnd.node(), expiry=600, min_remaining=600)
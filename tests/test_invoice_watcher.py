@@ -0,0 +1,52 @@
+import threading
+
+import pytest
+
+from lightning import FakeLnd, InvoiceWatcherStoppedError
+
+
+@pytest.fixture
+def fake_lnd():
+    with FakeLnd() as fake:
+        yield fake
+
+
+def test_close_fails_pending_waiters(fake_lnd):
+    node = fake_lnd.node()
+    invoice = node.create_invoice('unpaid', 10)
+    payment_hash = invoice.r_hash.hex()
+
+    errors = []
+
+    def wait():
+        try:
+            node.wait_for_invoice(payment_hash)
+        except Exception as e:
+            errors.append(e)
+
+    waiter = threading.Thread(target=wait)
+    waiter.start()
+
+    # Wait until the watcher has the waiter before closing the node.
+    while waiter.is_alive() and len(node.invoice_watcher) == 0:
+        waiter.join(0.01)
+
+    node.close()
+    waiter.join(5)
+
+    assert not waiter.is_alive()
+    assert len(errors) == 1
+    assert isinstance(errors[0], InvoiceWatcherStoppedError)
+
+
+def test_watch_after_stop_fails(fake_lnd):
+    node = fake_lnd.node()
+    watcher = node.invoice_watcher
+    watcher.stop()
+
+    future = watcher.watch('00' * 32, lookup=False)
+
+    with pytest.raises(InvoiceWatcherStoppedError):
+        future.result(timeout=0)
+
+    node.close()
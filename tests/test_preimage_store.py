@@ -0,0 +1,156 @@
+import hashlib
+import os
+import stat
+import threading
+
+import pytest
+
+from lightning import PreimageStore
+
+
+def _payment(name):
+    preimage = hashlib.sha256(name.encode()).digest()
+
+    return hashlib.sha256(preimage).hexdigest(), preimage.hex()
+
+
+def _journal_lines(path):
+    with open(path, 'rb') as f:
+        return f.read().splitlines()
+
+
+def test_rejects_mismatched_preimage():
+    store = PreimageStore()
+    payment_hash, _ = _payment('a')
+
+    with pytest.raises(ValueError):
+        store.put(payment_hash, _payment('b')[1])
+    with pytest.raises(ValueError):
+        store.put(payment_hash, 'not hex')
+
+    assert store.get(payment_hash) is None
+
+
+def test_forgets_oldest_beyond_limit():
+    store = PreimageStore(max_preimages=2)
+    payments = [_payment(name) for name in 'abc']
+    for payment_hash, preimage in payments:
+        store.put(payment_hash, preimage)
+
+    assert len(store) == 2
+    assert store.get(payments[0][0]) is None
+    assert store.get(payments[2][0]) == payments[2][1]
+
+
+def test_journal_replayed_on_startup(tmp_path):
+    path = str(tmp_path / 'preimages.jsonl')
+    payments = [_payment(name) for name in 'ab']
+
+    store = PreimageStore(path)
+    for payment_hash, preimage in payments:
+        store.put(payment_hash, preimage)
+    # Storing a known preimage again isn't journaled twice.
+    store.put(*payments[0])
+
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    assert len(_journal_lines(path)) == 2
+
+    reloaded = PreimageStore(path)
+    assert len(reloaded) == 2
+    for payment_hash, preimage in payments:
+        assert reloaded.get(payment_hash) == preimage
+
+
+def test_truncated_last_line_dropped(tmp_path):
+    path = str(tmp_path / 'preimages.jsonl')
+    payment_hash, preimage = _payment('a')
+    PreimageStore(path).put(payment_hash, preimage)
+
+    # A crash cut the next append short.
+    with open(path, 'ab') as f:
+        f.write(b'{"payment_hash": "00')
+
+    store = PreimageStore(path)
+    assert len(store) == 1
+    assert store.get(payment_hash) == preimage
+
+    # The torn write is gone, so the next entry lands on its own line.
+    other_hash, other_preimage = _payment('b')
+    store.put(other_hash, other_preimage)
+
+    reloaded = PreimageStore(path)
+    assert reloaded.get(payment_hash) == preimage
+    assert reloaded.get(other_hash) == other_preimage
+    assert len(_journal_lines(path)) == 2
+
+
+def test_invalid_entries_skipped_and_compacted(tmp_path):
+    path = str(tmp_path / 'preimages.jsonl')
+    payment_hash, preimage = _payment('a')
+    PreimageStore(path).put(payment_hash, preimage)
+
+    with open(path, 'ab') as f:
+        f.write(b'not json\n')
+        f.write(b'{"payment_hash": "%s", "preimage": "%s"}\n' % (
+            payment_hash.encode(), _payment('b')[1].encode(),
+        ))
+
+    store = PreimageStore(path)
+    assert len(store) == 1
+    assert store.get(payment_hash) == preimage
+    assert len(_journal_lines(path)) == 1
+
+
+def test_journal_compacted_to_limit(tmp_path):
+    path = str(tmp_path / 'preimages.jsonl')
+    payments = [_payment(name) for name in 'abcd']
+
+    store = PreimageStore(path)
+    for payment_hash, preimage in payments:
+        store.put(payment_hash, preimage)
+
+    reloaded = PreimageStore(path, max_preimages=2)
+    assert len(reloaded) == 2
+    assert len(_journal_lines(path)) == 2
+    assert not os.path.exists(path + '.tmp')
+
+    assert [
+        PreimageStore(path).get(payment_hash)
+        for payment_hash, _ in payments
+    ] == [None, None, payments[2][1], payments[3][1]]
+
+
+def test_failed_append_isnt_remembered(tmp_path, monkeypatch):
+    store = PreimageStore(str(tmp_path / 'preimages.jsonl'))
+    payment_hash, preimage = _payment('a')
+
+    def write(fd, data):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(os, 'write', write)
+    with pytest.raises(OSError):
+        store.put(payment_hash, preimage)
+    monkeypatch.undo()
+
+    assert store.get(payment_hash) is None
+
+
+def test_lock_serializes_same_payment_hash():
+    store = PreimageStore()
+    payment_hash, preimage = _payment('a')
+    paid = []
+
+    def pay():
+        with store.lock(payment_hash):
+            if store.get(payment_hash) is None:
+                paid.append(1)
+                store.put(payment_hash, preimage)
+
+    threads = [threading.Thread(target=pay) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert paid == [1]
+    assert store._hash_locks == {}
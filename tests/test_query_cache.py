@@ -0,0 +1,137 @@
+from types import SimpleNamespace
+
+import threading
+import time
+
+import pytest
+
+from lightning import FakeLnd, QueryCache, query_cache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(
+        query_cache, 'time', SimpleNamespace(monotonic=lambda: now[0]),
+    )
+
+    return now
+
+
+class _Loader(object):
+    def __init__(self):
+        self.loads = 0
+
+    def __call__(self):
+        self.loads += 1
+        return self.loads
+
+
+def test_results_cached_for_their_ttl(clock):
+    cache = QueryCache({'get_info': 30})
+    load = _Loader()
+
+    assert cache.get('get_info', load) == 1
+    clock[0] += 29
+    assert cache.get('get_info', load) == 1
+
+    clock[0] += 1
+    assert cache.get('get_info', load) == 2
+
+
+def test_names_without_ttl_arent_cached():
+    cache = QueryCache({'get_info': 30})
+    load = _Loader()
+
+    assert cache.get('list_channels', load) == 1
+    assert cache.get('list_channels', load) == 2
+
+
+def test_invalidate(clock):
+    cache = QueryCache({'get_info': 30, 'channel_balance': 10})
+    info, balance = _Loader(), _Loader()
+    cache.get('get_info', info)
+    cache.get('channel_balance', balance)
+
+    cache.invalidate('channel_balance')
+    assert cache.get('get_info', info) == 1
+    assert cache.get('channel_balance', balance) == 2
+
+    cache.invalidate()
+    assert cache.get('get_info', info) == 2
+    assert cache.get('channel_balance', balance) == 3
+
+
+def test_load_racing_invalidation_isnt_stored(clock):
+    cache = QueryCache({'get_info': 30})
+    calls = []
+
+    def stale_load():
+        calls.append(1)
+        # The node changed while this result was being fetched.
+        cache.invalidate('get_info')
+        return 'stale'
+
+    assert cache.get('get_info', stale_load) == 'stale'
+    assert cache.get('get_info', lambda: 'fresh') == 'fresh'
+    assert cache.get('get_info', stale_load) == 'fresh'
+    assert calls == [1]
+
+
+def test_concurrent_misses_share_one_load():
+    cache = QueryCache({'get_info': 30})
+    release = threading.Event()
+    loads = []
+
+    def load():
+        loads.append(1)
+        release.wait(5)
+        return 'info'
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(
+            cache.get('get_info', load),
+        ))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert loads == [1]
+    assert results == ['info'] * 4
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_settled_invoice_invalidates_channel_balance():
+    with FakeLnd() as fake:
+        cache = QueryCache()
+        node = fake.node(query_cache=cache)
+
+        # The first query opens the event streams, the channel and invoice
+        # ones each invalidating the balance once they're subscribed.
+        node.channel_balance()
+        _wait_for(lambda: cache._generations.get('channel_balance') == 2)
+
+        node.channel_balance()
+        node.channel_balance()
+        assert fake.calls['ChannelBalance'] == 2
+
+        invoice = node.create_invoice('paid', 10)
+        fake.settle_invoice(invoice.r_hash.hex())
+
+        _wait_for(lambda: 'channel_balance' not in cache._entries)
+        node.channel_balance()
+        assert fake.calls['ChannelBalance'] == 3
+
+        node.close()
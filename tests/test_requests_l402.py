@@ -0,0 +1,172 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import email
+import hashlib
+import io
+import os
+import threading
+
+import pytest
+import requests
+
+from L402 import RequestsL402Wrapper
+from L402.requests_l402 import PROBE_HEAD
+from lightning import bolt11
+
+PREIMAGE = hashlib.sha256(b'test-preimage').digest()
+
+AUTHORIZATION = 'LSAT test-macaroon:{}'.format(PREIMAGE.hex())
+
+
+class _UploadHandler(BaseHTTPRequestHandler):
+    """
+    Challenges requests without a token, and records the bodies of those
+    with one.
+    """
+
+    protocol_version = 'HTTP/1.1'
+
+    invoice = None
+    uploads = None
+
+    def log_message(self, *args):
+        pass
+
+    def _challenge(self):
+        self.send_response(402)
+        self.send_header(
+            'WWW-Authenticate',
+            'LSAT macaroon="test-macaroon", invoice="{}"'.format(
+                self.invoice,
+            ),
+        )
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_HEAD(self):
+        if self.headers.get('Authorization') != AUTHORIZATION:
+            return self._challenge()
+
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.headers.get('Authorization') != AUTHORIZATION:
+            return self._challenge()
+
+        self.uploads.append((self.headers['Content-Type'], body))
+
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+
+class _StubNode(object):
+    def __init__(self):
+        self.payments = 0
+
+    def pay_invoice(self, invoice, amt=None):
+        self.payments += 1
+        return PREIMAGE.hex()
+
+
+@pytest.fixture
+def server():
+    _UploadHandler.invoice = bolt11.encode(
+        hashlib.sha256(b'test-key').digest(),
+        hashlib.sha256(PREIMAGE).digest(), amount_msat=1000,
+    )
+    _UploadHandler.uploads = []
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _UploadHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
+def _url(server):
+    return 'http://127.0.0.1:{}/upload'.format(server.server_address[1])
+
+
+def _uploaded_files(content_type, body):
+    message = email.message_from_bytes(
+        'Content-Type: {}\r\n\r\n'.format(content_type).encode() + body,
+    )
+
+    return {
+        part.get_param('name', header='content-disposition'): (
+            part.get_filename(), part.get_payload(decode=True),
+        )
+        for part in message.get_payload()
+    }
+
+
+def _pipe(data):
+    read_fd, write_fd = os.pipe()
+    os.write(write_fd, data)
+    os.close(write_fd)
+
+    return os.fdopen(read_fd, 'rb')
+
+
+def test_retried_upload_rewinds_files(server):
+    node = _StubNode()
+    wrapper = RequestsL402Wrapper(node, requests.Session())
+
+    upload = io.BytesIO(b'skipped' + b'seekable' * 100)
+    upload.read(len(b'skipped'))
+
+    response = wrapper.post(
+        _url(server), data={'field': 'value'},
+        files={'upload': ('upload.bin', upload, 'text/plain')},
+    )
+
+    assert response.status_code == 200
+    assert node.payments == 1
+
+    [(content_type, body)] = _UploadHandler.uploads
+    assert _uploaded_files(content_type, body) == {
+        'field': (None, b'value'),
+        'upload': ('upload.bin', b'seekable' * 100),
+    }
+
+
+def test_retried_upload_spools_unseekable_files(server):
+    wrapper = RequestsL402Wrapper(
+        _StubNode(), requests.Session(), spool_threshold=100,
+    )
+
+    response = wrapper.post(_url(server), files=[
+        ('small', ('small.txt', _pipe(b'small'))),
+        ('large', _pipe(b'large' * 1000)),
+    ])
+
+    assert response.status_code == 200
+
+    [(content_type, body)] = _UploadHandler.uploads
+    assert _uploaded_files(content_type, body) == {
+        'small': ('small.txt', b'small'),
+        'large': ('large', b'large' * 1000),
+    }
+
+
+def test_probed_upload_sends_files_once(server):
+    node = _StubNode()
+    wrapper = RequestsL402Wrapper(node, requests.Session(), probe=PROBE_HEAD)
+
+    response = wrapper.post(
+        _url(server), files={'upload': ('pipe.bin', _pipe(b'piped' * 10))},
+    )
+
+    assert response.status_code == 200
+    assert node.payments == 1
+
+    [(content_type, body)] = _UploadHandler.uploads
+    assert _uploaded_files(content_type, body) == {
+        'upload': ('pipe.bin', b'piped' * 10),
+    }
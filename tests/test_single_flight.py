@@ -0,0 +1,130 @@
+import asyncio
+import threading
+
+import pytest
+
+from L402.single_flight import AsyncSingleFlight, SingleFlight
+
+
+def _run_concurrently(target, count):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert not any(thread.is_alive() for thread in threads)
+
+
+def _release_once_in_flight(flight, release):
+    def run():
+        while not flight._calls:
+            release.wait(0.01)
+
+        # Give the followers time to queue up behind the leader.
+        release.wait(0.1)
+        release.set()
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def test_concurrent_calls_share_one_run():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+    results = []
+
+    def pay():
+        calls.append(1)
+        release.wait(5)
+        return 'preimage'
+
+    def call():
+        results.append(flight.do('invoice', pay))
+
+    _release_once_in_flight(flight, release)
+    _run_concurrently(call, 8)
+
+    assert calls == [1]
+    assert results == ['preimage'] * 8
+
+
+def test_followers_get_the_leaders_error():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+    errors = []
+
+    def pay():
+        calls.append(1)
+        release.wait(5)
+        raise RuntimeError('no route')
+
+    def call():
+        try:
+            flight.do('invoice', pay)
+        except RuntimeError as e:
+            errors.append(e)
+
+    _release_once_in_flight(flight, release)
+    _run_concurrently(call, 4)
+
+    assert calls == [1]
+    assert len(errors) == 4
+    assert len({id(e) for e in errors}) == 1
+
+
+def test_calls_after_completion_run_again():
+    flight = SingleFlight()
+    calls = []
+
+    def pay():
+        calls.append(1)
+        return len(calls)
+
+    assert flight.do('invoice', pay) == 1
+    assert flight.do('invoice', pay) == 2
+    assert flight.do('other', pay) == 3
+
+
+def test_async_concurrent_calls_share_one_run():
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def pay():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return 'preimage'
+
+    async def main():
+        return await asyncio.gather(
+            *[flight.do('invoice', pay) for _ in range(8)],
+        )
+
+    assert asyncio.run(main()) == ['preimage'] * 8
+    assert calls == [1]
+
+
+def test_async_cancelled_leader_leaves_run_for_followers():
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def pay():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return 'preimage'
+
+    async def main():
+        leader = asyncio.ensure_future(flight.do('invoice', pay))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do('invoice', pay))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+
+        return await follower
+
+    assert asyncio.run(main()) == 'preimage'
+    assert calls == [1]
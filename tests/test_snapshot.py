@@ -0,0 +1,133 @@
+import asyncio
+
+import pytest
+
+from lightning import AsyncLndNode, FakeLnd, QueryCache, snapshot
+from lightning.snapshot import build_snapshot
+from protos import lightning_pb2 as ln
+
+
+@pytest.fixture
+def fake_lnd():
+    with FakeLnd(
+        local_balance=7000, remote_balance=3000, wallet_balance=500,
+        alias='snapshot',
+    ) as fake:
+        yield fake
+
+
+def test_snapshot(fake_lnd):
+    node = fake_lnd.node()
+
+    taken = node.snapshot()
+
+    assert taken.alias == 'snapshot'
+    assert taken.identity_pubkey == fake_lnd.identity_pubkey
+    assert taken.block_height == 1000
+    assert taken.synced_to_chain and taken.synced_to_graph
+    assert taken.num_active_channels == 1
+    assert taken.channel_local_sat == 7000
+    assert taken.channel_remote_sat == 3000
+    assert taken.wallet_total_sat == 500
+    assert taken.wallet_confirmed_sat == 500
+    assert taken.total_balance_sat == 7500
+
+    assert taken.channels is None
+    assert taken.pending_channels is None
+    assert taken.pending_limbo_sat is None
+    assert fake_lnd.calls['ListChannels'] == 0
+    assert fake_lnd.calls['PendingChannels'] == 0
+
+    node.close()
+
+
+def test_snapshot_with_channels(fake_lnd):
+    node = fake_lnd.node()
+
+    taken = node.snapshot(channels=True, pending_channels=True)
+
+    [channel] = taken.channels
+    assert channel.active
+    assert channel.capacity_sat == 10000
+    assert channel.local_balance_sat == 7000
+    assert channel.remote_balance_sat == 3000
+
+    assert taken.pending_channels == ()
+    assert taken.pending_limbo_sat == 0
+
+    node.close()
+
+
+def test_snapshot_bypasses_query_cache(fake_lnd):
+    node = fake_lnd.node(query_cache=QueryCache(), watch_events=False)
+    assert node.channel_balance().local_balance.sat == 7000
+
+    invoice = node.create_invoice('received', 1000)
+    fake_lnd.settle_invoice(invoice.r_hash.hex())
+
+    # The cached balance is stale, the snapshot isn't.
+    assert node.channel_balance().local_balance.sat == 7000
+    assert node.snapshot().channel_local_sat == 8000
+
+    node.close()
+
+
+def test_async_snapshot(fake_lnd):
+    async def take():
+        node = AsyncLndNode(
+            fake_lnd.cert_path, fake_lnd.macaroon_path, host=fake_lnd.host,
+            port=fake_lnd.port,
+        )
+        try:
+            return await node.snapshot(channels=True)
+        finally:
+            await node.close()
+
+    taken = asyncio.run(take())
+
+    assert taken.alias == 'snapshot'
+    assert taken.channel_local_sat == 7000
+    assert len(taken.channels) == 1
+
+
+def test_pending_channels_summarized():
+    def pending(remote_pubkey, capacity):
+        return ln.PendingChannelsResponse.PendingChannel(
+            remote_node_pub=remote_pubkey,
+            channel_point='{}:0'.format(remote_pubkey), capacity=capacity,
+            local_balance=capacity // 2, remote_balance=capacity // 2,
+        )
+
+    Response = ln.PendingChannelsResponse
+    pending_channels = Response(
+        total_limbo_balance=300,
+        pending_open_channels=[
+            Response.PendingOpenChannel(channel=pending('open', 1000)),
+        ],
+        waiting_close_channels=[
+            Response.WaitingCloseChannel(
+                channel=pending('closing', 2000), limbo_balance=100,
+            ),
+        ],
+        pending_force_closing_channels=[
+            Response.ForceClosedChannel(
+                channel=pending('forced', 4000), limbo_balance=200,
+            ),
+        ],
+    )
+
+    taken = build_snapshot(
+        ln.GetInfoResponse(), ln.ChannelBalanceResponse(),
+        ln.WalletBalanceResponse(), pending_channels=pending_channels,
+    )
+
+    assert [
+        (p.state, p.remote_pubkey, p.capacity_sat, p.limbo_balance_sat)
+        for p in taken.pending_channels
+    ] == [
+        (snapshot.PENDING_OPEN, 'open', 1000, 0),
+        (snapshot.WAITING_CLOSE, 'closing', 2000, 100),
+        (snapshot.PENDING_FORCE_CLOSE, 'forced', 4000, 200),
+    ]
+    assert taken.pending_limbo_sat == 300
+    assert taken.channels is None
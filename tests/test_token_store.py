@@ -0,0 +1,112 @@
+from types import SimpleNamespace
+
+import os
+import stat
+
+import pytest
+
+from L402 import L402Token, TokenStore, token_store
+from L402.token_store import EVICT_FIFO, token_scope
+
+
+def _token(name, created_at=1000.0):
+    return L402Token(
+        macaroon='mac-{}'.format(name), preimage=name * 2,
+        created_at=created_at,
+    )
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    # Only the store's view of the clock is moved, not the time module.
+    monkeypatch.setattr(
+        token_store, 'time', SimpleNamespace(time=lambda: now[0]),
+    )
+
+    return now
+
+
+def test_lru_evicts_least_recently_used(clock):
+    store = TokenStore(max_tokens=2)
+    store.put('a', _token('a'))
+    store.put('b', _token('b'))
+
+    # Reading a makes b the least recently used.
+    assert store.get('a') == _token('a')
+    store.put('c', _token('c'))
+
+    assert len(store) == 2
+    assert store.get('a') == _token('a')
+    assert store.get('b') is None
+    assert store.get('c') == _token('c')
+
+
+def test_fifo_evicts_oldest_inserted(clock):
+    store = TokenStore(max_tokens=2, eviction_policy=EVICT_FIFO)
+    store.put('a', _token('a'))
+    store.put('b', _token('b'))
+
+    assert store.get('a') == _token('a')
+    store.put('c', _token('c'))
+
+    assert store.get('a') is None
+    assert store.get('b') == _token('b')
+    assert store.get('c') == _token('c')
+
+
+def test_unknown_eviction_policy():
+    with pytest.raises(ValueError):
+        TokenStore(eviction_policy='random')
+
+
+def test_ttl_expires_tokens(clock):
+    store = TokenStore(ttl=60)
+    store.put('a', _token('a', created_at=clock[0]))
+
+    clock[0] += 60
+    assert store.get('a') == _token('a', created_at=1000.0)
+
+    clock[0] += 1
+    assert store.get('a') is None
+    assert len(store) == 0
+
+
+def test_invalidate_keeps_newer_token(clock):
+    store = TokenStore()
+    store.put('a', _token('new'))
+
+    store.invalidate('a', token=_token('old'))
+    assert store.get('a') == _token('new')
+
+    store.invalidate('a')
+    assert store.get('a') is None
+
+
+def test_persistence_round_trip(tmp_path, clock):
+    path = str(tmp_path / 'tokens.json')
+
+    store = TokenStore(ttl=60, path=path)
+    store.put('fresh', _token('fresh', created_at=clock[0]))
+    store.put('stale', _token('stale', created_at=clock[0] - 30))
+
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+    clock[0] += 45
+    reloaded = TokenStore(ttl=60, path=path)
+
+    # Tokens that expired while the store was closed aren't loaded back.
+    assert len(reloaded) == 1
+    assert reloaded.get('fresh') == _token('fresh', created_at=1000.0)
+    assert reloaded.get('stale') is None
+
+    reloaded.clear()
+    assert len(TokenStore(path=path)) == 0
+
+
+def test_token_scope():
+    url = 'HTTPS://API.Example.com/v1/items/42?page=2'
+
+    assert token_scope(url) == 'https://api.example.com/v1'
+    assert token_scope(url, 0) == 'https://api.example.com/'
+    assert token_scope(url, 2) == 'https://api.example.com/v1/items'